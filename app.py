@@ -1,14 +1,24 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from chatbot.routes import router as chatbot_router
+from chatbot.retrieval import retriever
 from pdfsummarizer.routes import router as pdf_router
-from routes import performance, users, courses, department, dashboard, test, resources, study_group, study_timetable
+from pdfsummarizer import utils as pdf_utils
+from routes import performance, users, courses, department, dashboard, test, resources, study_group, study_timetable, health, metrics, jobs
 from auth import routes
 from database import models
-from database.db import Base, engine
+from database.db import engine
+from database.migrations import run_migrations
+from database.pagination import InvalidCursor
+from utils import report_renderer
+from utils.jobs import job_queue
+from utils.uploads import UploadSizeLimitMiddleware
+import os
 
 
-Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 
 app = FastAPI(
@@ -31,6 +41,16 @@ app.add_middleware(
     allow_headers=["*"],                # Allow all headers
 )
 
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Serve the read-heavy endpoints from async handlers on the AsyncEngine.
+# Async routers go first so they win the shared paths.
+USE_ASYNC_DB = os.getenv("USE_ASYNC_DB", "false").lower() in ("1", "true", "yes")
+if USE_ASYNC_DB:
+    app.include_router(performance.async_router, prefix="/performance", tags=["Performance"])
+    app.include_router(dashboard.async_router, prefix="/dashboard", tags=["Dashboard"])
+    app.include_router(resources.async_router, prefix="/resources", tags=["Resources"])
+
 # Include routes
 app.include_router(routes.router)
 app.include_router(performance.router, prefix="/performance", tags=["Performance"])
@@ -44,6 +64,28 @@ app.include_router(courses.router, prefix="/courses", tags=["Courses"])
 app.include_router(department.router, prefix="/departments", tags=["Departments"])
 app.include_router(chatbot_router, prefix="/chatbot", tags=["Chatbot"])
 app.include_router(pdf_router, tags=["PDF Summarizer"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
+app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
+app.include_router(metrics.router)
+
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.on_event("startup")
+async def start_background_work():
+    await job_queue.start()
+    await run_in_threadpool(retriever.index_all)
+
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    await job_queue.stop()
+    retriever.shutdown()
+    report_renderer.shutdown_pool()
+    pdf_utils.shutdown_pools()
+
 
 @app.get("/")
 async def root():
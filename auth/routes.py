@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm  import Session
-from database.db import SessionLocal
+from database.db import get_db
 from database import models
 from . import schemas
 from .schemas import UserResponse
@@ -12,18 +12,11 @@ from auth.utils import (
     verify_reset_token,
 )
 from utils.email_service import send_reset_email
+from auth.user_cache import user_cache
 from fastapi.security import OAuth2PasswordRequestForm
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-# --- DB Dependency ---
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # -------- Normal Signup --------
 @router.post("/signup", response_model=UserResponse)
 def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -98,6 +91,7 @@ def add_matric(user_id: int, update: schemas.MatricUpdate, db: Session = Depends
     user.department = update.department
     user.level = update.level
     db.commit()
+    user_cache.invalidate(user.email)
     return {"message": "Matric info updated successfully"}
 
 
@@ -130,5 +124,6 @@ def reset_password(request: schemas.ResetPasswordRequest, db: Session = Depends(
 
     user.password = hash_password(request.new_password)
     db.commit()
+    user_cache.invalidate(user.email)
 
     return {"message": "Password reset successfully"}
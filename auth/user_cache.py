@@ -0,0 +1,93 @@
+# auth/user_cache.py
+"""
+Bounded TTL cache of the authenticated-user projection, keyed by token subject (email).
+
+get_current_user consults it before touching the DB. Anything that changes a
+user's identity fields or removes a user must call `invalidate`. Each worker
+has its own cache, so AUTH_USER_CACHE_TTL bounds how long another worker can
+serve a stale projection.
+"""
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from cachetools import TTLCache
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", 10000))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", 60))
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """What routes need from the authenticated user; safe to share across requests and sessions."""
+    id: int
+    name: str
+    email: str
+    matric_no: Optional[str] = None
+    department: Optional[str] = None
+    level: Optional[str] = None
+    is_google_user: bool = False
+
+    @classmethod
+    def from_model(cls, user) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            matric_no=user.matric_no,
+            department=user.department,
+            level=user.level,
+            is_google_user=bool(user.is_google_user),
+        )
+
+
+class UserCache:
+    def __init__(self, maxsize: int = AUTH_USER_CACHE_SIZE, ttl: float = AUTH_USER_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, email: str) -> Optional[CurrentUser]:
+        with self._lock:
+            user = self._cache.get(email)
+            if user is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return user
+
+    def put(self, email: str, user: CurrentUser):
+        with self._lock:
+            self._cache[email] = user
+
+    def invalidate(self, *emails: Optional[str]):
+        with self._lock:
+            for email in emails:
+                if email and self._cache.pop(email, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl_seconds": self._cache.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+user_cache = UserCache()
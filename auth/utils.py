@@ -5,8 +5,11 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
-from database.db import SessionLocal
-from database import models
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.db import get_db
+from database.async_db import get_async_db
+from database import async_crud, models
+from auth.user_cache import CurrentUser, user_cache
 from dotenv import load_dotenv
 from typing import Union
 import os
@@ -21,6 +24,7 @@ RESET_TOKEN_EXPIRE_MINUTES = int(os.getenv("RESET_TOKEN_EXPIRE_MINUTES", 15))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 
 # === PASSWORD UTILS ===
@@ -64,24 +68,65 @@ def verify_reset_token(token: str) -> str:
 
 
 # === CURRENT USER DEPENDENCY ===
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Extract current user from access token."""
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_access_token(token: str) -> str:
+    """Return the subject (email) of a valid access token."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    return email
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser:
+    """Extract current user from access token."""
+    email = decode_access_token(token)
+
+    cached = user_cache.get(email)
+    if cached is not None:
+        return cached
 
-    db = SessionLocal()
     user = db.query(models.User).filter(models.User.email == email).first()
-    db.close()
     if user is None:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+
+    current = CurrentUser.from_model(user)
+    user_cache.put(email, current)
+
+    # Hand the connection back while the request waits for its handler to run
+    db.rollback()
+    return current
+
+
+def get_optional_user(token: str | None = Depends(optional_oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser | None:
+    """get_current_user for routes that also serve anonymous callers: None without a token, 401 for a bad one."""
+    if token is None:
+        return None
+    return get_current_user(token, db)
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """get_current_user for async routers, so they never hop to the threadpool."""
+    email = decode_access_token(token)
+
+    cached = user_cache.get(email)
+    if cached is not None:
+        return cached
+
+    user = await async_crud.get_user_by_email(db, email)
+    if user is None:
+        raise _credentials_exception()
+
+    current = CurrentUser.from_model(user)
+    user_cache.put(email, current)
+    return current
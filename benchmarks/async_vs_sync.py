@@ -0,0 +1,119 @@
+# benchmarks/async_vs_sync.py
+"""
+Compare throughput of the sync and async (USE_ASYNC_DB) read endpoints.
+
+Seeds a throwaway SQLite database, then drives the dashboard, performance and
+resource listing endpoints in-process with N concurrent clients, once through
+the sync routers (threadpool + Session) and once through the async routers
+(event loop + AsyncSession over aiosqlite).
+
+Usage:
+    python -m benchmarks.async_vs_sync --clients 200 --requests 4000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+DB_FILE = os.path.join(tempfile.gettempdir(), "spoudazo_bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+import httpx
+from fastapi import FastAPI
+
+from auth.utils import create_access_token
+from database.db import SessionLocal, engine
+from database.migrations import run_migrations
+from database import crud, models
+from routes import dashboard, performance, resources
+
+PATHS = ["/dashboard/", "/performance/{user_id}", "/performance/{user_id}/trend-data", "/resources/resources/"]
+
+
+def seed(num_courses: int, num_tests: int):
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        user = models.User(name="Bench", email="bench@example.com", matric_no="BENCH/001", department="CSC", level="100")
+        db.add(user)
+        db.commit()
+        courses = [crud.create_course(db, f"BEN{i:03d}", f"Bench Course {i}", "100", []) for i in range(num_courses)]
+        for i in range(num_tests):
+            course = courses[i % num_courses]
+            test = crud.create_test(db, user.id, course.id, [], ["A", "B"])
+            crud.submit_test(db, test.id, ["A", "C"] if i % 2 else ["A", "B"])
+            crud.create_study_log(db, user.id, course.id, 1 + i % 3)
+        for course in courses:
+            crud.create_resource(db, f"Notes {course.code}", f"https://example.com/{course.code}", "pdf", course.id)
+        return user.id
+    finally:
+        db.close()
+
+
+def build_app(use_async: bool) -> FastAPI:
+    app = FastAPI()
+    if use_async:
+        app.include_router(performance.async_router, prefix="/performance")
+        app.include_router(dashboard.async_router, prefix="/dashboard")
+        app.include_router(resources.async_router, prefix="/resources")
+    app.include_router(performance.router, prefix="/performance")
+    app.include_router(dashboard.router, prefix="/dashboard")
+    app.include_router(resources.router, prefix="/resources")
+    return app
+
+
+async def run(app: FastAPI, user_id: int, clients: int, total: int):
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench@example.com'})}"}
+    paths = [p.format(user_id=user_id) for p in PATHS]
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            for i in remaining:
+                start = time.perf_counter()
+                r = await client.get(paths[i % len(paths)], headers=headers)
+                latencies.append(time.perf_counter() - start)
+                if r.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda q: latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000
+    return {
+        "req_per_s": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(pct(0.95), 2),
+        "p99_ms": round(pct(0.99), 2),
+        "errors": errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--courses", type=int, default=40)
+    parser.add_argument("--tests", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    user_id = seed(args.courses, args.tests)
+    print(f"Seeded {args.courses} courses / {args.tests} tests; {args.clients} clients, {args.requests} requests\n")
+    for label, use_async in (("sync", False), ("async", True)):
+        result = asyncio.run(run(build_app(use_async), user_id, args.clients, args.requests))
+        print(f"{label:>5}: " + "  ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
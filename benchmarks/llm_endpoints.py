@@ -0,0 +1,139 @@
+# benchmarks/llm_endpoints.py
+"""
+Load-test the AI endpoints offline against the stub LLM backend.
+
+Runs the full app in-process with LLM_BACKEND=stub and drives
+/tests/generate, /pdf/summarize and /chatbot/chat with N concurrent
+clients. Stub latency is known, so the gap between it and the measured
+latency is our own overhead: queueing for LLM slots, DB work, parsing,
+caching.
+
+Usage:
+    python -m benchmarks.llm_endpoints --clients 100 --requests 1000 --latency-ms 800 --failure-rate 0.02
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+DB_FILE = os.path.join(tempfile.gettempdir(), "spoudazo_llm_bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+os.environ["LLM_BACKEND"] = "stub"
+# One bench user would hit the per-user token buckets; measure the LLM path, not the limiter.
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("SUMMARY_CACHE_DIR", os.path.join(tempfile.gettempdir(), "spoudazo_llm_bench_summaries"))
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+
+import fitz
+import httpx
+
+from app import app
+from auth.utils import create_access_token
+from database.db import SessionLocal
+from database import crud, models
+from utils import llm_gateway, metrics
+from utils.llm_stub import StubBehaviour, StubClient
+
+ENDPOINTS = ("tests", "pdf", "chat")
+
+
+def seed(num_courses: int) -> tuple[int, list[int]]:
+    db = SessionLocal()
+    try:
+        user = models.User(name="Bench", email="llm-bench@example.com", matric_no="BENCH/002", department="CSC", level="100")
+        db.add(user)
+        db.commit()
+        courses = [crud.create_course(db, f"LLM{i:03d}", f"LLM Bench Course {i}", "100", []) for i in range(num_courses)]
+        return user.id, [c.id for c in courses]
+    finally:
+        db.close()
+
+
+def make_pdfs(count: int) -> list[bytes]:
+    pdfs = []
+    for i in range(count):
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), f"Lecture handout {i}: a few lines of course material.")
+        pdfs.append(doc.tobytes())
+    return pdfs
+
+
+def request_for(endpoint: str, i: int, user_id: int, course_ids: list[int], pdfs: list[bytes], headers: dict):
+    if endpoint == "tests":
+        params = {"user_id": user_id, "course_id": course_ids[i % len(course_ids)], "num_questions": 10}
+        return "POST", "/tests/generate", {"params": params, "headers": headers}
+    if endpoint == "pdf":
+        pdf = pdfs[i % len(pdfs)]
+        return "POST", "/pdf/summarize", {"files": {"file": (f"handout{i % len(pdfs)}.pdf", pdf, "application/pdf")}}
+    return "POST", "/chatbot/chat", {"data": {"user_input": f"Explain topic {i}", "session_id": f"bench-{i % 50}"}}
+
+
+async def run(endpoint: str, clients: int, total: int, user_id: int, course_ids: list[int], pdfs: list[bytes]):
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'llm-bench@example.com'})}"}
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://bench", timeout=None) as client:
+        async def worker():
+            nonlocal errors
+            for i in remaining:
+                method, path, kwargs = request_for(endpoint, i, user_id, course_ids, pdfs, headers)
+                start = time.perf_counter()
+                r = await client.request(method, path, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                if r.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda q: latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000
+    return {
+        "req_per_s": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(pct(0.95), 2),
+        "p99_ms": round(pct(0.99), 2),
+        "errors": errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated subset of: tests,pdf,chat")
+    parser.add_argument("--courses", type=int, default=20)
+    parser.add_argument("--pdfs", type=int, default=200, help="distinct PDFs; fewer means more summary cache hits")
+    parser.add_argument("--latency", choices=("fixed", "uniform", "lognormal"), default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    llm_gateway._client = StubClient(StubBehaviour(args.latency, args.latency_ms, args.sigma, args.failure_rate, args.seed))
+    user_id, course_ids = seed(args.courses)
+    pdfs = make_pdfs(args.pdfs)
+
+    print(f"Stub latency {args.latency} ~{args.latency_ms:g} ms, failure rate {args.failure_rate:g}; "
+          f"{args.clients} clients, {args.requests} requests per endpoint\n")
+    for endpoint in args.endpoints.split(","):
+        result = asyncio.run(run(endpoint, args.clients, args.requests, user_id, course_ids, pdfs))
+        print(f"{endpoint:>5}: " + "  ".join(f"{k}={v}" for k, v in result.items()))
+
+    print("\nModel calls made:")
+    for line in metrics.registry.render().splitlines():
+        if line.startswith(("llm_requests_total", "llm_cache_lookups_total")):
+            print("  " + line)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
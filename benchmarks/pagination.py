@@ -0,0 +1,84 @@
+# benchmarks/pagination.py
+"""
+Show that keyset pagination costs the same per page at any depth.
+
+Seeds a throwaway SQLite database with N resources (1,000,000 by default),
+then walks pages at the start, middle and end of the table with
+crud.list_resources and prints the median latency of each. With keyset
+pagination these stay flat; an OFFSET query is timed alongside for contrast.
+
+Usage:
+    python -m benchmarks.pagination --rows 1000000 --limit 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+DB_FILE = os.path.join(tempfile.gettempdir(), "spoudazo_pagination_bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+
+from sqlalchemy import insert, select
+
+from database.db import SessionLocal, engine
+from database.migrations import run_migrations
+from database.pagination import encode_cursor
+from database import crud, models
+
+
+def seed(rows: int, batch: int = 50_000):
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        for start in range(0, rows, batch):
+            conn.execute(
+                insert(models.Resource),
+                [
+                    {"title": f"Resource {i}", "url": f"https://example.com/{i}", "type": "pdf", "course_id": i % 100 + 1}
+                    for i in range(start, min(start + batch, rows))
+                ],
+            )
+
+
+def time_call(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print(f"Seeding {args.rows:,} resources...")
+    seed(args.rows)
+
+    db = SessionLocal()
+    try:
+        print(f"{'depth':>8}  {'keyset ms':>10}  {'offset ms':>10}")
+        for fraction in (0.0, 0.25, 0.5, 0.75, 0.99):
+            after_id = int(args.rows * fraction)
+            cursor = encode_cursor([after_id]) if after_id else None
+
+            keyset = time_call(lambda: crud.list_resources(db, None, args.limit, cursor), args.repeat)
+            offset_stmt = select(models.Resource).order_by(models.Resource.id).offset(after_id).limit(args.limit)
+            offset = time_call(lambda: db.scalars(offset_stmt).all(), args.repeat)
+
+            page = crud.list_resources(db, None, args.limit, cursor)
+            assert len(page.items) == min(args.limit, args.rows - after_id)
+            print(f"{fraction:>8.0%}  {keyset:>10.3f}  {offset:>10.3f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
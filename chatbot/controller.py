@@ -1,28 +1,158 @@
+import asyncio
 import os
-import google.generativeai as genai
+import weakref
+
 from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+
+from utils import llm_gateway
+from .retrieval import format_context, retriever
+from .session_store import ChatSession, session_store
 
 load_dotenv()
 
-# Configure Gemini
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-1.5-flash")
+CHAT_MODEL = "gemini-1.5-flash"
+
+# Older turns are folded into a rolling summary once a session's history passes this many tokens
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", 2000))
+# Messages (user + model) always kept verbatim
+CHAT_KEEP_RECENT_MESSAGES = int(os.getenv("CHAT_KEEP_RECENT_MESSAGES", 6))
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = """
+You are keeping notes on a tutoring conversation between a student and an AI study assistant.
+Update the running summary with the new messages below. Keep the student's goals, the topics
+and courses discussed, facts and answers already given, and anything the student asked to remember.
+Reply with the updated summary only, in at most 200 words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+"""
+
+
+def estimate_tokens(session: ChatSession) -> int:
+    chars = len(session.summary) + sum(len(turn["text"]) for turn in session.turns)
+    return chars // CHARS_PER_TOKEN
+
+
+def prompt_history(session: ChatSession) -> list:
+    """What Gemini sees before the new message: the summary (if any) followed by the recent turns."""
+    history = []
+    if session.summary:
+        history.append({"role": "user", "parts": [{"text": f"Summary of our conversation so far:\n{session.summary}"}]})
+        history.append({"role": "model", "parts": [{"text": "Got it, I'll keep that in mind."}]})
+    history.extend({"role": turn["role"], "parts": [{"text": turn["text"]}]} for turn in session.turns)
+    return history
+
+
+def needs_compaction(session: ChatSession) -> bool:
+    return estimate_tokens(session) > CHAT_HISTORY_TOKEN_BUDGET and len(session.turns) > CHAT_KEEP_RECENT_MESSAGES
+
+
+async def compact(session: ChatSession):
+    """Fold all but the most recent messages into the summary once the session is over budget."""
+    if not needs_compaction(session):
+        return
+    older = session.turns[:-CHAT_KEEP_RECENT_MESSAGES]
+    messages = "\n".join(f"{turn['role']}: {turn['text']}" for turn in older)
+    try:
+        summary = await llm_gateway.generate(
+            "chatbot",
+            SUMMARY_PROMPT.format(summary=session.summary or "(none)", messages=messages),
+            model=CHAT_MODEL,
+        )
+        session.summary = summary.strip()
+    except llm_gateway.LLMError as e:
+        # Still drop the old turns so the prompt stays bounded; only their detail is lost
+        print(f"⚠️ Chat history compaction failed: {e}")
+    session.turns = session.turns[-CHAT_KEEP_RECENT_MESSAGES:]
+
+
+# One lock per active session so concurrent turns on it run one after another.
+# Entries vanish once no request holds or waits on the lock.
+_session_locks = weakref.WeakValueDictionary()
 
-# ✅ Global dictionary to store conversations by session/user_id
-conversations = {}
 
-def chat_with_gemini(user_input: str, session_id: str = "default"):
+def session_lock(session_id: str) -> asyncio.Lock:
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _session_locks[session_id] = lock
+    return lock
+
+
+_compactions = set()
+
+
+async def compact_session(session_id: str):
+    """Compact a saved session under its lock, so it runs after the turn that triggered it has finished."""
+    try:
+        async with session_lock(session_id):
+            session = await session_store.load(session_id)
+            if needs_compaction(session):
+                await compact(session)
+                await session_store.save(session_id, session)
+    except Exception as e:
+        print(f"⚠️ Chat history compaction for session {session_id} failed: {e}")
+
+
+async def record_turn(session_id: str, session: ChatSession, user_input: str, reply: str):
+    """Save the turn now; compaction (a second model call) runs in the background, off the reply path."""
+    session.turns.append({"role": "user", "text": user_input})
+    session.turns.append({"role": "model", "text": reply})
+    await session_store.save(session_id, session)
+    if needs_compaction(session):
+        task = asyncio.create_task(compact_session(session_id))
+        _compactions.add(task)
+        task.add_done_callback(_compactions.discard)
+
+
+async def with_course_context(user_input: str, course_id: int | None) -> str:
+    """Prepend the most relevant chunks of the course's uploaded material, if there are any."""
+    if course_id is None:
+        return user_input
+    results = await run_in_threadpool(retriever.search, course_id, user_input)
+    if not results:
+        return user_input
+    return (
+        "Use the following excerpts from the course material where relevant, "
+        "and cite them by number.\n\n"
+        f"{format_context(results)}\n\nQuestion: {user_input}"
+    )
+
+
+async def chat_with_gemini(user_input: str, session_id: str = "default", course_id: int | None = None):
     """
     Chat with Gemini and remember conversation history per session.
+    With a course_id, relevant excerpts of that course's resources are sent along with the message.
     """
-    # Get history for this session, or create new
-    history = conversations.get(session_id, [])
+    message = await with_course_context(user_input, course_id)
+    async with session_lock(session_id):
+        session = await session_store.load(session_id)
+
+        # Send the turn on top of the summary and recent history
+        reply, _ = await llm_gateway.chat("chatbot", CHAT_MODEL, prompt_history(session), message)
+
+        await record_turn(session_id, session, user_input, reply)
 
-    # Start chat with previous history
-    chat = model.start_chat(history=history)
-    response = chat.send_message(user_input)
+    return reply
+
+
+async def stream_chat_with_gemini(user_input: str, session_id: str = "default", course_id: int | None = None):
+    """
+    Same as chat_with_gemini, but yields the reply in chunks as Gemini produces them.
+    The turn is only saved once the full reply has arrived.
+    """
+    message = await with_course_context(user_input, course_id)
+    async with session_lock(session_id):
+        session = await session_store.load(session_id)
 
-    # Save back the updated history
-    conversations[session_id] = chat.history
+        parts = []
+        async for text in llm_gateway.chat_stream("chatbot", CHAT_MODEL, prompt_history(session), message):
+            parts.append(text)
+            yield text
 
-    return response.text
+        await record_turn(session_id, session, user_input, "".join(parts))
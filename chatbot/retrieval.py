@@ -0,0 +1,267 @@
+# chatbot/retrieval.py
+"""
+BM25 retrieval over the PDF resources uploaded for each course.
+
+Each resource's text is extracted once (PyMuPDF, OCR fallback), split into
+small chunks and cached on disk under RETRIEVAL_CACHE_DIR. Per course, the
+chunks live in an in-memory inverted index.
+
+Extraction (and its OCR) never runs on a chat request. Resources are indexed
+on a small background thread pool: after an upload, at startup, and when a
+search finds resource ids in the database that this worker has not indexed
+yet (uploads made through another worker). A resource is indexed at most
+once at a time. Searches use whatever is indexed at that moment, and drop
+resources that have been deleted.
+"""
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+from database.db import SessionLocal
+from database import crud
+from pdfsummarizer.utils import OCR_API_KEY, chunk_pages, extract_pages_from_pdf
+
+load_dotenv()
+
+RETRIEVAL_CACHE_DIR = os.getenv("RETRIEVAL_CACHE_DIR", os.path.join("cache", "retrieval"))
+RETRIEVAL_CHUNK_TOKENS = int(os.getenv("RETRIEVAL_CHUNK_TOKENS", 300))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 4))
+RETRIEVAL_INDEX_WORKERS = int(os.getenv("RETRIEVAL_INDEX_WORKERS", 1))
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or so that the their then there "
+    "these this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+@dataclass
+class Chunk:
+    resource_id: int
+    title: str
+    first_page: int
+    last_page: int
+    text: str
+    length: int = 0
+
+
+# === EXTRACTION CACHE ===
+def _cache_path(resource_id: int) -> str:
+    return os.path.join(RETRIEVAL_CACHE_DIR, f"{resource_id}.json")
+
+
+def load_chunks(resource_id: int, title: str, path: str) -> list[Chunk]:
+    """Chunks of one PDF resource, from the disk cache while the file is unchanged."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return []  # file missing (e.g. a link rather than an upload)
+    signature = [stat.st_size, stat.st_mtime]
+
+    try:
+        with open(_cache_path(resource_id), encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["signature"] == signature:
+            return [Chunk(resource_id, title, *c) for c in cached["chunks"]]
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+
+    try:
+        pages = extract_pages_from_pdf(path, OCR_API_KEY)
+    except Exception as e:
+        print(f"❌ Could not index resource {resource_id}: {e}")
+        return []
+    chunks = [Chunk(resource_id, title, c.first_page, c.last_page, c.text) for c in chunk_pages(pages, RETRIEVAL_CHUNK_TOKENS)]
+
+    os.makedirs(RETRIEVAL_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=RETRIEVAL_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"signature": signature, "chunks": [[c.first_page, c.last_page, c.text] for c in chunks]}, f)
+    os.replace(tmp_path, _cache_path(resource_id))
+    return chunks
+
+
+def forget_chunks(resource_id: int):
+    try:
+        os.remove(_cache_path(resource_id))
+    except FileNotFoundError:
+        pass
+
+
+# === INDEX ===
+class CourseIndex:
+    """Inverted index with BM25 scoring over one course's chunks."""
+
+    def __init__(self):
+        self.chunks = {}       # chunk id -> Chunk
+        self.postings = {}     # term -> {chunk id: term frequency}
+        self.resources = {}    # resource id -> [chunk ids]
+        self.total_length = 0
+        self._next_id = 0
+        self.lock = threading.Lock()
+
+    def add(self, resource_id: int, chunks: list[Chunk]):
+        ids = []
+        for chunk in chunks:
+            terms = Counter(tokenize(chunk.title + " " + chunk.text))
+            chunk.length = sum(terms.values())
+            chunk_id = self._next_id
+            self._next_id += 1
+            self.chunks[chunk_id] = chunk
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[chunk_id] = tf
+            self.total_length += chunk.length
+            ids.append(chunk_id)
+        self.resources[resource_id] = ids
+
+    def remove(self, resource_id: int):
+        for chunk_id in self.resources.pop(resource_id, []):
+            chunk = self.chunks.pop(chunk_id)
+            self.total_length -= chunk.length
+            for term in set(tokenize(chunk.title + " " + chunk.text)):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self.postings[term]
+
+    def search(self, query: str, k: int) -> list[tuple[float, Chunk]]:
+        n = len(self.chunks)
+        if not n:
+            return []
+        avg_length = self.total_length / n or 1
+        scores = Counter()
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                length = self.chunks[chunk_id].length
+                scores[chunk_id] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+        return [(score, self.chunks[chunk_id]) for chunk_id, score in scores.most_common(k)]
+
+
+class ResourceRetriever:
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._in_flight = set()   # resource ids being indexed
+        self._removed = set()     # deleted while being indexed
+        self._executor = None
+
+    def _index(self, course_id: int) -> CourseIndex:
+        with self._lock:
+            if course_id not in self._indexes:
+                self._indexes[course_id] = CourseIndex()
+            return self._indexes[course_id]
+
+    def add_resource(self, course_id: int, resource_id: int, title: str, path: str):
+        """Extract and index one resource (slow: may OCR). Runs on the indexing pool, see schedule()."""
+        chunks = load_chunks(resource_id, title, path)
+        with self._lock:
+            if resource_id in self._removed:
+                return
+        index = self._index(course_id)
+        with index.lock:
+            index.remove(resource_id)
+            index.add(resource_id, chunks)
+
+    def schedule(self, course_id: int, resource_id: int, title: str, path: str):
+        """Index a resource in the background, unless it is already being indexed."""
+        with self._lock:
+            if resource_id in self._in_flight:
+                return
+            self._in_flight.add(resource_id)
+            self._removed.discard(resource_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=RETRIEVAL_INDEX_WORKERS, thread_name_prefix="retrieval")
+            executor = self._executor
+        executor.submit(self._run_add, course_id, resource_id, title, path)
+
+    def _run_add(self, course_id: int, resource_id: int, title: str, path: str):
+        try:
+            self.add_resource(course_id, resource_id, title, path)
+        except Exception as e:
+            print(f"❌ Could not index resource {resource_id}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(resource_id)
+                if resource_id in self._removed:
+                    self._removed.discard(resource_id)
+                    forget_chunks(resource_id)
+
+    def index_all(self):
+        """Queue every uploaded PDF for indexing (at startup, so first questions find their context)."""
+        db = SessionLocal()
+        try:
+            resources = crud.list_pdf_resources(db)
+        finally:
+            db.close()
+        for resource in resources:
+            self.schedule(resource.course_id, resource.id, resource.title, resource.url)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def remove_resource(self, resource_id: int):
+        forget_chunks(resource_id)
+        with self._lock:
+            if resource_id in self._in_flight:
+                self._removed.add(resource_id)
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            with index.lock:
+                index.remove(resource_id)
+
+    def sync_course(self, db, course_id: int):
+        """Drop deleted resources from the course's index and queue any it is missing; never extracts here."""
+        current = {r.id: r for r in crud.list_course_pdf_resources(db, course_id)}
+        index = self._index(course_id)
+        with index.lock:
+            indexed = set(index.resources)
+            for resource_id in indexed - current.keys():
+                index.remove(resource_id)
+        for resource_id in current.keys() - indexed:
+            resource = current[resource_id]
+            self.schedule(course_id, resource.id, resource.title, resource.url)
+
+    def search(self, course_id: int, query: str, k: int = RETRIEVAL_TOP_K) -> list[tuple[float, Chunk]]:
+        """Best chunks among the resources indexed so far; missing ones are queued, not waited for."""
+        db = SessionLocal()
+        try:
+            self.sync_course(db, course_id)
+        finally:
+            db.close()
+        index = self._index(course_id)
+        with index.lock:
+            return index.search(query, k)
+
+
+retriever = ResourceRetriever()
+
+
+def format_context(results: list[tuple[float, Chunk]]) -> str:
+    parts = []
+    for number, (_, chunk) in enumerate(results, start=1):
+        pages = f"p. {chunk.first_page}" if chunk.first_page == chunk.last_page else f"pp. {chunk.first_page}-{chunk.last_page}"
+        parts.append(f"[{number}] {chunk.title} ({pages}):\n{chunk.text.strip()}")
+    return "\n\n".join(parts)
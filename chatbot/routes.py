@@ -1,12 +1,81 @@
-from fastapi import APIRouter, Form
-from .controller import chat_with_gemini
+from fastapi import APIRouter, Depends, Form, HTTPException, WebSocket, WebSocketDisconnect
+from utils import llm_gateway
+from utils.sse import sse_event
+from utils.admission import AdmissionSlot, HeldStreamingResponse, admission, admit, client_key
+from .controller import chat_with_gemini, stream_chat_with_gemini
 
 router = APIRouter()
 
-@router.post("/chat")
+@router.post("/chat", dependencies=[Depends(admission("chatbot"))])
 async def chat_api(
     user_input: str = Form(...),
-    session_id: str = Form("default")  # ✅ optional: use "default" if not given
+    session_id: str = Form("default"),  # ✅ optional: use "default" if not given
+    course_id: int | None = Form(None)  # optional: ground the reply in this course's uploaded PDFs
 ):
-    reply = chat_with_gemini(user_input, session_id=session_id)
+    try:
+        reply = await chat_with_gemini(user_input, session_id=session_id, course_id=course_id)
+    except llm_gateway.LLMTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except llm_gateway.LLMError as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error during content generation: {str(e)}")
     return {"reply": reply, "session_id": session_id}
+
+
+async def sse_reply(user_input: str, session_id: str, course_id: int | None):
+    try:
+        async for text in stream_chat_with_gemini(user_input, session_id=session_id, course_id=course_id):
+            yield sse_event("token", {"text": text})
+    except llm_gateway.LLMError as e:
+        yield sse_event("error", {"detail": str(e)})
+        return
+    yield sse_event("done", {"session_id": session_id})
+
+
+@router.post("/chat/stream")
+async def chat_stream_api(
+    user_input: str = Form(...),
+    session_id: str = Form("default"),
+    course_id: int | None = Form(None),
+    slot: AdmissionSlot = Depends(admission("chatbot"))
+):
+    """Stream the reply as Server-Sent Events: `token` chunks, then `done` (or `error`)."""
+    return HeldStreamingResponse(
+        slot,
+        sse_reply(user_input, session_id, course_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/chat/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    Send {"user_input": ..., "session_id": ..., "course_id": ...}; the reply comes back as
+    {"type": "token", "text": ...} messages followed by {"type": "done"} (or "error").
+    """
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_json()
+            user_input = message.get("user_input")
+            session_id = message.get("session_id") or "default"
+            course_id = message.get("course_id")
+            if not user_input:
+                await websocket.send_json({"type": "error", "detail": "user_input is required"})
+                continue
+            try:
+                slot = await admit("chatbot", client_key(websocket))
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "detail": e.detail, "retry_after": int(e.headers["Retry-After"])})
+                continue
+            try:
+                async for text in stream_chat_with_gemini(user_input, session_id=session_id, course_id=course_id):
+                    await websocket.send_json({"type": "token", "text": text})
+            except llm_gateway.LLMError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            finally:
+                slot.release()
+            await websocket.send_json({"type": "done", "session_id": session_id})
+    except WebSocketDisconnect:
+        pass
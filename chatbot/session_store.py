@@ -0,0 +1,148 @@
+# chatbot/session_store.py
+"""
+Where chatbot conversations live between turns.
+
+A session is stored as plain JSON: a rolling summary of older turns plus
+the most recent turns verbatim (see chatbot.controller for compaction).
+Two backends, picked with CHAT_SESSION_STORE:
+
+- "memory" (default): bounded LRU with a sliding TTL, per worker.
+- "sqlite": a SQLite file (CHAT_SESSION_DB) shared by every worker on the
+  host, with the same size and TTL limits enforced on write.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+
+from cachetools import TTLCache
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+
+load_dotenv()
+
+CHAT_SESSION_STORE = os.getenv("CHAT_SESSION_STORE", "memory").lower()
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", 10000))
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", 24 * 3600))
+CHAT_SESSION_DB = os.getenv("CHAT_SESSION_DB", "chat_sessions.db")
+
+
+@dataclass
+class ChatSession:
+    summary: str = ""
+    turns: list = field(default_factory=list)  # [{"role": "user" | "model", "text": ...}]
+
+    @classmethod
+    def from_json(cls, raw: str) -> "ChatSession":
+        return cls(**json.loads(raw))
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+
+class MemorySessionStore:
+    def __init__(self, maxsize: int = CHAT_SESSION_MAX, ttl: float = CHAT_SESSION_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    async def load(self, session_id: str) -> ChatSession:
+        with self._lock:
+            raw = self._cache.get(session_id)
+        return ChatSession.from_json(raw) if raw else ChatSession()
+
+    async def save(self, session_id: str, session: ChatSession):
+        # Stored serialized so callers never share a mutable session object
+        with self._lock:
+            self._cache[session_id] = session.to_json()
+
+    async def delete(self, session_id: str):
+        with self._lock:
+            self._cache.pop(session_id, None)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "sessions": len(self._cache), "max": self._cache.maxsize}
+
+
+class SQLiteSessionStore:
+    PRUNE_EVERY = 100  # writes between size/TTL sweeps
+
+    def __init__(self, path: str = CHAT_SESSION_DB, maxsize: int = CHAT_SESSION_MAX, ttl: float = CHAT_SESSION_TTL):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_chat_sessions_updated ON chat_sessions (updated_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, session_id: str) -> ChatSession:
+        row = self._connect().execute(
+            "SELECT data FROM chat_sessions WHERE session_id = ? AND updated_at > ?",
+            (session_id, time.time() - self.ttl),
+        ).fetchone()
+        return ChatSession.from_json(row[0]) if row else ChatSession()
+
+    def _save(self, session_id: str, session: ChatSession):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO chat_sessions (session_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (session_id, session.to_json(), time.time()),
+            )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def _delete(self, session_id: str):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+
+    def prune(self):
+        """Drop expired sessions, then the least recently used ones beyond maxsize."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM chat_sessions WHERE updated_at <= ?", (time.time() - self.ttl,))
+            conn.execute(
+                "DELETE FROM chat_sessions WHERE session_id IN ("
+                "SELECT session_id FROM chat_sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    async def load(self, session_id: str) -> ChatSession:
+        return await run_in_threadpool(self._load, session_id)
+
+    async def save(self, session_id: str, session: ChatSession):
+        await run_in_threadpool(self._save, session_id, session)
+
+    async def delete(self, session_id: str):
+        await run_in_threadpool(self._delete, session_id)
+
+    def stats(self) -> dict:
+        count = self._connect().execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+        return {"backend": "sqlite", "sessions": count, "max": self.maxsize}
+
+
+def create_session_store():
+    if CHAT_SESSION_STORE == "sqlite":
+        return SQLiteSessionStore()
+    return MemorySessionStore()
+
+
+session_store = create_session_store()
@@ -0,0 +1,57 @@
+# database/async_crud.py
+"""Async equivalents of the hot read paths in database/crud.py (listings, aggregates, trends)."""
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, models
+from .pagination import Page, apaginate
+
+
+# ---------- USERS ----------
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
+
+
+# ---------- RESOURCES ----------
+async def list_resources(db: AsyncSession, course_id: int | None = None, limit: int | None = None, cursor: str | None = None) -> Page:
+    return await apaginate(db, crud.resources_stmt(course_id), [models.Resource.id], limit, cursor)
+
+
+# ---------- AGGREGATES ----------
+async def get_user_average_score(db: AsyncSession, user_id: int):
+    stats = models.UserCourseStat
+    total_score, total_count = (
+        await db.execute(
+            select(func.sum(stats.score_sum), func.sum(stats.test_count)).where(stats.user_id == user_id)
+        )
+    ).one()
+    return round(total_score / total_count, 2) if total_count else 0
+
+async def get_course_scores(db: AsyncSession, user_id: int):
+    return (await db.execute(crud.course_scores_stmt(user_id))).all()
+
+async def get_weekly_course_hours(db: AsyncSession, user_id: int):
+    return (await db.execute(crud.weekly_course_hours_stmt(user_id))).all()
+
+
+# ---------- TRENDS ----------
+async def get_test_trend(db: AsyncSession, user_id: int):
+    return (await db.execute(crud.test_trend_stmt(user_id))).all()
+
+async def get_study_trend(db: AsyncSession, user_id: int):
+    return (await db.execute(crud.study_trend_stmt(user_id))).all()
+
+
+# ---------- PERFORMANCE SUMMARY ----------
+async def get_performance_summary(db: AsyncSession, user_id: int, include_trends: bool = True):
+    # A single AsyncSession runs one statement at a time, so these are sequential
+    course_scores = await get_course_scores(db, user_id)
+    weekly_study = await get_weekly_course_hours(db, user_id)
+    if not include_trends:
+        return crud.build_performance_summary(course_scores, weekly_study)
+    return crud.build_performance_summary(
+        course_scores, weekly_study, await get_test_trend(db, user_id), await get_study_trend(db, user_id)
+    )
@@ -0,0 +1,54 @@
+# database/async_db.py
+"""
+AsyncEngine / AsyncSession counterpart of database/db.py for the read-heavy
+routers. Uses the same DATABASE_URL with the async driver swapped in
+(aiosqlite for SQLite, asyncpg for Postgres) and the same pool settings.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from .db import (
+    database_url,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_POOL_DISABLED,
+)
+
+
+def to_async_url(url: str) -> str:
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith("postgresql+psycopg2:"):
+        return "postgresql+asyncpg:" + url[len("postgresql+psycopg2:"):]
+    if url.startswith("postgresql:") or url.startswith("postgres:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+
+async_database_url = to_async_url(database_url)
+
+async_connect_args = {}
+if async_database_url.startswith("postgresql+asyncpg"):
+    async_connect_args["ssl"] = "require"
+
+async_engine_kwargs = {"connect_args": async_connect_args, "pool_pre_ping": DB_POOL_PRE_PING}
+if DB_POOL_DISABLED:
+    async_engine_kwargs["poolclass"] = NullPool
+elif ":memory:" not in async_database_url:
+    async_engine_kwargs.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+
+async_engine = create_async_engine(async_database_url, **async_engine_kwargs)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
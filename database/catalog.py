@@ -0,0 +1,153 @@
+# database/catalog.py
+"""
+In-memory snapshot of the course catalog (courses + their departments),
+indexed by course id, course code and department.
+
+Course metadata is read on almost every request and changes rarely, so each
+worker keeps an immutable snapshot and swaps in a new one whenever the catalog
+is written. A shared version row in the DB lets other workers notice that their
+copy is stale without reloading the whole catalog on every request.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session, selectinload
+
+from . import models
+
+CHECK_INTERVAL_SECONDS = float(os.getenv("COURSE_CATALOG_CHECK_SECONDS", 5))
+
+
+@dataclass(frozen=True)
+class CatalogDepartment:
+    id: int
+    name: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+@dataclass(frozen=True)
+class CatalogCourse:
+    id: int
+    code: str
+    title: str
+    level: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    departments: tuple = ()
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    courses: tuple = ()
+    by_id: dict = field(default_factory=dict)
+    by_code: dict = field(default_factory=dict)
+    by_department: dict = field(default_factory=dict)
+    departments: dict = field(default_factory=dict)
+
+
+def get_shared_version(db: Session) -> int:
+    row = db.query(models.CatalogVersion).filter(models.CatalogVersion.id == 1).first()
+    return row.version if row else 0
+
+
+def bump_shared_version(db: Session):
+    """Increment the shared version. Call before committing a catalog write so both land together."""
+    row = db.query(models.CatalogVersion).filter(models.CatalogVersion.id == 1).first()
+    if row:
+        row.version = models.CatalogVersion.version + 1
+    else:
+        db.add(models.CatalogVersion(id=1, version=1))
+
+
+def build_snapshot(db: Session) -> CatalogSnapshot:
+    version = get_shared_version(db)
+    rows = (
+        db.query(models.Course)
+        .options(selectinload(models.Course.departments))
+        .order_by(models.Course.id)
+        .all()
+    )
+
+    departments = {
+        d.id: CatalogDepartment(id=d.id, name=d.name, created_at=d.created_at, updated_at=d.updated_at)
+        for d in db.query(models.Department).order_by(models.Department.id)
+    }
+
+    courses = []
+    by_department = {}
+    for c in rows:
+        course = CatalogCourse(
+            id=c.id, code=c.code, title=c.title, level=c.level,
+            created_at=c.created_at, updated_at=c.updated_at,
+            departments=tuple(departments[d.id] for d in c.departments),
+        )
+        courses.append(course)
+        for d in course.departments:
+            by_department.setdefault(d.id, []).append(course)
+
+    return CatalogSnapshot(
+        version=version,
+        courses=tuple(courses),
+        by_id={c.id: c for c in courses},
+        by_code={c.code: c for c in courses},
+        by_department={k: tuple(v) for k, v in by_department.items()},
+        departments=departments,
+    )
+
+
+class CourseCatalog:
+    def __init__(self, check_interval: float = CHECK_INTERVAL_SECONDS):
+        self.check_interval = check_interval
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def snapshot(self, db: Session) -> CatalogSnapshot:
+        """Current snapshot, loading it lazily and reloading if another worker bumped the version."""
+        snap = self._snapshot
+        if snap is None:
+            return self.refresh(db)
+
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            if get_shared_version(db) != snap.version:
+                return self.refresh(db)
+        return snap
+
+    def refresh(self, db: Session) -> CatalogSnapshot:
+        """Rebuild the snapshot and swap it in atomically."""
+        with self._lock:
+            snap = build_snapshot(db)
+            self._snapshot = snap
+            self._checked_at = time.monotonic()
+        return snap
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+
+    # ---- lookups ----
+    def get_by_id(self, db: Session, course_id: int) -> Optional[CatalogCourse]:
+        return self.snapshot(db).by_id.get(course_id)
+
+    def get_by_code(self, db: Session, code: str) -> Optional[CatalogCourse]:
+        return self.snapshot(db).by_code.get(code)
+
+    def list_courses(self, db: Session) -> tuple:
+        return self.snapshot(db).courses
+
+    def get_department(self, db: Session, department_id: int) -> Optional[CatalogDepartment]:
+        return self.snapshot(db).departments.get(department_id)
+
+    def list_department_courses(self, db: Session, department_id: int) -> tuple:
+        return self.snapshot(db).by_department.get(department_id, ())
+
+
+catalog = CourseCatalog()
@@ -1,8 +1,17 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import func
+import hashlib
+import re
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from pydantic import EmailStr
 from . import models
+from .catalog import catalog, bump_shared_version
+from .pagination import Page, paginate, paginate_sorted
+from auth.user_cache import user_cache
+from utils.uploads import save_upload
 
 # ---------- USERS ----------
 def create_user(db: Session, matric_no: str, name: str, email: EmailStr, password: str, department: str, level: str):
@@ -22,14 +31,16 @@ def create_user(db: Session, matric_no: str, name: str, email: EmailStr, passwor
 def get_user_by_matric_no(db: Session, matric_no: str):
     return db.query(models.User).filter(models.User.matric_no == matric_no).first()
 
-def list_users(db: Session):
-    return db.query(models.User).all()
+def list_users(db: Session, limit: int | None = None, cursor: str | None = None) -> Page:
+    return paginate(db, select(models.User), [models.User.id], limit, cursor)
 
 def delete_user(db: Session, user_id: int):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if user:
+        email = user.email
         db.delete(user)
         db.commit()
+        user_cache.invalidate(email)
         return True
     return False
 
@@ -38,50 +49,199 @@ def delete_user(db: Session, user_id: int):
 def create_department(db: Session, name: str):
     dept = models.Department(name=name)
     db.add(dept)
+    bump_shared_version(db)
     db.commit()
     db.refresh(dept)
+    catalog.refresh(db)
     return dept
 
+def get_department(db: Session, dept_id: int):
+    return catalog.get_department(db, dept_id)
+
 def get_department_by_name(db: Session, name: str):
     return db.query(models.Department).filter(models.Department.name == name).first()
 
-def list_departments(db: Session):
-    return db.query(models.Department).all()
+def list_departments(db: Session, limit: int | None = None, cursor: str | None = None) -> Page:
+    return paginate(db, select(models.Department), [models.Department.id], limit, cursor)
 
 def delete_department(db: Session, dept_id: int):
     dept = db.query(models.Department).filter(models.Department.id == dept_id).first()
     if dept:
         db.delete(dept)
+        bump_shared_version(db)
         db.commit()
+        catalog.refresh(db)
         return True
     return False
 
 
 # ---------- COURSES ----------
+# Reads go through the in-memory catalog; writes bump its shared version in the
+# same transaction and rebuild the local snapshot once committed.
 def create_course(db: Session, code: str, title: str, level: str, department_ids: list[int]):
     course = models.Course(code=code, title=title, level=level)
     if department_ids:
         course.departments = db.query(models.Department).filter(models.Department.id.in_(department_ids)).all()
     db.add(course)
+    bump_shared_version(db)
     db.commit()
     db.refresh(course)
+    catalog.refresh(db)
     return course
 
+def get_course(db: Session, course_id: int):
+    return catalog.get_by_id(db, course_id)
+
 def get_course_by_code(db: Session, code: str):
-    return db.query(models.Course).filter(models.Course.code == code).first()
+    return catalog.get_by_code(db, code)
 
-def list_courses(db: Session):
-    return db.query(models.Course).all()
+def list_courses(db: Session, limit: int | None = None, cursor: str | None = None) -> Page:
+    return paginate_sorted(catalog.list_courses(db), "id", limit, cursor)
+
+def list_department_courses(db: Session, department_id: int, limit: int | None = None, cursor: str | None = None) -> Page:
+    return paginate_sorted(catalog.list_department_courses(db, department_id), "id", limit, cursor)
 
 def delete_course(db: Session, course_id: int):
     course = db.query(models.Course).filter(models.Course.id == course_id).first()
     if course:
         db.delete(course)
+        bump_shared_version(db)
         db.commit()
+        catalog.refresh(db)
         return True
     return False
 
 
+# ---------- USER COURSE STATS ----------
+# user_course_stats is a rollup of tests/study_logs per (user, course). Writers
+# below update it in the same transaction as the row they touch, so reads can
+# scan O(courses) rows instead of the user's whole history. Increments are SQL
+# expressions flushed immediately so concurrent writers don't lose updates.
+def _get_or_create_stats(db: Session, user_id: int, course_id: int):
+    stats = db.get(models.UserCourseStat, (user_id, course_id))
+    if stats is None:
+        # INSERT ... ON CONFLICT DO NOTHING, so two first writes for the same pair don't collide
+        insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        db.execute(
+            insert(models.UserCourseStat)
+            .values(user_id=user_id, course_id=course_id, tests_taken=0, test_count=0, score_sum=0, total_hours=0)
+            .on_conflict_do_nothing(index_elements=["user_id", "course_id"])
+        )
+        stats = db.get(models.UserCourseStat, (user_id, course_id))
+    return stats
+
+def _record_score(db: Session, test: models.Test, old_score: int | None):
+    stats = _get_or_create_stats(db, test.user_id, test.course_id)
+    if old_score is None:
+        stats.test_count = models.UserCourseStat.test_count + 1
+        stats.score_sum = models.UserCourseStat.score_sum + test.score
+    else:
+        stats.score_sum = models.UserCourseStat.score_sum + (test.score - old_score)
+    stats.last_score = test.score
+    db.flush()
+
+def _record_test(db: Session, user_id: int, course_id: int):
+    stats = _get_or_create_stats(db, user_id, course_id)
+    stats.tests_taken = models.UserCourseStat.tests_taken + 1
+    db.flush()
+
+def _refresh_stats(db: Session, user_id: int, course_id: int):
+    """Recompute one rollup row from the rows left after a delete (last score/date can't be decremented)."""
+    if user_id is None or course_id is None:
+        return
+    test, log = models.Test, models.StudyLog
+    tests_taken, test_count, score_sum = (
+        db.query(func.count(test.id), func.count(test.score), func.coalesce(func.sum(test.score), 0))
+        .filter(test.user_id == user_id, test.course_id == course_id)
+        .one()
+    )
+    last_score = (
+        db.query(test.score)
+        .filter(test.user_id == user_id, test.course_id == course_id, test.score.isnot(None))
+        .order_by(test.created_at.desc(), test.id.desc())
+        .limit(1)
+        .scalar()
+    )
+    total_hours, last_studied_at = (
+        db.query(func.coalesce(func.sum(log.hours_studied), 0), func.max(log.date))
+        .filter(log.user_id == user_id, log.course_id == course_id)
+        .one()
+    )
+    stats = _get_or_create_stats(db, user_id, course_id)
+    stats.tests_taken = tests_taken
+    stats.test_count = test_count
+    stats.score_sum = score_sum
+    stats.last_score = last_score
+    stats.total_hours = total_hours
+    stats.last_studied_at = last_studied_at
+    db.flush()
+
+def _record_study(db: Session, user_id: int, course_id: int, hours: int, studied_at: datetime):
+    stats = _get_or_create_stats(db, user_id, course_id)
+    stats.total_hours = models.UserCourseStat.total_hours + hours
+    stats.last_studied_at = studied_at
+    db.flush()
+
+def average_score(stats):
+    """Mean score of a rollup row; NULL while none of its tests is scored, like AVG(score)."""
+    return stats.score_sum * 1.0 / func.nullif(stats.test_count, 0)
+
+def get_user_course_stats(db: Session, user_id: int):
+    return db.query(models.UserCourseStat).filter(models.UserCourseStat.user_id == user_id).all()
+
+def rebuild_user_course_stats(db: Session, user_id: int | None = None):
+    """Recompute the rollup from tests/study_logs (backfill, or repair after manual edits)."""
+    stats_query = db.query(models.UserCourseStat)
+    tests_query = (
+        db.query(models.Test.user_id, models.Test.course_id, models.Test.score)
+        .order_by(models.Test.created_at.asc(), models.Test.id.asc())
+    )
+    logs_query = (
+        db.query(
+            models.StudyLog.user_id,
+            models.StudyLog.course_id,
+            func.sum(models.StudyLog.hours_studied),
+            func.max(models.StudyLog.date),
+        )
+        .group_by(models.StudyLog.user_id, models.StudyLog.course_id)
+    )
+    if user_id is not None:
+        stats_query = stats_query.filter(models.UserCourseStat.user_id == user_id)
+        tests_query = tests_query.filter(models.Test.user_id == user_id)
+        logs_query = logs_query.filter(models.StudyLog.user_id == user_id)
+
+    rows = {}
+    def row_for(uid, cid):
+        if (uid, cid) not in rows:
+            rows[(uid, cid)] = models.UserCourseStat(
+                user_id=uid, course_id=cid, tests_taken=0, test_count=0, score_sum=0, total_hours=0
+            )
+        return rows[(uid, cid)]
+
+    # Tests are streamed in creation order so the last one seen is the latest score
+    for uid, cid, score in tests_query.yield_per(1000):
+        if uid is None or cid is None:
+            continue
+        stats = row_for(uid, cid)
+        stats.tests_taken += 1
+        if score is not None:
+            stats.test_count += 1
+            stats.score_sum += score
+            stats.last_score = score
+
+    for uid, cid, hours, last_date in logs_query.all():
+        if uid is None or cid is None:
+            continue
+        stats = row_for(uid, cid)
+        stats.total_hours = hours or 0
+        stats.last_studied_at = last_date
+
+    stats_query.delete(synchronize_session=False)
+    db.add_all(rows.values())
+    db.commit()
+    return len(rows)
+
+
 # ---------- TESTS ----------
 def create_test(db: Session, user_id: int, course_id: int, questions: list, correct_answers: list):
     test = models.Test(
@@ -93,6 +253,7 @@ def create_test(db: Session, user_id: int, course_id: int, questions: list, corr
         score=None
     )
     db.add(test)
+    _record_test(db, user_id, course_id)
     db.commit()
     db.refresh(test)
     return test
@@ -106,12 +267,12 @@ def get_test_score(db: Session, test_id: int):
 
 def get_user_average_score(db: Session, user_id: int):
     """Return the average score of all tests for a given user"""
-    avg_score = (
-        db.query(func.avg(models.Test.score))
-        .filter(models.Test.user_id == user_id)
-        .scalar()
+    total_score, total_count = (
+        db.query(func.sum(models.UserCourseStat.score_sum), func.sum(models.UserCourseStat.test_count))
+        .filter(models.UserCourseStat.user_id == user_id)
+        .one()
     )
-    return round(avg_score, 2) if avg_score else 0
+    return round(total_score / total_count, 2) if total_count else 0
 
 
 def submit_test(db: Session, test_id: int, student_answers: list):
@@ -120,6 +281,7 @@ def submit_test(db: Session, test_id: int, student_answers: list):
         return None
 
     test.student_answers = student_answers
+    old_score = test.score
 
     # Auto-calculate score
     correct = 0
@@ -128,12 +290,33 @@ def submit_test(db: Session, test_id: int, student_answers: list):
             correct += 1
     test.score = int((correct / len(test.correct_answers)) * 100) if test.correct_answers else 0
 
+    _record_score(db, test, old_score)
     db.commit()
     db.refresh(test)
     return test
 
-def list_tests(db: Session, user_id: int):
-    return db.query(models.Test).filter(models.Test.user_id == user_id).all()
+def list_tests(db: Session, user_id: int, limit: int | None = None, cursor: str | None = None) -> Page:
+    # The JSON question/answer blobs are only loaded if accessed
+    stmt = (
+        select(models.Test)
+        .options(defer(models.Test.questions), defer(models.Test.correct_answers), defer(models.Test.student_answers))
+        .where(models.Test.user_id == user_id)
+    )
+    return paginate(db, stmt, [models.Test.id], limit, cursor)
+
+def iter_user_tests(db: Session, user_id: int, include_questions: bool = False, batch_size: int = 500):
+    """Stream a user's tests in id order without materialising the whole history."""
+    columns = [models.Test.id, models.Test.course_id, models.Test.score, models.Test.created_at]
+    if include_questions:
+        columns += [models.Test.questions, models.Test.correct_answers, models.Test.student_answers]
+    stmt = (
+        select(*columns)
+        .where(models.Test.user_id == user_id)
+        .order_by(models.Test.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for row in db.execute(stmt):
+        yield row
 
 def get_course_tests(db: Session, user_id: int, course_id: int):
     return db.query(models.Test).filter(models.Test.user_id == user_id, models.Test.course_id == course_id).all()
@@ -142,6 +325,8 @@ def delete_test(db: Session, test_id: int):
     test = db.query(models.Test).filter(models.Test.id == test_id).first()
     if test:
         db.delete(test)
+        db.flush()
+        _refresh_stats(db, test.user_id, test.course_id)
         db.commit()
     return test
 
@@ -149,14 +334,168 @@ def delete_all_tests_for_user(db: Session, user_id: int):
     tests = db.query(models.Test).filter(models.Test.user_id == user_id).all()
     for t in tests:
         db.delete(t)
+    db.flush()
+    for course_id in {t.course_id for t in tests}:
+        _refresh_stats(db, user_id, course_id)
     db.commit()
     return len(tests)
 
 
+# ---------- QUESTION BANK ----------
+def normalize_question(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivially different phrasings dedupe."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+def question_hash(text: str) -> str:
+    return hashlib.sha256(normalize_question(text).encode()).hexdigest()
+
+def add_bank_questions(db: Session, course_id: int, questions: list) -> int:
+    """Store well-formed questions for a course, skipping ones already in its bank. Returns how many were added."""
+    candidates = {}
+    for q in questions:
+        if not isinstance(q, dict) or not q.get("question") or not q.get("options") or not q.get("answer"):
+            continue
+        candidates.setdefault(question_hash(q["question"]), q)
+    if not candidates:
+        return 0
+
+    existing = set(db.scalars(
+        select(models.QuestionBankItem.question_hash).where(
+            models.QuestionBankItem.course_id == course_id,
+            models.QuestionBankItem.question_hash.in_(candidates.keys()),
+        )
+    ))
+    new_items = [
+        models.QuestionBankItem(
+            course_id=course_id, question=q["question"], options=q["options"], answer=q["answer"], question_hash=h
+        )
+        for h, q in candidates.items() if h not in existing
+    ]
+    db.add_all(new_items)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent refill stored some of these first; keep the rest one by one
+        db.rollback()
+        added = 0
+        for item in new_items:
+            try:
+                with db.begin_nested():
+                    db.add(models.QuestionBankItem(
+                        course_id=item.course_id, question=item.question, options=item.options,
+                        answer=item.answer, question_hash=item.question_hash,
+                    ))
+                added += 1
+            except IntegrityError:
+                pass
+        db.commit()
+        return added
+    return len(new_items)
+
+def count_bank_questions(db: Session, course_id: int) -> int:
+    return db.scalar(
+        select(func.count(models.QuestionBankItem.id)).where(models.QuestionBankItem.course_id == course_id)
+    )
+
+def sample_bank_questions(db: Session, course_id: int, n: int) -> list:
+    """Up to n random questions from the course's bank, in the same shape Gemini returns."""
+    items = db.scalars(
+        select(models.QuestionBankItem)
+        .where(models.QuestionBankItem.course_id == course_id)
+        .order_by(func.random())
+        .limit(n)
+    ).all()
+    return [{"question": i.question, "options": i.options, "answer": i.answer} for i in items]
+
+
+# ---------- JOBS ----------
+def create_job(db: Session, job_id: str, kind: str, params: dict, user_id: int | None = None):
+    job = models.Job(id=job_id, kind=kind, status="queued", params=params, user_id=user_id, attempts=0)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def get_job(db: Session, job_id: str):
+    return db.get(models.Job, job_id)
+
+def claim_job(db: Session, kinds: list[str], lease_seconds: float):
+    """Move the oldest runnable job of these kinds to running and return it, or None if there is nothing to do.
+
+    Runnable means queued, or running with a lapsed lease (its process died mid-job). The
+    conditional UPDATE makes the claim safe when several workers or processes race for it.
+    """
+    now = datetime.now(timezone.utc)
+    runnable = or_(
+        models.Job.status == "queued",
+        and_(models.Job.status == "running", models.Job.locked_until < now),
+    )
+    for _ in range(5):
+        job_id = db.scalar(
+            select(models.Job.id)
+            .where(models.Job.kind.in_(kinds), runnable)
+            .order_by(models.Job.created_at)
+            .limit(1)
+        )
+        if job_id is None:
+            return None
+        claimed = db.execute(
+            update(models.Job)
+            .where(models.Job.id == job_id, runnable)
+            .values(
+                status="running",
+                attempts=models.Job.attempts + 1,
+                started_at=now,
+                locked_until=now + timedelta(seconds=lease_seconds),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.get(models.Job, job_id)
+    return None
+
+def finish_job(db: Session, job_id: str, status: str, result: dict | None = None, error: str | None = None):
+    db.execute(
+        update(models.Job)
+        .where(models.Job.id == job_id)
+        .values(status=status, result=result, error=error, finished_at=datetime.now(timezone.utc), locked_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def requeue_job(db: Session, job_id: str):
+    """Hand a job back after a clean shutdown, without counting the interrupted run as an attempt."""
+    db.execute(
+        update(models.Job)
+        .where(models.Job.id == job_id, models.Job.status == "running")
+        .values(status="queued", attempts=models.Job.attempts - 1, locked_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def prune_jobs(db: Session, older_than: datetime) -> list[str]:
+    """Delete jobs that finished before the cutoff; returns their ids so their files can be removed."""
+    ids = list(db.scalars(
+        select(models.Job.id).where(
+            models.Job.status.in_(("succeeded", "failed")), models.Job.finished_at < older_than
+        )
+    ))
+    if ids:
+        db.execute(delete(models.Job).where(models.Job.id.in_(ids)))
+        db.commit()
+    return ids
+
+def count_jobs_by_status(db: Session) -> dict:
+    return dict(db.execute(select(models.Job.status, func.count()).group_by(models.Job.status)).all())
+
+
 # ---------- STUDY LOG ----------
 def create_study_log(db: Session, user_id: int, course_id: int, hours_studied: int):
     study_log = models.StudyLog(user_id=user_id, course_id=course_id, hours_studied=hours_studied)
     db.add(study_log)
+    _record_study(db, user_id, course_id, hours_studied, datetime.now(timezone.utc))
     db.commit()
     db.refresh(study_log)
     return study_log
@@ -164,6 +503,17 @@ def create_study_log(db: Session, user_id: int, course_id: int, hours_studied: i
 def get_study_logs_by_user(db: Session, user_id: int):
     return db.query(models.StudyLog).filter(models.StudyLog.user_id == user_id).all()
 
+def iter_user_study_logs(db: Session, user_id: int, batch_size: int = 500):
+    """Stream a user's study logs in id order without materialising the whole history."""
+    stmt = (
+        select(models.StudyLog.id, models.StudyLog.course_id, models.StudyLog.hours_studied, models.StudyLog.date)
+        .where(models.StudyLog.user_id == user_id)
+        .order_by(models.StudyLog.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for row in db.execute(stmt):
+        yield row
+
 def get_weekly_study_hours(db: Session, user_id: int):
     one_week_ago = datetime.now(timezone.utc) - timedelta(days=7)
     results = (
@@ -175,10 +525,10 @@ def get_weekly_study_hours(db: Session, user_id: int):
     return results
 
 def get_average_scores_by_course(db: Session, user_id: int):
+    stats = models.UserCourseStat
     results = (
-        db.query(models.Test.course_id, func.avg(models.Test.score).label("avg_score"))
-        .filter(models.Test.user_id == user_id)
-        .group_by(models.Test.course_id)
+        db.query(stats.course_id, average_score(stats).label("avg_score"))
+        .filter(stats.user_id == user_id, stats.tests_taken > 0)
         .all()
     )
     return results
@@ -187,6 +537,8 @@ def delete_study_log(db: Session, log_id: int):
     log = db.query(models.StudyLog).filter(models.StudyLog.id == log_id).first()
     if log:
         db.delete(log)
+        db.flush()
+        _refresh_stats(db, log.user_id, log.course_id)
         db.commit()
         return True
     return False
@@ -211,11 +563,30 @@ def create_resource(db: Session, title: str, url: str, type: str, course_id: int
     return resource
 
 
-def list_resources(db: Session, course_id: int | None = None):
-    query = db.query(models.Resource)
+def resources_stmt(course_id: int | None = None):
+    stmt = select(models.Resource)
     if course_id:
-        query = query.filter(models.Resource.course_id == course_id)
-    return query.all()
+        stmt = stmt.where(models.Resource.course_id == course_id)
+    return stmt
+
+def list_resources(db: Session, course_id: int | None = None, limit: int | None = None, cursor: str | None = None) -> Page:
+    return paginate(db, resources_stmt(course_id), [models.Resource.id], limit, cursor)
+
+
+def list_course_pdf_resources(db: Session, course_id: int):
+    """(id, title, url) of the course's uploaded PDFs, for the chatbot retrieval index."""
+    return db.execute(
+        select(models.Resource.id, models.Resource.title, models.Resource.url)
+        .where(models.Resource.course_id == course_id, models.Resource.type == "pdf")
+    ).all()
+
+
+def list_pdf_resources(db: Session):
+    """(id, course_id, title, url) of every uploaded course PDF, to index at startup."""
+    return db.execute(
+        select(models.Resource.id, models.Resource.course_id, models.Resource.title, models.Resource.url)
+        .where(models.Resource.course_id.is_not(None), models.Resource.type == "pdf")
+    ).all()
 
 
 def delete_resource(db: Session, resource_id: int):
@@ -230,8 +601,7 @@ def delete_resource(db: Session, resource_id: int):
 def upload_pdf_resource(db: Session, file, course_id: int, title: str):
     """Save PDF locally and store as resource"""
     filepath = os.path.join(UPLOAD_FOLDER, file.filename)
-    with open(filepath, "wb") as f:
-        f.write(file.file.read())
+    save_upload(file, filepath)
 
     resource = models.Resource(
         course_id=course_id,
@@ -242,6 +612,7 @@ def upload_pdf_resource(db: Session, file, course_id: int, title: str):
     db.add(resource)
     db.commit()
     db.refresh(resource)
+    return resource
 
 
 def generate_ai_resources_for_weak_courses(db: Session, user_id: int):
@@ -299,9 +670,13 @@ def leave_group(db: Session, group_id: int, user_id: int):
         db.commit()
     return group
 
-def list_group_members(db: Session, group_id: int):
-    group = db.query(models.StudyGroup).filter(models.StudyGroup.id == group_id).first()
-    return group.members if group else []
+def list_group_members(db: Session, group_id: int, limit: int | None = None, cursor: str | None = None) -> Page:
+    stmt = (
+        select(models.User)
+        .join(models.group_members_table, models.group_members_table.c.user_id == models.User.id)
+        .where(models.group_members_table.c.group_id == group_id)
+    )
+    return paginate(db, stmt, [models.User.id], limit, cursor)
 
 def list_user_groups(db: Session, user_id: int):
     user = db.query(models.User).filter(models.User.id == user_id).first()
@@ -393,18 +768,116 @@ def generate_personalized_timetable(school_timetable, habits):
 
 # ---------- DASHBOARD ----------
 def get_dashboard_data(db: Session, user_id: int):
-    study_data = (
-        db.query(models.StudyLog.course_id, func.sum(models.StudyLog.hours_studied).label("total_hours"))
-        .filter(models.StudyLog.user_id == user_id)
-        .group_by(models.StudyLog.course_id)
-        .all()
+    stats = get_user_course_stats(db, user_id)
+
+    study_data = [(row.course_id, row.total_hours) for row in stats if row.total_hours]
+    test_data = [
+        (row.course_id, row.score_sum / row.test_count if row.test_count else None)
+        for row in stats if row.tests_taken
+    ]
+
+    return {"study_data": study_data, "test_data": test_data}
+
+
+# ---------- PERFORMANCE SUMMARY ----------
+# Statements are built once here and executed by both the sync functions below
+# and their async counterparts in database/async_crud.py.
+def course_scores_stmt(user_id: int):
+    """Per-course score aggregates (from user_course_stats) with the course code/title joined in.
+
+    One row per course the user has taken tests in; avg_score is NULL until one is scored.
+    """
+    stats = models.UserCourseStat
+    return (
+        select(
+            stats.course_id,
+            models.Course.code,
+            models.Course.title,
+            average_score(stats).label("avg_score"),
+            stats.score_sum,
+            stats.test_count,
+        )
+        .outerjoin(models.Course, models.Course.id == stats.course_id)
+        .where(stats.user_id == user_id, stats.tests_taken > 0)
     )
 
-    test_data = (
-        db.query(models.Test.course_id, func.avg(models.Test.score).label("avg_score"))
-        .filter(models.Test.user_id == user_id)
-        .group_by(models.Test.course_id)
-        .all()
+def weekly_course_hours_stmt(user_id: int):
+    """Study hours per course over the last 7 days with the course code/title joined in."""
+    one_week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    return (
+        select(
+            models.StudyLog.course_id,
+            models.Course.code,
+            models.Course.title,
+            func.sum(models.StudyLog.hours_studied).label("total_hours"),
+        )
+        .outerjoin(models.Course, models.Course.id == models.StudyLog.course_id)
+        .where(models.StudyLog.user_id == user_id, models.StudyLog.date >= one_week_ago)
+        .group_by(models.StudyLog.course_id, models.Course.code, models.Course.title)
     )
 
-    return {"study_data": study_data, "test_data": test_data}
+def test_trend_stmt(user_id: int):
+    """Test scores over time with the course code/title joined in."""
+    return (
+        select(
+            models.Test.course_id,
+            models.Course.code,
+            models.Course.title,
+            models.Test.score,
+            models.Test.created_at,
+        )
+        .outerjoin(models.Course, models.Course.id == models.Test.course_id)
+        .where(models.Test.user_id == user_id)
+        .order_by(models.Test.created_at.asc())
+    )
+
+def study_trend_stmt(user_id: int):
+    """Study hours per day."""
+    day = func.date(models.StudyLog.date)
+    return (
+        select(day, func.sum(models.StudyLog.hours_studied))
+        .where(models.StudyLog.user_id == user_id)
+        .group_by(day)
+        .order_by(day.asc())
+    )
+
+def get_course_scores(db: Session, user_id: int):
+    return db.execute(course_scores_stmt(user_id)).all()
+
+def get_weekly_course_hours(db: Session, user_id: int):
+    return db.execute(weekly_course_hours_stmt(user_id)).all()
+
+def get_test_trend(db: Session, user_id: int):
+    return db.execute(test_trend_stmt(user_id)).all()
+
+def get_study_trend(db: Session, user_id: int):
+    return db.execute(study_trend_stmt(user_id)).all()
+
+def build_performance_summary(course_scores, weekly_study, test_trend=None, study_trend=None):
+    # Overall average is weighted by number of scored tests, same as AVG(score)
+    total_score = sum(row.score_sum or 0 for row in course_scores)
+    total_count = sum(row.test_count for row in course_scores)
+    overall_avg = round(total_score / total_count, 2) if total_count else 0
+
+    summary = {
+        "overall_avg": overall_avg,
+        "course_scores": course_scores,
+        "weekly_study": weekly_study,
+    }
+    if test_trend is not None:
+        summary["test_trend"] = test_trend
+        summary["study_trend"] = study_trend
+    return summary
+
+def get_performance_summary(db: Session, user_id: int, include_trends: bool = True):
+    """
+    Everything the performance page, the PDF report and the dashboard need,
+    in a fixed number of queries regardless of how much history the user has.
+    """
+    course_scores = get_course_scores(db, user_id)
+    weekly_study = get_weekly_course_hours(db, user_id)
+    if not include_trends:
+        return build_performance_summary(course_scores, weekly_study)
+    return build_performance_summary(
+        course_scores, weekly_study, get_test_trend(db, user_id), get_study_trend(db, user_id)
+    )
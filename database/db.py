@@ -1,6 +1,9 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.pool import NullPool
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
@@ -15,7 +18,135 @@ connect_args = {}
 if database_url.startswith("postgresql"):
     connect_args["sslmode"] = "require"
 
-engine = create_engine(database_url, connect_args=connect_args)
+# === POOL CONFIG ===
+# A connection is only held while a sync handler runs on a threadpool worker,
+# so keep DB_POOL_SIZE + DB_MAX_OVERFLOW >= the threadpool size (40 by default)
+# per worker process.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 30))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_DISABLED = os.getenv("DB_POOL_DISABLED", "false").lower() in ("1", "true", "yes")
+
+
+class PoolMetrics:
+    """Counters for connection checkout wait and hold times."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checked_out = 0
+            self.max_checked_out = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.usage_seconds_total = 0.0
+            self.usage_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def record_checkin(self, held_seconds: float | None):
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+            if held_seconds is not None:
+                self.usage_seconds_total += held_seconds
+                self.usage_seconds_max = max(self.usage_seconds_max, held_seconds)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            checkouts = self.checkouts or 1
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / checkouts, 6),
+                "usage_seconds_total": round(self.usage_seconds_total, 6),
+                "usage_seconds_max": round(self.usage_seconds_max, 6),
+                "usage_seconds_avg": round(self.usage_seconds_total / checkouts, 6),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+
+engine_kwargs = {"connect_args": connect_args, "pool_pre_ping": DB_POOL_PRE_PING}
+if DB_POOL_DISABLED:
+    engine_kwargs["poolclass"] = NullPool
+elif not database_url.startswith("sqlite") or ":memory:" not in database_url:
+    engine_kwargs.update(
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+
+engine = create_engine(database_url, **engine_kwargs)
+
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.record_connect()
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info["checked_out_at"] = time.perf_counter()
+    pool_metrics.record_checkout()
+
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    started = connection_record.info.pop("checked_out_at", None)
+    pool_metrics.record_checkin(time.perf_counter() - started if started is not None else None)
+
+
+def get_pool_stats() -> dict:
+    pool = engine.pool
+    stats = {"pool": pool.status(), **pool_metrics.snapshot()}
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), overflow=pool.overflow(), checked_in=pool.checkedin(), timeout=pool.timeout())
+    return stats
+
 
 Base = declarative_base()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -23,3 +154,18 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 print("Connected to database successfully ✅")
 
 
+# === REQUEST-SCOPED SESSION DEPENDENCY ===
+async def get_db():
+    """
+    One session per request. FastAPI caches dependencies per request, so routes
+    and get_current_user share it.
+
+    This is async on purpose: a sync generator's cleanup needs a threadpool slot
+    to give the connection back, and under load every slot can be busy waiting
+    for a connection, which deadlocks until the pool times out.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,142 @@
+# database/migrations.py
+"""
+Versioned schema migrations.
+
+Each migration is a (version, name, function) entry in MIGRATIONS. Applied
+versions are recorded in the schema_migrations table, and run_migrations()
+applies whatever is pending, each in its own transaction. Migrations must be
+idempotent (use checkfirst) because a fresh database gets the full current
+schema from the baseline.
+
+Usage:
+    python -m database.migrations            # apply pending migrations
+    python -m database.migrations status     # show applied / pending
+"""
+import sys
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .db import Base
+from . import crud, models
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+# ---------- Helpers ----------
+def create_tables(*tables):
+    """Models or plain Table objects (association tables)."""
+    def migrate(conn: Connection):
+        Base.metadata.create_all(bind=conn, tables=[getattr(t, "__table__", t) for t in tables], checkfirst=True)
+    return migrate
+
+
+def create_indexes(*indexes):
+    def migrate(conn: Connection):
+        for index in indexes:
+            index.create(bind=conn, checkfirst=True)
+    return migrate
+
+
+def _index(model, name):
+    return next(i for i in model.__table__.indexes if i.name == name)
+
+
+# ---------- Migrations ----------
+# The schema as it stood before versioned migrations. Tables added since then
+# get their own migration below, so version 1 means the same thing on every database.
+baseline = create_tables(
+    models.User,
+    models.Department,
+    models.Course,
+    models.Test,
+    models.StudyLog,
+    models.Resource,
+    models.StudyGroup,
+    models.StudyTimetable,
+    models.StudyHabit,
+    models.course_department_table,
+    models.group_members_table,
+)
+
+
+def user_course_stats(conn: Connection):
+    """Create the rollup table and backfill it from existing tests and study logs."""
+    create_tables(models.UserCourseStat)(conn)
+    crud.rebuild_user_course_stats(Session(bind=conn))
+
+
+def user_course_stats_tests_taken(conn: Connection):
+    """Count unscored tests in the rollup too, then backfill it."""
+    # Databases that ran migration 5 after the column was added already have it
+    if "tests_taken" not in {c["name"] for c in inspect(conn).get_columns("user_course_stats")}:
+        conn.execute(text("ALTER TABLE user_course_stats ADD COLUMN tests_taken INTEGER NOT NULL DEFAULT 0"))
+    crud.rebuild_user_course_stats(Session(bind=conn))
+
+
+MIGRATIONS = [
+    (1, "baseline", baseline),
+    (2, "hot_path_indexes", create_indexes(
+        _index(models.Test, "ix_tests_user_course_created"),
+        _index(models.StudyLog, "ix_study_logs_user_date"),
+        _index(models.StudyTimetable, "ix_study_timetables_user"),
+        _index(models.Resource, "ix_resources_course"),
+        _index(models.StudyHabit, "ix_study_habits_user"),
+    )),
+    (3, "question_bank", create_tables(models.QuestionBankItem)),
+    (4, "jobs", create_tables(models.Job)),
+    (5, "user_course_stats", user_course_stats),
+    (6, "catalog_version", create_tables(models.CatalogVersion)),
+    (7, "user_course_stats_tests_taken", user_course_stats_tests_taken),
+]
+
+
+# ---------- Runner ----------
+def applied_versions(engine: Engine) -> set[int]:
+    migration_metadata.create_all(bind=engine, checkfirst=True)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(select(schema_migrations.c.version))}
+
+
+def pending_migrations(engine: Engine):
+    applied = applied_versions(engine)
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def run_migrations(engine: Engine, verbose: bool = False):
+    """Apply all pending migrations in version order. Returns the versions applied."""
+    done = []
+    for version, name, migrate in sorted(pending_migrations(engine), key=lambda m: m[0]):
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name))
+        if verbose:
+            print(f"✅ Applied migration {version}: {name}")
+        done.append(version)
+    return done
+
+
+if __name__ == "__main__":
+    from .db import engine
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+
+    if command == "upgrade":
+        applied = run_migrations(engine, verbose=True)
+        print("🎉 Database is up to date." if applied else "✅ No pending migrations.")
+    elif command == "status":
+        applied = applied_versions(engine)
+        for version, name, _ in MIGRATIONS:
+            print(f"{'✅' if version in applied else '⏳'} {version}: {name}")
+    else:
+        print(__doc__)
+        sys.exit(2)
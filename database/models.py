@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Table, ForeignKey, func, Boolean, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Table, ForeignKey, func, Boolean, JSON, Index, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .db import Base
 
@@ -69,6 +69,9 @@ class Course(Base):
 # ---------------- Test ---------------- #
 class Test(Base):
     __tablename__ = "tests"
+    __table_args__ = (
+        Index("ix_tests_user_course_created", "user_id", "course_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -89,6 +92,9 @@ class Test(Base):
 # ---------------- StudyLog ---------------- #
 class StudyLog(Base):
     __tablename__ = "study_logs"
+    __table_args__ = (
+        Index("ix_study_logs_user_date", "user_id", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -103,6 +109,9 @@ class StudyLog(Base):
 # ---------------- Resource ---------------- #
 class Resource(Base):
     __tablename__ = "resources"
+    __table_args__ = (
+        Index("ix_resources_course", "course_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     course_id = Column(Integer, ForeignKey("courses.id"))
@@ -129,6 +138,9 @@ class StudyGroup(Base):
 # ---------------- StudyTimetable ---------------- #
 class StudyTimetable(Base):
     __tablename__ = "study_timetables"
+    __table_args__ = (
+        Index("ix_study_timetables_user", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -142,6 +154,9 @@ class StudyTimetable(Base):
 
 class StudyHabit(Base):
     __tablename__ = "study_habits"
+    __table_args__ = (
+        Index("ix_study_habits_user", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -151,3 +166,69 @@ class StudyHabit(Base):
     break_minutes = Column(Integer, default=15)
 
     user = relationship("User", backref="study_habits")
+
+
+# ---------------- QuestionBank ---------------- #
+class QuestionBankItem(Base):
+    """A generated MCQ kept per course so tests can be assembled without calling Gemini."""
+    __tablename__ = "question_bank"
+    __table_args__ = (
+        UniqueConstraint("course_id", "question_hash", name="uq_question_bank_course_hash"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    question = Column(Text, nullable=False)
+    options = Column(JSON, nullable=False)
+    answer = Column(String, nullable=False)
+    question_hash = Column(String(64), nullable=False)  # sha256 of the normalized question text
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    courses = relationship("Course", backref="question_bank")
+
+
+# ---------------- UserCourseStat ---------------- #
+class UserCourseStat(Base):
+    """Running per-user/per-course rollup of tests and study logs, kept in step by crud writes."""
+    __tablename__ = "user_course_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), primary_key=True)
+    tests_taken = Column(Integer, nullable=False, default=0, server_default="0")  # every test, scored or not
+    test_count = Column(Integer, nullable=False, default=0)  # scored tests only
+    score_sum = Column(Integer, nullable=False, default=0)
+    last_score = Column(Integer, nullable=True)
+    total_hours = Column(Integer, nullable=False, default=0)
+    last_studied_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# ---------------- Catalog Version ---------------- #
+class CatalogVersion(Base):
+    """Single-row counter bumped whenever courses/departments change, so every worker can tell its cached catalog is stale."""
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# ---------------- Job ---------------- #
+class Job(Base):
+    """A long-running task (test generation, PDF summary, timetable OCR, report render) run by utils.jobs workers."""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_created", "status", "created_at"),
+    )
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex; doubles as the capability to read the result
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued | running | succeeded | failed
+    user_id = Column(Integer, nullable=True)  # who submitted it, when known; not enforced so submits never wait on the users table
+    params = Column(JSON, nullable=False)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # a running job whose lease lapsed is picked up again
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
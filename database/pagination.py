@@ -0,0 +1,131 @@
+# database/pagination.py
+"""
+Keyset (cursor) pagination.
+
+A page is fetched with `WHERE (k1, k2, ...) > (:last_k1, :last_k2, ...)
+ORDER BY k1, k2, ... LIMIT :limit + 1`, so the cost of a page depends on the
+page size, not on how deep into the table it is. The cursor handed back to
+clients is an opaque, URL-safe encoding of the last row's key values.
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import DateTime, Integer, String, tuple_
+from sqlalchemy.orm import Session
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class Page:
+    items: list = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def check_key_type(value, expected: type):
+    """A cursor value must have its key's type, or comparing it fails (TypeError, or a DB error on Postgres)."""
+    if isinstance(value, bool) or not isinstance(value, expected):
+        raise InvalidCursor("Pagination cursor does not match this listing")
+
+
+def decode_cursor(cursor: str, key_columns: list) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise InvalidCursor("Malformed pagination cursor")
+    if not isinstance(values, list) or len(values) != len(key_columns):
+        raise InvalidCursor("Pagination cursor does not match this listing")
+
+    decoded = []
+    for column, value in zip(key_columns, values):
+        if isinstance(column.type, DateTime) and isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                raise InvalidCursor("Malformed pagination cursor")
+        elif isinstance(column.type, Integer):
+            check_key_type(value, int)
+        elif isinstance(column.type, String):
+            check_key_type(value, str)
+        decoded.append(value)
+    return decoded
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_stmt(stmt, key_columns: list, limit: int, cursor: Optional[str]):
+    """Apply keyset ordering/filtering to a select() of ORM entities; fetches one extra row to detect a next page."""
+    if cursor:
+        values = decode_cursor(cursor, key_columns)
+        if len(key_columns) == 1:
+            stmt = stmt.where(key_columns[0] > values[0])
+        else:
+            stmt = stmt.where(tuple_(*key_columns) > tuple_(*values))
+    return stmt.order_by(*key_columns).limit(limit + 1)
+
+
+def build_page(rows: list, key_columns: list, limit: int) -> Page:
+    if len(rows) <= limit:
+        return Page(items=rows)
+    items = rows[:limit]
+    last = items[-1]
+    return Page(items=items, next_cursor=encode_cursor([getattr(last, c.key) for c in key_columns]))
+
+
+def paginate(db: Session, stmt, key_columns: list, limit: Optional[int] = None, cursor: Optional[str] = None) -> Page:
+    limit = clamp_limit(limit)
+    rows = db.scalars(keyset_stmt(stmt, key_columns, limit, cursor)).all()
+    return build_page(list(rows), key_columns, limit)
+
+
+async def apaginate(db, stmt, key_columns: list, limit: Optional[int] = None, cursor: Optional[str] = None) -> Page:
+    limit = clamp_limit(limit)
+    rows = (await db.scalars(keyset_stmt(stmt, key_columns, limit, cursor))).all()
+    return build_page(list(rows), key_columns, limit)
+
+
+def paginate_sorted(items, key: Any, limit: Optional[int] = None, cursor: Optional[str] = None) -> Page:
+    """Same contract over an in-memory sequence already sorted by the `key` attribute (e.g. the course catalog)."""
+    limit = clamp_limit(limit)
+    after = None
+    if cursor:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            (after,) = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except Exception:
+            raise InvalidCursor("Malformed pagination cursor")
+        if items:
+            check_key_type(after, type(getattr(items[0], key)))
+
+    # items are sorted, so binary search for the first one past the cursor
+    lo, hi = 0, len(items)
+    if after is not None:
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if getattr(items[mid], key) <= after:
+                lo = mid + 1
+            else:
+                hi = mid
+    window = list(items[lo:lo + limit + 1])
+    if len(window) <= limit:
+        return Page(items=window)
+    window = window[:limit]
+    return Page(items=window, next_cursor=encode_cursor([getattr(window[-1], key)]))
@@ -0,0 +1,19 @@
+from database.db import SessionLocal, engine
+from database import crud
+from database.migrations import run_migrations
+import sys
+
+if __name__ == "__main__":
+    # Usage: python -m database.rebuild_stats [user_id]
+    user_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    run_migrations(engine)
+
+    db = SessionLocal()
+    try:
+        scope = f"user {user_id}" if user_id is not None else "all users"
+        print(f"🔁 Rebuilding user_course_stats for {scope}...")
+        count = crud.rebuild_user_course_stats(db, user_id)
+        print(f"🎉 Rebuilt {count} user/course rows.")
+    finally:
+        db.close()
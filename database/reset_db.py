@@ -1,13 +1,11 @@
-from database.db import engine, Base
-from database import models  # ✅ Make sure all models are imported so SQLAlchemy knows them
+from database.db import engine
+from database.migrations import run_migrations
 
 if __name__ == "__main__":
-    # ⚠️ Drop all tables (use carefully, this deletes all data!)
-    # print("⚠️ Dropping all tables...")
-    # Base.metadata.drop_all(bind=engine)
+    # ⚠️ To start from an empty database, drop its tables first (this deletes all data!)
 
-    # ✅ Create all tables again
-    print("✅ Creating all tables...")
-    Base.metadata.create_all(bind=engine)
+    # ✅ Create all tables again and bring the schema up to the latest version
+    print("✅ Running migrations...")
+    run_migrations(engine, verbose=True)
 
     print("🎉 Database reset complete.")
@@ -1,18 +1,30 @@
 # controller.py
+import asyncio
 import os
-from google import genai
-from google.genai import types
+
 from dotenv import load_dotenv
+from google.genai import types
+from pdfsummarizer.utils import OCR_API_KEY, chunk_pages, count_pdf_pages, estimate_tokens, extract_pages_from_pdf
+from utils import llm_gateway, metrics, summary_cache
+from utils.single_flight import fingerprint, single_flight
+from utils.uploads import SpooledUpload, link_upload
 
 load_dotenv()
 
-# ✅ Configure Gemini with API key
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+# Map-reduce mode: PDFs with at least this many pages are summarized chunk by chunk from locally extracted text
+SUMMARY_MAP_REDUCE_MIN_PAGES = int(os.getenv("SUMMARY_MAP_REDUCE_MIN_PAGES", 40))
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", 6000))
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", 4))
+SUMMARY_CHUNK_RETRIES = int(os.getenv("SUMMARY_CHUNK_RETRIES", 2))
+SUMMARY_RETRY_BACKOFF_SECONDS = float(os.getenv("SUMMARY_RETRY_BACKOFF_SECONDS", 1))
+# Direct mode: PDFs up to this size are sent inline, larger ones go through the Files API by path
+PDF_INLINE_MAX_BYTES = int(os.getenv("PDF_INLINE_MAX_BYTES", 8 * 1024 * 1024))
 
-def summarize_pdf_with_gemini(file_bytes: bytes, filename: str = "document.pdf") -> str:
-    try:
+SUMMARY_MODES = ("auto", "direct", "map_reduce")
+
+SUMMARY_MODEL = "gemini-2.5-flash"
 
-        prompt = """
+SUMMARY_PROMPT = """
         You are an AI Study Assistant. Summarize this PDF document for students.
 
         - Highlight the key ideas clearly
@@ -20,19 +32,158 @@ def summarize_pdf_with_gemini(file_bytes: bytes, filename: str = "document.pdf")
         - Use simple, clear language (student-friendly)
         - Keep it concise but detailed enough for revision
         """
+SUMMARY_PROMPT_VERSION = "1"  # bump when any prompt here or SUMMARY_MODEL changes so cached summaries are not reused
+
+CHUNK_PROMPT = """
+        You are an AI Study Assistant. Below is the text of pages {first_page}-{last_page} of a longer
+        lecture pack. Write concise revision notes for this part only: key ideas, definitions,
+        formulas and anything likely to come up in an exam. Use short bullet points.
+        """
+
+CONDENSE_PROMPT = """
+        Below are revision notes for consecutive parts of one lecture pack. Merge them into a
+        single, shorter set of bullet-point notes, keeping every key idea and dropping repetition.
+        """
+
+MERGE_PROMPT = SUMMARY_PROMPT.replace(
+    "Summarize this PDF document for students.",
+    "Below are revision notes for consecutive parts of one PDF document. Combine them into one summary for students.",
+)
+
+async def _single_flight_on_own_copy(key: str, upload: SpooledUpload, run) -> str:
+    """Single-flight run(upload) on a link to the upload owned by the in-flight call.
+
+    The caller that starts the call may finish or disconnect (deleting its spooled file)
+    while joiners still wait on it, so the call reads its own copy, removed when it ends.
+    """
+    owned = {}
 
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[
-                types.Part.from_bytes(
-                data=file_bytes,
-                mime_type='application/pdf',
-                ),
-            prompt]
-        )
+    def make_call():
+        owned["upload"] = link_upload(upload, key)
+        return run(owned["upload"])
 
-        return response.text.strip()
+    return await single_flight.do(key, make_call, endpoint="pdf", on_done=lambda: owned["upload"].close())
+
+
+async def summarize_pdf_with_gemini(upload: SpooledUpload) -> str:
+    try:
+
+        async def call(upload: SpooledUpload):
+            if upload.size <= PDF_INLINE_MAX_BYTES:
+                file_bytes = await asyncio.get_running_loop().run_in_executor(None, upload.read_bytes)
+                document = types.Part.from_bytes(
+                    data=file_bytes,
+                    mime_type='application/pdf',
+                )
+                response_text = await llm_gateway.generate("pdf", [document, SUMMARY_PROMPT], model=SUMMARY_MODEL)
+                return response_text.strip()
+
+            document = await llm_gateway.upload_file("pdf", upload.path, mime_type="application/pdf")
+            try:
+                response_text = await llm_gateway.generate("pdf", [document, SUMMARY_PROMPT], model=SUMMARY_MODEL)
+            finally:
+                await llm_gateway.delete_file(document.name)
+            return response_text.strip()
+
+        # Re-uploads of the same PDF while a summary is being generated share that call
+        key = fingerprint("pdf", SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, upload.sha256)
+        return await _single_flight_on_own_copy(key, upload, call)
 
     except Exception as e:
         return f"⚠️ Gemini summarization failed: {str(e)}"
 
+
+
+# === MAP-REDUCE ===
+async def _generate_with_retry(prompt: str, text: str) -> str:
+    """One text-only summarization call, retried with exponential backoff."""
+    for attempt in range(SUMMARY_CHUNK_RETRIES + 1):
+        try:
+            response_text = await llm_gateway.generate("pdf", [prompt, text], model=SUMMARY_MODEL)
+            return response_text.strip()
+        except llm_gateway.LLMError:
+            if attempt == SUMMARY_CHUNK_RETRIES:
+                raise
+            await asyncio.sleep(SUMMARY_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+
+async def _summarize_chunks(prompt_for, chunks: list) -> list[str]:
+    limit = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+
+    async def summarize(chunk):
+        async with limit:
+            return await _generate_with_retry(prompt_for(chunk), chunk.text)
+
+    return await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+
+
+async def _map_reduce(pages: list[str]) -> str:
+    chunks = chunk_pages(pages, SUMMARY_CHUNK_TOKENS)
+    if not chunks:
+        raise ValueError("No text could be extracted from this PDF")
+
+    # Map: notes per chunk, in page order
+    notes = await _summarize_chunks(
+        lambda c: CHUNK_PROMPT.format(first_page=c.first_page, last_page=c.last_page), chunks
+    )
+
+    # Reduce: condense groups of notes until they fit in one call, then merge into the final format
+    while len(notes) > 1 and estimate_tokens("\n\n".join(notes)) > SUMMARY_CHUNK_TOKENS:
+        groups = chunk_pages(notes, SUMMARY_CHUNK_TOKENS)
+        if len(groups) == len(notes):
+            break  # each note is already a full chunk; condensing cannot shrink the input further
+        notes = await _summarize_chunks(lambda c: CONDENSE_PROMPT, groups)
+
+    return await _generate_with_retry(MERGE_PROMPT, "\n\n".join(notes))
+
+
+async def summarize_pdf_map_reduce(upload: SpooledUpload) -> str:
+    """Summarize from locally extracted text, chunk by chunk with bounded parallelism."""
+    try:
+
+        async def call(upload: SpooledUpload):
+            pages = await asyncio.get_running_loop().run_in_executor(
+                None, extract_pages_from_pdf, upload.path, OCR_API_KEY
+            )
+            return await _map_reduce(pages)
+
+        key = fingerprint("pdf-map-reduce", SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, upload.sha256)
+        return await _single_flight_on_own_copy(key, upload, call)
+
+    except Exception as e:
+        return f"⚠️ Gemini summarization failed: {str(e)}"
+
+
+async def resolve_mode(upload: SpooledUpload, mode: str) -> str:
+    if mode != "auto":
+        return mode
+    try:
+        pages = await asyncio.get_running_loop().run_in_executor(None, count_pdf_pages, upload.path)
+    except Exception:
+        return "direct"  # let Gemini report on PDFs PyMuPDF cannot open
+    return "map_reduce" if pages >= SUMMARY_MAP_REDUCE_MIN_PAGES else "direct"
+
+
+async def get_pdf_summary(upload: SpooledUpload, mode: str = "auto") -> tuple[str, bool]:
+    """Return (summary, cache hit), serving repeat uploads of the same PDF from the summary cache.
+
+    mode: "direct" sends the whole PDF to Gemini, "map_reduce" summarizes extracted
+    text in chunks, "auto" picks map_reduce for PDFs of SUMMARY_MAP_REDUCE_MIN_PAGES+ pages.
+    """
+    loop = asyncio.get_running_loop()
+    mode = await resolve_mode(upload, mode)
+    version = SUMMARY_PROMPT_VERSION if mode == "direct" else f"{SUMMARY_PROMPT_VERSION}-mr"
+    key = summary_cache.summary_key(upload.sha256, version)
+
+    summary = await loop.run_in_executor(None, summary_cache.read_cached, key)
+    metrics.record_cache("pdf", "summary", summary is not None)
+    if summary is not None:
+        return summary, True
+
+    if mode == "map_reduce":
+        summary = await summarize_pdf_map_reduce(upload)
+    else:
+        summary = await summarize_pdf_with_gemini(upload)
+    if not summary.startswith("⚠️"):
+        await loop.run_in_executor(None, summary_cache.write_cached, key, summary)
+    return summary, False
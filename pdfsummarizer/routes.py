@@ -1,30 +1,57 @@
 # pdfsummarizer/routes.py
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from pdfsummarizer.controller import summarize_pdf_with_gemini
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
+from auth.user_cache import CurrentUser
+from auth.utils import get_optional_user
+from pdfsummarizer.controller import get_pdf_summary, SUMMARY_MODES
+from utils.uploads import spool_upload
+from utils.admission import admission, upload_cost
+from utils import jobs
+from utils.jobs import job_queue
 
 router = APIRouter(prefix="/pdf", tags=["PDF Summarizer"])
 
-@router.post("/summarize")
-async def summarize_pdf(file: UploadFile = File(...)):
+def summary_response(filename: str, size: int, summary: str, cache_hit: bool) -> dict:
+    if summary.startswith("⚠️"):
+        raise HTTPException(status_code=500, detail=summary)
+
+    return {
+        "summary": summary,
+        "meta": {
+            "filename": filename,
+            "size_kb": round(size / 1024, 2),
+            "cache_hit": cache_hit,
+        },
+    }
+
+
+@router.post("/summarize", dependencies=[Depends(admission("pdf", cost=upload_cost))])
+async def summarize_pdf(
+    file: UploadFile = File(...),
+    mode: str = Query("auto", pattern="^(" + "|".join(SUMMARY_MODES) + ")$"),
+    async_mode: bool = Query(False, alias="async", description="Queue as a background job and answer 202 with its id"),
+    current_user: CurrentUser | None = Depends(get_optional_user),
+):
     """
     Accepts a PDF file and returns a student-friendly summary.
+
+    mode=map_reduce summarizes extracted text chunk by chunk (used automatically for long PDFs).
     """
 
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
-    file_bytes = await file.read()
+    with await spool_upload(file) as upload:
+        if async_mode:
+            owner = current_user.id if current_user else None
+            return jobs.accepted(await job_queue.submit("pdf.summarize", {"mode": mode}, user_id=owner, upload=upload))
+        summary, cache_hit = await get_pdf_summary(upload, mode=mode)
 
-    summary = summarize_pdf_with_gemini(file_bytes, filename=file.filename)
+    return summary_response(file.filename, upload.size, summary, cache_hit)
 
-    if summary.startswith("⚠️"):
-        raise HTTPException(status_code=500, detail=summary)
 
-    return {
-        "summary": summary,
-        "meta": {
-            "filename": file.filename,
-            "size_kb": round(len(file_bytes) / 1024, 2),
-        },
-    }
+@jobs.register("pdf.summarize", pool="ai")
+async def summarize_pdf_job(job_id: str, params: dict) -> dict:
+    upload = jobs.job_upload(job_id, params)
+    summary, cache_hit = await get_pdf_summary(upload, mode=params["mode"])
+    return summary_response(upload.filename, upload.size, summary, cache_hit)
@@ -1,9 +1,17 @@
 import fitz
 import requests
 from PIL import Image
+import hashlib
 import io
 import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from cachetools import LRUCache
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Load environment variables from .env file
 load_dotenv()
@@ -11,26 +19,52 @@ load_dotenv()
 # Get your API key from environment variable
 OCR_API_KEY = os.getenv("OCR_API_KEY", "helloworld") 
 
+# "ocrspace" (OCR.space API) or "tesseract" (local pytesseract, works offline)
+OCR_ENGINE = os.getenv("OCR_ENGINE", "ocrspace").lower()
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", 4))
+OCR_RENDER_WORKERS = int(os.getenv("OCR_RENDER_WORKERS", 2))
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", 2000))
+OCR_TIMEOUT_SECONDS = float(os.getenv("OCR_TIMEOUT_SECONDS", 60))
+# Below this many image-only pages, rendering inline is cheaper than shipping work to the process pool
+OCR_POOL_MIN_PAGES = 4
+
+
+# === OCR ENGINES ===
+_session = None
+_ocr_executor = None
+_render_pool = None
+_ocr_cache = LRUCache(maxsize=OCR_CACHE_SIZE)
+_ocr_cache_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """One keep-alive session for all OCR.space calls, sized for OCR_CONCURRENCY parallel requests."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 502, 503, 504), allowed_methods=None)
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=OCR_CONCURRENCY, max_retries=retry))
+        _session = session
+    return _session
+
+
 def ocr_space_api(image_bytes, api_key='helloworld'):
     try:
-        response = requests.post(
+        response = get_session().post(
             'https://api.ocr.space/parse/image',
             files={'filename': ('image.png', image_bytes)},
-            data={'apikey': api_key, 'language': 'eng'}
+            data={'apikey': api_key, 'language': 'eng'},
+            timeout=OCR_TIMEOUT_SECONDS,
         )
 
-        # DEBUG: Print status code and raw content
-        print("🔁 OCR API Response Status:", response.status_code)
-        print("📄 Raw Response Content:\n", response.text[:500])  # Limit output size
-
         # Try parsing JSON
         try:
             result = response.json()
         except Exception as e:
-            raise RuntimeError("❌ Failed to parse JSON from OCR API") from e
+            raise RuntimeError(f"❌ Failed to parse JSON from OCR API (status {response.status_code})") from e
 
         if result.get("IsErroredOnProcessing"):
-            print("⚠️ OCR API error:", result)
+            print("⚠️ OCR API error:", result.get("ErrorMessage"))
             return ""
 
         return result['ParsedResults'][0]['ParsedText']
@@ -40,22 +74,165 @@ def ocr_space_api(image_bytes, api_key='helloworld'):
         return ""
 
 
+def ocr_tesseract(image_bytes):
+    import pytesseract
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            return pytesseract.image_to_string(image)
+    except Exception as e:
+        print("❌ Exception while running tesseract:", e)
+        return ""
+
+
+def ocr_image(image_bytes, api_key='helloworld', engine=None):
+    """OCR one page image with the configured engine, cached by the image's SHA-256."""
+    engine = engine or OCR_ENGINE
+    key = (engine, hashlib.sha256(image_bytes).hexdigest())
+    with _ocr_cache_lock:
+        cached = _ocr_cache.get(key)
+    if cached is not None:
+        return cached
+
+    text = ocr_tesseract(image_bytes) if engine == "tesseract" else ocr_space_api(image_bytes, api_key=api_key)
+    if text:  # don't cache failures
+        with _ocr_cache_lock:
+            _ocr_cache[key] = text
+    return text
+
+
+# === PAGE RENDERING ===
+def get_ocr_executor() -> ThreadPoolExecutor:
+    global _ocr_executor
+    if _ocr_executor is None:
+        _ocr_executor = ThreadPoolExecutor(max_workers=OCR_CONCURRENCY, thread_name_prefix="ocr")
+    return _ocr_executor
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=OCR_RENDER_WORKERS)
+    return _render_pool
+
+
+def shutdown_pools():
+    global _ocr_executor, _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+    if _ocr_executor is not None:
+        _ocr_executor.shutdown(wait=False, cancel_futures=True)
+        _ocr_executor = None
+
+
+def render_pages(source, page_numbers: list[int]) -> list[bytes]:
+    """PNG of each listed page (0-based). Runs in a worker process, so `source` should be a path."""
+    with open_pdf(source) as doc:
+        return [doc[number].get_pixmap().tobytes("png") for number in page_numbers]
+
+
+def _render_all(source, page_numbers: list[int]) -> list[bytes]:
+    if len(page_numbers) < OCR_POOL_MIN_PAGES:
+        return render_pages(source, page_numbers)
+    # One contiguous batch per worker; each worker opens the PDF once
+    size = -(-len(page_numbers) // OCR_RENDER_WORKERS)
+    batches = [page_numbers[i:i + size] for i in range(0, len(page_numbers), size)]
+    images = []
+    for batch in get_render_pool().map(render_pages, [source] * len(batches), batches):
+        images.extend(batch)
+    return images
+
+
+def open_pdf(source):
+    """Open a PDF from bytes or, preferably, a file path (MuPDF then reads it from disk as needed)."""
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source, filetype="pdf")
+
+
+def extract_pages_from_pdf(source, api_key='helloworld') -> list[str]:
+    """Text of each page, OCR-ing pages with no text layer. `source` is a path or bytes.
+
+    Image-only pages are rendered in a process pool and OCR-ed in parallel
+    (at most OCR_CONCURRENCY at a time); results come back in page order.
+    """
+    with open_pdf(source) as doc:
+        pages = [page.get_text("text") for page in doc]
+
+    scanned = [number for number, text in enumerate(pages) if not text.strip()]
+    if not scanned:
+        return pages
+
+    images = _render_all(source, scanned)
+    texts = get_ocr_executor().map(lambda image: ocr_image(image, api_key=api_key), images)
+    for number, text in zip(scanned, texts):
+        pages[number] = text
+    return pages
+
+
+def extract_text_from_pdf(source, api_key='helloworld') -> str:
+    return "\n".join(page + "\n" for page in extract_pages_from_pdf(source, api_key=api_key)).strip()
+
+
+def count_pdf_pages(source) -> int:
+    with open_pdf(source) as doc:
+        return doc.page_count
+
+
+# === CHUNKING ===
+CHARS_PER_TOKEN = 4  # rough estimate for English prose
+
+
+@dataclass
+class TextChunk:
+    first_page: int
+    last_page: int
+    text: str
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _split_page(text: str, max_chars: int) -> list[str]:
+    """Split one oversized page at paragraph breaks, hard-splitting paragraphs that are still too long."""
+    parts, current = [], ""
+    for para in re.split(r"\n\s*\n", text):
+        while len(para) > max_chars:
+            parts.append(para[:max_chars])
+            para = para[max_chars:]
+        if current and len(current) + len(para) + 2 > max_chars:
+            parts.append(current)
+            current = ""
+        current = f"{current}\n\n{para}" if current else para
+    if current:
+        parts.append(current)
+    return parts
+
 
-def extract_text_from_pdf(file_bytes: bytes, api_key='helloworld') -> str:
-    text = ""
-    doc = fitz.open(stream=file_bytes, filetype="pdf")
-    
-    for page in doc:
-        page_text = page.get_text("text")
-        if page_text.strip():
-            text += page_text + "\n"
+def chunk_pages(pages: list[str], max_tokens: int) -> list[TextChunk]:
+    """Group consecutive pages into chunks of at most ~max_tokens, never splitting a page unless it alone is too big."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks, current = [], None
+    for number, text in enumerate(pages, start=1):
+        text = text.strip()
+        if not text:
+            continue
+        if len(text) > max_chars:
+            if current:
+                chunks.append(current)
+                current = None
+            chunks.extend(TextChunk(number, number, part) for part in _split_page(text, max_chars))
+            continue
+        if current and len(current.text) + len(text) + 1 > max_chars:
+            chunks.append(current)
+            current = None
+        if current is None:
+            current = TextChunk(number, number, text)
         else:
-            # Render the page as an image
-            pix = page.get_pixmap()
-            img_bytes = pix.tobytes("png")
-
-            # Use OCR.space to extract text from image bytes
-            ocr_text = ocr_space_api(img_bytes, api_key=api_key)
-            text += ocr_text + "\n"
-    
-    return text.strip()
+            current.text += "\n" + text
+            current.last_page = number
+    if current:
+        chunks.append(current)
+    return chunks
@@ -1,18 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from database.db import SessionLocal
+from database.db import get_db
 from database import crud
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from schemas import schemas
+from typing import Optional
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 
 @router.post("/", response_model=schemas.CourseResponse)
 def create_course(course: schemas.CourseCreate, db: Session = Depends(get_db)):
@@ -29,9 +24,14 @@ def create_course(course: schemas.CourseCreate, db: Session = Depends(get_db)):
     )
 
 
-@router.get("/", response_model=list[schemas.CourseResponse])
-def list_courses(db: Session = Depends(get_db)):
-    return crud.list_courses(db)
+@router.get("/", response_model=schemas.CoursePage)
+def list_courses(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    page = crud.list_courses(db, limit, cursor)
+    return {"items": page.items, "next_cursor": page.next_cursor}
 
 @router.delete("/{course_id}")
 def delete_course(course_id: int, db: Session = Depends(get_db)):
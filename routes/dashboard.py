@@ -1,53 +1,27 @@
 # routes/dashboard.py
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth.utils import get_current_user
-from database.db import SessionLocal
-from database import crud, models
+from auth.user_cache import CurrentUser
+from auth.utils import get_current_user, get_current_user_async
+from database.db import get_db
+from database.async_db import get_async_db
+from database import async_crud, crud
 
 router = APIRouter()
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
-
-@router.get("/")
-def get_main_dashboard(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
-    user_id = current_user.id
-
-    test_trend = (
-        db.query(models.Test.course_id, models.Test.score, models.Test.created_at)
-        .filter(models.Test.user_id == user_id)
-        .order_by(models.Test.created_at.asc())
-        .all()
-    )
+def dashboard_response(user, test_trend, study_trend):
     test_trend_named = [
-        {"course": f"{c.code} - {c.title}" if (c := db.query(models.Course).get(cid)) else f"Course {cid}",
-         "score": score, "date": created_at}
-        for cid, score, created_at in test_trend
+        {"course": f"{row.code} - {row.title}" if row.code else f"Course {row.course_id}",
+         "score": row.score, "date": row.created_at}
+        for row in test_trend
     ]
-
-    study_trend = (
-        db.query(func.date(models.StudyLog.date), func.sum(models.StudyLog.hours_studied))
-        .filter(models.StudyLog.user_id == user_id)
-        .group_by(func.date(models.StudyLog.date))
-        .order_by(func.date(models.StudyLog.date).asc())
-        .all()
-    )
     study_trend_named = [{"date": str(date), "hours": hrs} for date, hrs in study_trend]
 
     return {
-        "user": {"name": current_user.name, "level": current_user.level},
+        "user": {"name": user.name, "level": user.level},
         "progress_trend": test_trend_named,
         "study_hours_trend": study_trend_named,
         "quick_actions": [
@@ -59,3 +33,26 @@ def get_main_dashboard(
         ],
     }
 
+
+@router.get("/")
+def get_main_dashboard(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    user_id = current_user.id
+    return dashboard_response(current_user, crud.get_test_trend(db, user_id), crud.get_study_trend(db, user_id))
+
+
+# -------- Async variant (USE_ASYNC_DB) -------- #
+async_router = APIRouter()
+
+
+@async_router.get("/")
+async def get_main_dashboard_async(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    user_id = current_user.id
+    return dashboard_response(
+        current_user, await async_crud.get_test_trend(db, user_id), await async_crud.get_study_trend(db, user_id)
+    )
@@ -1,18 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from database.db import SessionLocal
+from database.db import get_db
 from database import crud
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from schemas import schemas
 from pydantic import BaseModel
+from typing import Optional
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # ---------- SCHEMAS ----------
 class DepartmentCreate(BaseModel):
     name: str
@@ -26,8 +22,26 @@ def create_department(dept: DepartmentCreate, db: Session = Depends(get_db)):
     return crud.create_department(db, dept.name)
 
 @router.get("/")
-def list_departments(db: Session = Depends(get_db)):
-    return crud.list_departments(db)
+def list_departments(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    page = crud.list_departments(db, limit, cursor)
+    return {"items": page.items, "next_cursor": page.next_cursor}
+
+@router.get("/{dept_id}/courses", response_model=schemas.CoursePage)
+def list_department_courses(
+    dept_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Courses offered by a department, served from the in-memory catalog."""
+    if not crud.get_department(db, dept_id):
+        raise HTTPException(status_code=404, detail="Department not found")
+    page = crud.list_department_courses(db, dept_id, limit, cursor)
+    return {"items": page.items, "next_cursor": page.next_cursor}
 
 @router.delete("/{dept_id}")
 def delete_department(dept_id: int, db: Session = Depends(get_db)):
@@ -0,0 +1,47 @@
+# routes/health.py
+from fastapi import APIRouter
+
+from auth.user_cache import user_cache
+from chatbot.session_store import session_store
+from database.db import get_pool_stats
+from utils.admission import admission_controller
+from utils.jobs import job_queue
+from utils.single_flight import single_flight
+
+router = APIRouter()
+
+
+@router.get("/db-pool")
+def db_pool_stats():
+    """Connection pool state plus checkout wait / hold time counters."""
+    return get_pool_stats()
+
+
+@router.get("/auth-cache")
+def auth_cache_stats():
+    """Hit/miss counters for the get_current_user cache."""
+    return user_cache.stats()
+
+
+@router.get("/single-flight")
+def single_flight_stats():
+    """Upstream LLM calls started vs. identical requests that joined one already in flight."""
+    return single_flight.stats()
+
+
+@router.get("/chat-sessions")
+def chat_session_stats():
+    """Chatbot session store backend and how many sessions it holds."""
+    return session_store.stats()
+
+
+@router.get("/admission")
+def admission_stats():
+    """In-flight and queued expensive requests plus rejection counters."""
+    return admission_controller.stats()
+
+
+@router.get("/jobs")
+def job_stats():
+    """Job counts by status and the worker pools running in this process."""
+    return job_queue.stats()
@@ -0,0 +1,64 @@
+# routes/jobs.py
+import os
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from auth.user_cache import CurrentUser
+from auth.utils import get_optional_user
+from database.db import get_db
+from database import crud
+from utils import jobs
+
+router = APIRouter()
+
+
+def job_response(job):
+    response = {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == "succeeded":
+        response["result"] = job.result
+    elif job.status == "failed":
+        response["error"] = job.error
+    return response
+
+
+def readable_job(db: Session, job_id: str, current_user: CurrentUser | None):
+    """The job, if this caller may see it: its owner, or anyone holding the id of an anonymous job."""
+    job = crud.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.user_id is not None:
+        if current_user is None:
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+        if current_user.id != job.user_id:
+            raise HTTPException(status_code=403, detail="You can only view your own jobs")
+    return job
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str, db: Session = Depends(get_db), current_user: CurrentUser | None = Depends(get_optional_user)):
+    """Status of a background job, with its result once it has succeeded."""
+    return job_response(readable_job(db, job_id, current_user))
+
+
+@router.get("/{job_id}/result")
+def download_job_result(
+    job_id: str, db: Session = Depends(get_db), current_user: CurrentUser | None = Depends(get_optional_user)
+):
+    """The file a job produced, e.g. a performance report PDF."""
+    job = readable_job(db, job_id, current_user)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    path = jobs.artifact_path(job.id)
+    if not job.result or "download_url" not in job.result or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="This job has no file result")
+    return FileResponse(path, media_type=job.result["media_type"], filename=job.result["filename"])
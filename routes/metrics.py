@@ -0,0 +1,13 @@
+# routes/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from utils.metrics import registry
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """LLM call and DB pool metrics in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
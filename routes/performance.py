@@ -1,38 +1,43 @@
 # routes/performance.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-
-from auth.utils import get_current_user
-from database.db import SessionLocal
-from database import crud, models
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
-from reportlab.lib.styles import getSampleStyleSheet
-from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth.user_cache import CurrentUser
+from auth.utils import get_current_user, get_current_user_async, get_optional_user
+from database.db import SessionLocal, get_db
+from database.async_db import get_async_db
+from database import async_crud, crud, models
+from utils import jobs, report_renderer
+from utils.jobs import job_queue
+from utils.admission import admission
+from fastapi.responses import Response, StreamingResponse
+import csv
+import io
+import json
 
 router = APIRouter()
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # -------- AI Insights -------- #
-def generate_ai_insights(avg_scores, weekly_study, db: Session):
+def course_label(row):
+    """'CODE - Title' for a summary row, falling back to the raw course id."""
+    return f"{row.code} - {row.title}" if row.code else f"Course {row.course_id}"
+
+
+def generate_ai_insights(course_scores, weekly_study):
     insights = []
-    if not avg_scores and not weekly_study:
+    if not course_scores and not weekly_study:
         return ["No data yet. Start logging tests and study sessions!"]
 
-    score_map = {cid: avg for cid, avg in avg_scores}
-    study_map = {cid: hrs for cid, hrs in weekly_study}
+    study_map = {row.course_id: row.total_hours for row in weekly_study}
+    scored_ids = set()
 
-    for cid, avg in score_map.items():
-        course = db.query(models.Course).filter(models.Course.id == cid).first()
-        cname = f"{course.code} - {course.title}" if course else f"Course {cid}"
-        hours = study_map.get(cid, 0)
+    for row in course_scores:
+        scored_ids.add(row.course_id)
+        cname = course_label(row)
+        avg = row.avg_score
+        hours = study_map.get(row.course_id, 0)
 
         if avg is None:
             # Optionally, add a note for no score yet, or just skip
@@ -47,87 +52,55 @@ def generate_ai_insights(avg_scores, weekly_study, db: Session):
             insights.append(f"✅ {cname}: Great job! Avg {round(avg,2)}. Keep it up!")
 
 
-    for cid, hrs in study_map.items():
-        if cid not in score_map:
-            course = db.query(models.Course).filter(models.Course.id == cid).first()
-            cname = f"{course.code} - {course.title}" if course else f"Course {cid}"
-            insights.append(f"📌 {cname}: {hrs} hrs studied but no test results yet.")
+    for row in weekly_study:
+        if row.course_id not in scored_ids:
+            insights.append(f"📌 {course_label(row)}: {row.total_hours} hrs studied but no test results yet.")
 
     return insights
 
 
+def weakest_courses(course_scores, n: int = 3):
+    return sorted([row for row in course_scores if row.avg_score is not None], key=lambda row: row.avg_score)[:n]
+
+
 # -------- Trend Data -------- #
-def get_trend_data(db: Session, user_id: int):
-    """Return test progress and study logs trend over time"""
-
-    # Progress trend: test scores over time
-    test_trend = (
-        db.query(models.Test.course_id, models.Test.score, models.Test.created_at)
-        .filter(models.Test.user_id == user_id)
-        .order_by(models.Test.created_at.asc())
-        .all()
-    )
+def format_trends(summary):
+    """Shape the trend rows of a performance summary for the API"""
     test_trend_named = [
-        {
-            "course": f"{c.code} - {c.title}" if (c := db.query(models.Course).get(cid)) else f"Course {cid}",
-            "score": score,
-            "date": created_at
-        }
-        for cid, score, created_at in test_trend
+        {"course": course_label(row), "score": row.score, "date": row.created_at}
+        for row in summary["test_trend"]
     ]
-
-    # Study hours trend (per day)
-    study_trend = (
-        db.query(func.date(models.StudyLog.date), func.sum(models.StudyLog.hours_studied))
-        .filter(models.StudyLog.user_id == user_id)
-        .group_by(func.date(models.StudyLog.date))
-        .order_by(func.date(models.StudyLog.date).asc())
-        .all()
-    )
-    study_trend_named = [{"date": str(date), "hours": hrs} for date, hrs in study_trend]
+    study_trend_named = [{"date": str(date), "hours": hrs} for date, hrs in summary["study_trend"]]
 
     return {"test_trend": test_trend_named, "study_trend": study_trend_named}
 
 
 # -------- Main Performance Endpoint -------- #
-@router.get("/{user_id}")
-def get_performance(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    user_id = current_user.id
-    tests = crud.list_tests(db, user_id)
-    study_logs = crud.get_study_logs_by_user(db, user_id)
-
-    if not tests and not study_logs:
+def performance_response(summary):
+    if not summary["test_trend"] and not summary["study_trend"]:
         raise HTTPException(status_code=404, detail="No performance data found")
 
-    avg_scores = crud.get_average_scores_by_course(db, user_id)
-    weekly_study = crud.get_weekly_study_hours(db, user_id)
-
-    # Calculate overall average score
-    overall_avg = (
-        db.query(func.avg(models.Test.score))
-        .filter(models.Test.user_id == user_id)
-        .scalar()
-    )
-    overall_avg = round(overall_avg, 2) if overall_avg else 0
-
-    weak_courses = sorted([entry for entry in avg_scores if entry[1] is not None], key=lambda x: x[1])[:3]
+    course_scores = summary["course_scores"]
+    weekly_study = summary["weekly_study"]
 
-    insights = generate_ai_insights(avg_scores, weekly_study, db)
-    trends = get_trend_data(db, user_id)
+    insights = generate_ai_insights(course_scores, weekly_study)
+    trends = format_trends(summary)
 
-    # Named data (replace course_id with course code/title)
+    # Named data (course code instead of course_id)
     avg_scores_named = [
-        (db.query(models.Course).get(cid).code, round(avg, 2)) for cid, avg in avg_scores
+        (row.code or f"Course {row.course_id}", round(row.avg_score, 2) if row.avg_score is not None else None)
+        for row in course_scores
     ]
     weekly_study_named = [
-        (db.query(models.Course).get(cid).code, hrs) for cid, hrs in weekly_study
+        (row.code or f"Course {row.course_id}", row.total_hours) for row in weekly_study
     ]
     weak_courses_named = [
-        {"course": db.query(models.Course).get(cid).code, "avg_score": round(avg, 2)} for cid, avg in weak_courses
+        {"course": row.code or f"Course {row.course_id}", "avg_score": round(row.avg_score, 2)}
+        for row in weakest_courses(course_scores)
     ]
 
     return {
-        "average_score": overall_avg,
+        "average_score": summary["overall_avg"],
         "avg_scores": avg_scores_named,
         "weekly_study": weekly_study_named,
         "weak_courses": weak_courses_named,
@@ -136,75 +109,104 @@ def get_performance(db: Session = Depends(get_db), current_user: models.User = D
     }
 
 
+@router.get("/{user_id}")
+def get_performance(db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+    summary = crud.get_performance_summary(db, current_user.id)
+    return performance_response(summary)
+
+
 # -------- Download Report (PDF) -------- #
-@router.get("/{user_id}/download")
-def download_report(user_id: int, db: Session = Depends(get_db)):
+def build_report_data(db: Session, user_id: int):
+    """Plain-data report contents; rendering happens in utils.report_renderer."""
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
+        return None
+
+    summary = crud.get_performance_summary(db, user_id, include_trends=False)
+    course_scores = summary["course_scores"]
+    weekly_study = summary["weekly_study"]
+
+    return {
+        "name": user.name,
+        "overall_avg": summary["overall_avg"],
+        "scores": [
+            [course_label(row), round(row.avg_score, 2)] for row in course_scores if row.avg_score is not None
+        ],
+        "weekly_study": [[course_label(row), row.total_hours] for row in weekly_study],
+        "weak_courses": [
+            [course_label(row), round(row.avg_score, 2)] for row in weakest_courses(course_scores)
+        ],
+        "insights": generate_ai_insights(course_scores, weekly_study),
+    }
+
+
+@router.get("/{user_id}/download", dependencies=[Depends(admission("report"))])
+async def download_report(
+    user_id: int,
+    request: Request,
+    async_mode: bool = Query(False, alias="async", description="Queue as a background job and answer 202 with its id"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser | None = Depends(get_optional_user),
+):
+    if async_mode:
+        owner = jobs.require_owner(current_user, user_id)
+        return jobs.accepted(await job_queue.submit("performance.report", {"user_id": user_id}, user_id=owner))
+
+    report = await run_in_threadpool(build_report_data, db, user_id)
+    if report is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    avg_scores = crud.get_average_scores_by_course(db, user_id)
-    weekly_study = crud.get_weekly_study_hours(db, user_id)
+    key, pdf, cached = await report_renderer.get_report(report)
+
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "X-Report-Cache": "hit" if cached else "miss"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="performance_report_{user_id}.pdf"'
+    return Response(content=pdf, media_type="application/pdf", headers=headers)
+
+
+def _report_data(user_id: int):
+    db = SessionLocal()
+    try:
+        return build_report_data(db, user_id)
+    finally:
+        db.close()
+
+
+@jobs.register("performance.report", pool="documents")
+async def download_report_job(job_id: str, params: dict) -> dict:
+    user_id = params["user_id"]
+    report = await run_in_threadpool(_report_data, user_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    overall_avg = (
-        db.query(func.avg(models.Test.score))
-        .filter(models.Test.user_id == user_id)
-        .scalar()
+    _, pdf, _ = await report_renderer.get_report(report)
+    return await run_in_threadpool(
+        jobs.save_artifact, job_id, pdf, f"performance_report_{user_id}.pdf", "application/pdf"
     )
-    overall_avg = round(overall_avg, 2) if overall_avg else 0
-
-    insights = generate_ai_insights(avg_scores, weekly_study, db)
-
-    file_path = f"performance_report_{user_id}.pdf"
-    doc = SimpleDocTemplate(file_path)
-    styles = getSampleStyleSheet()
-    elements = []
-
-    elements.append(Paragraph(f"Performance Report for {user.name}", styles['Title']))
-    elements.append(Spacer(1, 20))
-
-    # Overall Average
-    elements.append(Paragraph(f"Overall Average Score: {overall_avg}", styles['Heading2']))
-    elements.append(Spacer(1, 10))
-
-    # Avg scores per course
-    elements.append(Paragraph("Average Scores Per Course:", styles['Heading2']))
-    score_data = [["Course", "Average Score"]]
-    for cid, avg in avg_scores:
-        c = db.query(models.Course).get(cid)
-        cname = f"{c.code} - {c.title}" if c else f"Course {cid}"
-        score_data.append([cname, round(avg, 2)])
-    elements.append(Table(score_data))
-    elements.append(Spacer(1, 20))
-
-    # Weekly study hours
-    elements.append(Paragraph("Weekly Study Hours:", styles['Heading2']))
-    study_data = [["Course", "Total Hours"]]
-    for cid, hrs in weekly_study:
-        c = db.query(models.Course).get(cid)
-        cname = f"{c.code} - {c.title}" if c else f"Course {cid}"
-        study_data.append([cname, hrs])
-    elements.append(Table(study_data))
-    elements.append(Spacer(1, 20))
-
-    # Weak courses with scores
-    elements.append(Paragraph("Weak Courses (Lowest Scores):", styles['Heading2']))
-    weak_courses = sorted(avg_scores, key=lambda x: x[1])[:3]
-    for cid, score in weak_courses:
-        c = db.query(models.Course).get(cid)
-        cname = f"{c.code} - {c.title}" if c else f"Course {cid}"
-        elements.append(Paragraph(f"{cname} - Avg Score: {round(score, 2)}", styles['Normal']))
-    elements.append(Spacer(1, 20))
-
-    # AI Insights
-    elements.append(Paragraph("AI Insights:", styles['Heading2']))
-    for insight in insights:
-        elements.append(Paragraph(insight, styles['Normal']))
-
-    doc.build(elements)
-    return FileResponse(path=file_path, filename=file_path, media_type="application/pdf")
+
+
 # Add this at the bottom of performance.py
 
+def trend_data_response(test_trend, study_trend):
+    test_trend_named = [
+        {
+            "course": row.code or f"Course {row.course_id}",
+            "score": row.score,
+            "date": row.created_at.strftime("%Y-%m-%d")
+        }
+        for row in test_trend
+    ]
+    study_trend_named = [{"date": str(date), "hours": hrs} for date, hrs in study_trend]
+
+    return {
+        "test_trend": test_trend_named,
+        "study_trend": study_trend_named
+    }
+
+
 @router.get("/{user_id}/trend-data")
 def get_user_trend_data(user_id: int, db: Session = Depends(get_db)):
     """
@@ -216,33 +218,109 @@ def get_user_trend_data(user_id: int, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # --- Test Scores Trend ---
-    test_trend = (
-        db.query(models.Test.course_id, models.Test.score, models.Test.created_at)
-        .filter(models.Test.user_id == user_id)
-        .order_by(models.Test.created_at.asc())
-        .all()
-    )
-    test_trend_named = [
-        {
-            "course": f"{c.code}" if (c := db.query(models.Course).get(cid)) else f"Course {cid}",
-            "score": score,
-            "date": created_at.strftime("%Y-%m-%d")
-        }
-        for cid, score, created_at in test_trend
-    ]
+    return trend_data_response(crud.get_test_trend(db, user_id), crud.get_study_trend(db, user_id))
 
-    # --- Study Hours Trend ---
-    study_trend = (
-        db.query(func.date(models.StudyLog.date), func.sum(models.StudyLog.hours_studied))
-        .filter(models.StudyLog.user_id == user_id)
-        .group_by(func.date(models.StudyLog.date))
-        .order_by(func.date(models.StudyLog.date).asc())
-        .all()
-    )
-    study_trend_named = [{"date": str(date), "hours": hrs} for date, hrs in study_trend]
 
-    return {
-        "test_trend": test_trend_named,
-        "study_trend": study_trend_named
-    }
+
+# -------- Export (NDJSON / CSV) -------- #
+EXPORT_FIELDS = [
+    "type", "id", "course_id", "score", "hours_studied", "date",
+    "questions", "correct_answers", "student_answers",
+]
+
+
+def export_records(user_id: int, include_questions: bool):
+    """
+    Yield one dict per test and study log. Runs with its own session because
+    the request-scoped one is closed before a streaming response is sent.
+    """
+    db = SessionLocal()
+    try:
+        for row in crud.iter_user_tests(db, user_id, include_questions):
+            record = {"type": "test", "id": row.id, "course_id": row.course_id, "score": row.score, "date": row.created_at}
+            if include_questions:
+                record.update(
+                    questions=row.questions, correct_answers=row.correct_answers, student_answers=row.student_answers
+                )
+            yield record
+        for row in crud.iter_user_study_logs(db, user_id):
+            yield {"type": "study_log", "id": row.id, "course_id": row.course_id, "hours_studied": row.hours_studied, "date": row.date}
+    finally:
+        db.close()
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def stream_ndjson(records):
+    for record in records:
+        yield json.dumps(record, default=_json_default) + "\n"
+
+
+def stream_csv(records, include_questions: bool):
+    fields = EXPORT_FIELDS if include_questions else EXPORT_FIELDS[:6]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for record in records:
+        writer.writerow({k: _csv_value(v) for k, v in record.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+@router.get("/{user_id}/export")
+def export_history(
+    user_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    include_questions: bool = False,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Stream the user's full test and study-log history as NDJSON or CSV."""
+    if current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="You can only export your own history")
+
+    records = export_records(user_id, include_questions)
+    if format == "csv":
+        body, media_type = stream_csv(records, include_questions), "text/csv"
+    else:
+        body, media_type = stream_ndjson(records), "application/x-ndjson"
+
+    filename = f"history_{user_id}.{format}"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+# -------- Async variants (USE_ASYNC_DB) -------- #
+# Mounted ahead of `router` when enabled so these paths are served without
+# occupying threadpool workers while waiting on the DB.
+async_router = APIRouter()
+
+
+@async_router.get("/{user_id}")
+async def get_performance_async(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    summary = await async_crud.get_performance_summary(db, current_user.id)
+    return performance_response(summary)
+
+
+@async_router.get("/{user_id}/trend-data")
+async def get_user_trend_data_async(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await async_crud.get_user(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return trend_data_response(
+        await async_crud.get_test_trend(db, user_id), await async_crud.get_study_trend(db, user_id)
+    )
@@ -1,19 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Query
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth.utils import get_current_user
-from database.db import SessionLocal
-from database import crud, models
+from auth.user_cache import CurrentUser
+from auth.utils import get_current_user, get_current_user_async
+from database.db import get_db
+from database.async_db import get_async_db
+from database import async_crud, crud
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from chatbot.retrieval import retriever
+from typing import Optional
 
 router = APIRouter(prefix="/resources", tags=["Resources"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 
 # ---- Create Resource ----
 @router.post("/")
@@ -23,19 +22,32 @@ def create_resource(title: str, url: str, type: str, course_id: int | None = Non
 
 # ---- Upload PDF ----
 @router.post("/upload_pdf/")
-def upload_pdf(course_id: int, title: str, file: UploadFile = File(...), db: Session = Depends(get_db)):
+def upload_pdf(
+    course_id: int,
+    title: str,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files allowed")
-    return crud.upload_pdf_resource(db, file, course_id, title)
+    resource = crud.upload_pdf_resource(db, file, course_id, title)
+    # Index for the chatbot now (on its own pool) rather than on the course's next question
+    background_tasks.add_task(retriever.schedule, course_id, resource.id, resource.title, resource.url)
+    return resource
 
 
 # ---- List Resources ----
 @router.get("/")
 def list_resources(
+    course_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    return crud.list_resources(db)
+    page = crud.list_resources(db, course_id, limit, cursor)
+    return {"items": page.items, "next_cursor": page.next_cursor}
 
 
 
@@ -45,6 +57,7 @@ def delete_resource(resource_id: int, db: Session = Depends(get_db)):
     success = crud.delete_resource(db, resource_id)
     if not success:
         raise HTTPException(status_code=404, detail="Resource not found")
+    retriever.remove_resource(resource_id)
     return {"message": "Resource deleted successfully"}
 
 
@@ -53,3 +66,19 @@ def delete_resource(resource_id: int, db: Session = Depends(get_db)):
 def generate_ai_resources(user_id: int, db: Session = Depends(get_db)):
     resources = crud.generate_ai_resources_for_weak_courses(db, user_id)
     return {"generated_resources": resources}
+
+
+# ---- Async variant (USE_ASYNC_DB) ----
+async_router = APIRouter(prefix="/resources", tags=["Resources"])
+
+
+@async_router.get("/")
+async def list_resources_async(
+    course_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
+):
+    page = await async_crud.list_resources(db, course_id, limit, cursor)
+    return {"items": page.items, "next_cursor": page.next_cursor}
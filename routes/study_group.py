@@ -1,18 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from database.db import SessionLocal
+from database.db import get_db
 from database import crud
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
 
 router = APIRouter(prefix="/study-groups", tags=["Study Groups"])
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # Create a study group
 @router.post("/")
 def create_group(name: str, description: str, db: Session = Depends(get_db)):
@@ -36,9 +30,14 @@ def leave_group(group_id: int, user_id: int, db: Session = Depends(get_db)):
 
 # List group members
 @router.get("/{group_id}/members")
-def list_members(group_id: int, db: Session = Depends(get_db)):
-    members = crud.list_group_members(db, group_id)
-    return {"group_id": group_id, "members": [m.name for m in members]}
+def list_members(
+    group_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    page = crud.list_group_members(db, group_id, limit, cursor)
+    return {"group_id": group_id, "members": [m.name for m in page.items], "next_cursor": page.next_cursor}
 
 # List groups of a user
 @router.get("/user/{user_id}")
@@ -1,18 +1,33 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query
 from sqlalchemy.orm import Session
-from database.db import SessionLocal
+from auth.user_cache import CurrentUser
+from auth.utils import get_optional_user
+from database.db import SessionLocal, get_db
 from database import crud
 from utils.parser import parse_timetable
+from utils.uploads import spool_upload
+from utils import jobs
+from utils.jobs import job_queue
+from fastapi.concurrency import run_in_threadpool
 from utils.timetable_generator import generate_personalized_timetable
 
 router = APIRouter(prefix="/study-timetable", tags=["Study Timetable"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def build_timetable(db: Session, user_id: int, path: str, filename: str, habits: dict) -> dict:
+    school_timetable = parse_timetable(path, filename)
+
+    habits = crud.save_study_habits(db, user_id, **habits)
+
+    personalized = generate_personalized_timetable(school_timetable, habits)
+
+    crud.save_timetable_from_parsed_data(db, user_id, personalized)
+
+    # save as resource
+    timetable_url = f"/resources/timetable/{user_id}.json"  # fake path for now
+    crud.create_resource(db, None, f"Timetable for User {user_id}", timetable_url)
+
+    return {"message": "Personalized timetable created", "timetable": personalized}
+
 
 @router.post("/generate")
 async def generate_timetable(
@@ -22,24 +37,44 @@ async def generate_timetable(
     hours_per_day: int = Form(...),
     difficult_courses: str = Form(""),
     break_minutes: int = Form(15),
-    db: Session = Depends(get_db)
+    async_mode: bool = Query(False, alias="async", description="Queue as a background job and answer 202 with its id"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser | None = Depends(get_optional_user)
 ):
+    habits = {
+        "preferred_time": preferred_time,
+        "hours_per_day": hours_per_day,
+        "difficult_courses": difficult_courses,
+        "break_minutes": break_minutes,
+    }
     try:
-        contents = await file.read()
-        school_timetable = parse_timetable(contents, file.filename)
-
-        habits = crud.save_study_habits(
-            db, user_id, preferred_time, hours_per_day, difficult_courses, break_minutes
-        )
-
-        personalized = generate_personalized_timetable(school_timetable, habits)
-
-        crud.save_timetable_from_parsed_data(db, user_id, personalized)
+        with await spool_upload(file) as upload:
+            if async_mode:
+                owner = jobs.require_owner(current_user, user_id)
+                job_id = await job_queue.submit(
+                    "timetable.generate", {"user_id": user_id, "habits": habits}, user_id=owner, upload=upload
+                )
+                return jobs.accepted(job_id)
+            return await run_in_threadpool(build_timetable, db, user_id, upload.path, file.filename, habits)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to generate timetable: {e}")
 
-        # save as resource
-        timetable_url = f"/resources/timetable/{user_id}.json"  # fake path for now
-        crud.create_resource(db, None, f"Timetable for User {user_id}", timetable_url)
 
-        return {"message": "Personalized timetable created", "timetable": personalized}
+def _run_timetable_job(job_id: str, params: dict) -> dict:
+    upload = jobs.job_upload(job_id, params)
+    db = SessionLocal()
+    try:
+        return build_timetable(db, params["user_id"], upload.path, upload.filename, params["habits"])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to generate timetable: {e}")
+    finally:
+        db.close()
+
+
+@jobs.register("timetable.generate", pool="documents")
+async def generate_timetable_job(job_id: str, params: dict) -> dict:
+    return await run_in_threadpool(_run_timetable_job, job_id, params)
@@ -1,91 +1,74 @@
 # routes/test.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from google import genai
-from dotenv import load_dotenv
-import os
-import json
-import re
+from fastapi.concurrency import run_in_threadpool
 
+from auth.user_cache import CurrentUser
 from auth.utils import get_current_user
-from database.db import SessionLocal
+from database.db import SessionLocal, get_db
 from database import crud, models
+from utils import jobs, llm_gateway, metrics, question_bank
+from utils.jobs import job_queue
+from utils.sse import sse_event
+from utils.admission import AdmissionSlot, HeldStreamingResponse, admission, test_cost
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
 
 
-load_dotenv()
-
 router = APIRouter(prefix="/tests", tags=["Tests"])
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 
 # ---------- Select a Course for Test ----------
 @router.get("/select-course/{user_id}")
-def select_course(user_id: int, db: Session = Depends(get_db)):
+def select_course(
+    user_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     """Fetch all courses a user is enrolled in for test selection."""
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    courses = crud.list_courses(db)
-    if not courses:
+    page = crud.list_courses(db, limit, cursor)
+    if not page.items and not cursor:
         raise HTTPException(status_code=404, detail="No courses available")
 
     return {
         "message": "Select a course to take a test",
         "courses": [
             {"id": c.id, "code": c.code, "title": c.title, "level": c.level}
-            for c in courses
+            for c in page.items
         ],
+        "next_cursor": page.next_cursor,
     }
 
 # ----Generate Test--------
-@router.post("/generate")
-def generate_test(
-    user_id: int,
-    course_id: int,
-    num_questions: int = 10,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
+async def build_test(db: Session, user_id: int, course_id: int, num_questions: int) -> tuple[dict, str]:
+    """Questions from the course's bank or Gemini, saved as a new test. Returns (response, source)."""
     # Get course
-    course_record = db.query(models.Course).filter(models.Course.id == course_id).first()
-    if not course_record:
+    course = await run_in_threadpool(crud.get_course, db, course_id)
+    if not course:
         raise HTTPException(status_code=404, detail="Course not found")
 
-    course = crud.get_course_by_code(db, course_record.code)
-
-    # Setup Gemini model
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-
-    prompt = f"""
-    Generate {num_questions} multiple-choice questions for the course {course.code} - {course.title}.
-    Provide each question with 4 options (A, B, C, D) and the correct answer.
-    Format as JSON list: 
-    [{{"question": "...", "options": ["A", "B", "C", "D"], "answer": "A"}}]
-    """
-
-    try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash", contents=prompt
-            )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error during content generation: {str(e)}")
-
-    # Parse response safely
-    cleaned_text = response.text.strip()
-    cleaned_text = re.sub(r"^```(json)?|```$", "", cleaned_text, flags=re.MULTILINE).strip()
-    try:
-        questions = json.loads(cleaned_text)
-        print(questions)
-    except Exception:
-        raise HTTPException(status_code=500, detail="Failed to parse Gemini output as JSON")
+    # Serve from the course's question bank; only go to Gemini when it can't cover the request
+    questions = await run_in_threadpool(crud.sample_bank_questions, db, course_id, num_questions)
+    metrics.record_cache("tests", "question_bank", len(questions) >= num_questions)
+    source = "bank"
+    if len(questions) < num_questions:
+        source = "gemini"
+        # Give the pooled connection back while the model call (and its queue) runs;
+        # the session checks out a fresh one for create_test
+        await run_in_threadpool(db.close)
+        try:
+            questions = await question_bank.generate_questions(course, num_questions)
+        except llm_gateway.LLMTimeout as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        except llm_gateway.LLMError as e:
+            raise HTTPException(status_code=500, detail=f"Unexpected error during content generation: {str(e)}")
+        except question_bank.QuestionParseError as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
     # Extract correct answers
     try:
@@ -94,7 +77,8 @@ def generate_test(
         raise HTTPException(status_code=500, detail="Some questions are missing the 'answer' key.")
 
     # Save the test
-    test = crud.create_test(
+    test = await run_in_threadpool(
+        crud.create_test,
         db,
         user_id=user_id,
         course_id=course_id,
@@ -106,7 +90,117 @@ def generate_test(
     "test_id": test.id,
     "course": course.code,
     "questions": questions
-}
+}, source
+
+
+@router.post("/generate", dependencies=[Depends(admission("tests", cost=test_cost))])
+async def generate_test(
+    user_id: int,
+    course_id: int,
+    background_tasks: BackgroundTasks,
+    num_questions: int = Query(10, ge=1, le=question_bank.MAX_TEST_QUESTIONS),
+    async_mode: bool = Query(False, alias="async", description="Queue as a background job and answer 202 with its id"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    if async_mode:
+        params = {"user_id": user_id, "course_id": course_id, "num_questions": num_questions}
+        return jobs.accepted(await job_queue.submit("tests.generate", params, user_id=current_user.id))
+
+    response, source = await build_test(db, user_id, course_id, num_questions)
+
+    if source == "gemini":
+        background_tasks.add_task(question_bank.store_questions, course_id, response["questions"])
+    background_tasks.add_task(question_bank.refill, course_id)
+
+    return response
+
+
+@jobs.register("tests.generate", pool="ai")
+async def generate_test_job(job_id: str, params: dict) -> dict:
+    db = SessionLocal()
+    try:
+        response, source = await build_test(db, params["user_id"], params["course_id"], params["num_questions"])
+    finally:
+        db.close()
+
+    if source == "gemini":
+        await question_bank.store_questions(params["course_id"], response["questions"])
+    jobs.spawn(question_bank.refill(params["course_id"]))
+    return response
+
+# ---------- Generate Test (streamed) ----------
+def save_test(user_id: int, course_id: int, questions: list):
+    # The request's session is closed before a streamed body is sent, so use our own
+    db = SessionLocal()
+    try:
+        return crud.create_test(
+            db,
+            user_id=user_id,
+            course_id=course_id,
+            questions=questions,
+            correct_answers=[q["answer"] for q in questions],
+        ).id
+    finally:
+        db.close()
+
+
+async def stream_test(user_id: int, course, num_questions: int, bank_questions: list):
+    questions = []
+    try:
+        if len(bank_questions) >= num_questions:
+            questions = bank_questions
+            for index, question in enumerate(questions):
+                yield sse_event("question", {"index": index, **question})
+        else:
+            async for question in question_bank.stream_questions(course, num_questions):
+                if not isinstance(question, dict) or "answer" not in question:
+                    raise question_bank.QuestionParseError("Some questions are missing the 'answer' key.")
+                yield sse_event("question", {"index": len(questions), **question})
+                questions.append(question)
+    except llm_gateway.LLMError as e:
+        yield sse_event("error", {"detail": f"Unexpected error during content generation: {str(e)}"})
+        return
+    except question_bank.QuestionParseError as e:
+        yield sse_event("error", {"detail": str(e)})
+        return
+
+    test_id = await run_in_threadpool(save_test, user_id, course.id, questions)
+    yield sse_event("done", {"test_id": test_id, "course": course.code, "count": len(questions)})
+
+    if questions is not bank_questions:
+        await question_bank.store_questions(course.id, questions)
+
+
+@router.post("/generate/stream")
+async def generate_test_stream(
+    user_id: int,
+    course_id: int,
+    background_tasks: BackgroundTasks,
+    num_questions: int = Query(10, ge=1, le=question_bank.MAX_TEST_QUESTIONS),
+    slot: AdmissionSlot = Depends(admission("tests", cost=test_cost)),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Same as /generate, but sends each question as a Server-Sent Event as soon as it is complete.
+
+    Events: `question` (one per question), then `done` with the saved test_id,
+    or `error` if generation fails (no test is saved in that case).
+    """
+    course = await run_in_threadpool(crud.get_course, db, course_id)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    bank_questions = await run_in_threadpool(crud.sample_bank_questions, db, course_id, num_questions)
+    metrics.record_cache("tests", "question_bank", len(bank_questions) >= num_questions)
+    background_tasks.add_task(question_bank.refill, course_id)
+
+    return HeldStreamingResponse(
+        slot,
+        stream_test(user_id, course, num_questions, bank_questions),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # ---------- Submit Answers ----------
 @router.post("/submit")
@@ -117,6 +211,24 @@ def submit_test(test_id: int, student_answers: list[str], db: Session = Depends(
         raise HTTPException(status_code=404, detail="Test not found")
     return {"message": "Test submitted", "score": test.score, "answers": test.student_answers}
 
+@router.get("/user/{user_id}")
+def list_user_tests(
+    user_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """A user's tests in creation order, without the question/answer payloads."""
+    page = crud.list_tests(db, user_id, limit, cursor)
+    return {
+        "items": [
+            {"id": t.id, "course_id": t.course_id, "score": t.score, "created_at": t.created_at}
+            for t in page.items
+        ],
+        "next_cursor": page.next_cursor,
+    }
+
+
 @router.get("/{test_id}/score")
 def get_test_score(test_id: int, db: Session = Depends(get_db)):
     score_data = crud.get_test_score(db, test_id)
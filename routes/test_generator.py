@@ -1,7 +1,7 @@
 import google.generativeai as genai
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from database.db import SessionLocal
+from database.db import get_db
 from database import crud, models
 import os
 
@@ -10,13 +10,6 @@ router = APIRouter(prefix="/generate-test", tags=["AI Test Generator"])
 # Setup Gemini
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/{course_id}/user/{user_id}")
 def generate_test(course_id: int, user_id: int, num_questions: int = 10, db: Session = Depends(get_db)):
     # Get course
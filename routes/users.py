@@ -1,21 +1,15 @@
 # routes/users.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from database.db import SessionLocal
+from database.db import get_db
 from database import crud, models
-from schemas.users import UserCreate, UserUpdate, UserResponse
-from typing import List
+from auth.user_cache import user_cache
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from schemas.users import UserCreate, UserUpdate, UserResponse, UserPage
+from typing import Optional
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-# Dependency for DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 
 @router.post("/", response_model=UserResponse)
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
@@ -35,10 +29,15 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     return created
 
 
-@router.get("/", response_model=List[UserResponse])
-def list_users(db: Session = Depends(get_db)):
-    """Get all users"""
-    return crud.list_users(db)
+@router.get("/", response_model=UserPage)
+def list_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get users, one page at a time (pass next_cursor back as cursor)"""
+    page = crud.list_users(db, limit, cursor)
+    return {"items": page.items, "next_cursor": page.next_cursor}
 
 
 @router.get("/{user_id}", response_model=UserResponse)
@@ -57,12 +56,14 @@ def update_user(user_id: int, payload: UserUpdate, db: Session = Depends(get_db)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    old_email = user.email
     update_data = payload.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(user, key, value)
 
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(old_email, user.email)
     return user
 
 
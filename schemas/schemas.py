@@ -80,6 +80,11 @@ class CourseResponse(CourseBase):
         orm_mode = True
 
 
+class CoursePage(BaseModel):
+    items: List[CourseResponse]
+    next_cursor: Optional[str] = None
+
+
 # -------- User --------
 class UserBase(BaseModel):
     matric_no: str
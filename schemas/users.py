@@ -1,6 +1,6 @@
 # schemas/user.py
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from pydantic import ConfigDict
 
 
@@ -29,3 +29,8 @@ class UserResponse(UserBase):
     is_google_user: bool
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
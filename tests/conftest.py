@@ -0,0 +1,74 @@
+# tests/conftest.py
+import os
+from contextlib import contextmanager
+
+# Keep the app's module-level engine off any real database; tests build their own.
+# An explicitly exported Postgres DATABASE_URL is remembered for the Postgres-only checks.
+POSTGRES_URL = os.environ.get("DATABASE_URL", "")
+if not POSTGRES_URL.startswith("postgresql"):
+    POSTGRES_URL = ""
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("LLM_BACKEND", "stub")
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from auth.user_cache import user_cache
+from database import crud
+from database.catalog import catalog
+from database.migrations import run_migrations
+
+
+def make_engine(url: str = "sqlite://"):
+    """A migrated engine; SQLite defaults to one shared in-memory connection."""
+    if url.startswith("sqlite"):
+        engine = create_engine(url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+    else:
+        engine = create_engine(url)
+    run_migrations(engine)
+    return engine
+
+
+@contextmanager
+def count_queries(engine):
+    """Collect every SQL statement sent to the engine inside the block."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def engine():
+    engine = make_engine()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    catalog.clear()
+    user_cache.clear()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    catalog.clear()
+
+
+@pytest.fixture
+def user(db):
+    return crud.create_user(db, "CSC/001", "Ada", "ada@example.com", "hashed", "Computer Science", "100")
+
+
+@pytest.fixture
+def courses(db):
+    return [crud.create_course(db, f"CSC10{i}", f"Course {i}", "100", []) for i in range(1, 4)]
@@ -0,0 +1,93 @@
+# tests/test_admission.py
+import pytest
+from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi.testclient import TestClient
+
+from utils import admission
+from utils.question_bank import MAX_TEST_QUESTIONS
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    controller = admission.AdmissionController()
+    monkeypatch.setattr(admission, "admission_controller", controller)
+    return controller
+
+
+@pytest.fixture
+def client(controller):
+    app = FastAPI()
+
+    @app.post("/generate", dependencies=[Depends(admission.admission("tests", cost=admission.test_cost))])
+    def generate(num_questions: int = Query(10, ge=1, le=MAX_TEST_QUESTIONS)):
+        return {"num_questions": num_questions}
+
+    @app.post("/summarize", dependencies=[Depends(admission.admission("pdf", cost=admission.upload_cost))])
+    def summarize():
+        return {}
+
+    @app.post("/stream")
+    async def stream(fail: bool = False, slot: admission.AdmissionSlot = Depends(admission.admission("chatbot"))):
+        if fail:
+            raise HTTPException(status_code=404)
+
+        async def body():
+            for _ in range(3):
+                yield f"{controller.active}\n"
+
+        return admission.HeldStreamingResponse(slot, body(), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def tokens_left(controller, endpoint):
+    (bucket,) = [b for (e, _), b in controller._buckets.items() if e == endpoint]
+    return bucket.tokens
+
+
+@pytest.mark.parametrize("num_questions", [0, -1, MAX_TEST_QUESTIONS + 1, 100000])
+def test_out_of_range_question_counts_are_rejected_before_charging(client, controller, num_questions):
+    response = client.post("/generate", params={"num_questions": num_questions})
+
+    assert response.status_code == 422
+    assert len(controller._buckets) == 0
+
+
+def test_largest_valid_request_fits_the_bucket(client, controller):
+    response = client.post("/generate", params={"num_questions": MAX_TEST_QUESTIONS})
+
+    assert response.status_code == 200
+    assert tokens_left(controller, "tests") == pytest.approx(10 - MAX_TEST_QUESTIONS / 10, abs=0.01)
+
+
+def test_cost_above_capacity_is_refused_not_clamped(controller):
+    with pytest.raises(admission.HTTPException) as raised:
+        controller.charge("tests", "user:a", 11)
+
+    assert raised.value.status_code == 413
+    controller.charge("tests", "user:a", 10)
+    with pytest.raises(admission.HTTPException) as raised:
+        controller.charge("tests", "user:a", 1)
+    assert raised.value.status_code == 429
+
+
+def test_upload_is_charged_for_the_bytes_received(client, controller):
+    body = b"%PDF" + b"\0" * (12 * MB)
+    response = client.post("/summarize", files={"file": ("notes.pdf", body, "application/pdf")})
+
+    assert response.status_code == 200
+    assert tokens_left(controller, "pdf") == pytest.approx(5 - 3, abs=0.01)
+
+
+def test_streaming_response_holds_its_slot_until_the_body_is_sent(client, controller):
+    response = client.post("/stream")
+
+    assert response.text.split() == ["1", "1", "1"]
+    assert controller.active == 0
+
+
+def test_streaming_route_that_fails_releases_its_slot(client, controller):
+    assert client.post("/stream", params={"fail": True}).status_code == 404
+    assert controller.active == 0
@@ -0,0 +1,62 @@
+# tests/test_catalog.py
+from fastapi.testclient import TestClient
+
+from database import crud
+from database.db import get_db
+from tests.conftest import count_queries
+
+
+def test_department_courses_come_from_the_catalog(db, engine):
+    science = crud.create_department(db, "Science")
+    arts = crud.create_department(db, "Arts")
+    physics = crud.create_course(db, "PHY101", "Physics", "100", [science.id])
+    history = crud.create_course(db, "HIS101", "History", "100", [arts.id])
+    both = crud.create_course(db, "PHI101", "Philosophy of Science", "100", [science.id, arts.id])
+
+    with count_queries(engine) as statements:
+        science_courses = crud.list_department_courses(db, science.id).items
+        arts_courses = crud.list_department_courses(db, arts.id).items
+
+    assert [c.id for c in science_courses] == [physics.id, both.id]
+    assert [c.id for c in arts_courses] == [history.id, both.id]
+    assert statements == []
+
+
+def test_department_listing_follows_catalog_writes(db):
+    science = crud.create_department(db, "Science")
+    assert crud.get_department(db, science.id).name == "Science"
+    assert crud.list_department_courses(db, science.id).items == []
+
+    course = crud.create_course(db, "PHY101", "Physics", "100", [science.id])
+    assert [c.id for c in crud.list_department_courses(db, science.id).items] == [course.id]
+
+    crud.delete_course(db, course.id)
+    assert crud.list_department_courses(db, science.id).items == []
+
+    crud.delete_department(db, science.id)
+    assert crud.get_department(db, science.id) is None
+
+
+def test_department_courses_route(db):
+    from app import app
+
+    science = crud.create_department(db, "Science")
+    for i in range(3):
+        crud.create_course(db, f"PHY10{i}", f"Physics {i}", "100", [science.id])
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[get_db] = override
+    try:
+        client = TestClient(app)
+        first = client.get(f"/departments/{science.id}/courses", params={"limit": 2}).json()
+        second = client.get(f"/departments/{science.id}/courses", params={"cursor": first["next_cursor"]}).json()
+        missing = client.get(f"/departments/{science.id + 1}/courses")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [c["code"] for c in first["items"] + second["items"]] == ["PHY100", "PHY101", "PHY102"]
+    assert first["items"][0]["departments"][0]["name"] == "Science"
+    assert second["next_cursor"] is None
+    assert missing.status_code == 404
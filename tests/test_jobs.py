@@ -0,0 +1,62 @@
+# tests/test_jobs.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from auth.utils import create_access_token
+from database import crud
+from database.db import get_db
+from utils import jobs
+
+
+@pytest.fixture
+def client(db, engine, monkeypatch):
+    from app import app
+
+    async def override():
+        yield db
+
+    # Submitting writes the job through the queue's own sessions; no workers run in tests
+    monkeypatch.setattr(jobs, "SessionLocal", sessionmaker(bind=engine))
+    app.dependency_overrides[get_db] = override
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def other(db):
+    return crud.create_user(db, "CSC/002", "Bola", "bola@example.com", "hashed", "Computer Science", "100")
+
+
+def auth(user):
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.email})}"}
+
+
+def queue_report(client, user_id, headers=None):
+    return client.get(f"/performance/{user_id}/download", params={"async": True}, headers=headers or {})
+
+
+def test_report_jobs_can_only_be_queued_by_their_user(client, user, other):
+    assert queue_report(client, user.id).status_code == 401
+    assert queue_report(client, user.id, auth(other)).status_code == 403
+
+    response = queue_report(client, user.id, auth(user))
+    assert response.status_code == 202
+
+
+def test_owned_jobs_are_only_readable_by_their_owner(client, db, user, other):
+    job_id = queue_report(client, user.id, auth(user)).json()["job_id"]
+    assert crud.get_job(db, job_id).user_id == user.id
+
+    for path in (f"/jobs/{job_id}", f"/jobs/{job_id}/result"):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers=auth(other)).status_code == 403
+
+    assert client.get(f"/jobs/{job_id}", headers=auth(user)).json()["status"] == "queued"
+    assert client.get(f"/jobs/{job_id}/result", headers=auth(user)).status_code == 409
+
+
+def test_anonymous_jobs_are_readable_by_id(client, db):
+    crud.create_job(db, "a" * 32, "pdf.summarize", {"mode": "auto"})
+
+    assert client.get(f"/jobs/{'a' * 32}").json()["status"] == "queued"
@@ -0,0 +1,53 @@
+# tests/test_migrations.py
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+from database import crud, migrations
+from database.db import Base
+
+
+def test_fresh_database_gets_every_table(engine):
+    assert set(Base.metadata.tables) <= set(inspect(engine).get_table_names())
+
+
+def test_baseline_only_creates_the_original_tables():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as conn:
+        migrations.baseline(conn)
+    assert set(inspect(engine).get_table_names()) == {
+        "users", "departments", "courses", "course_department", "tests", "study_logs",
+        "resources", "study_groups", "group_members", "study_timetables", "study_habits",
+    }
+
+
+def test_migrations_are_idempotent(engine):
+    assert migrations.run_migrations(engine) == []
+    assert migrations.pending_migrations(engine) == []
+
+
+def test_user_course_stats_migration_backfills(engine, db, user, courses):
+    test = crud.create_test(db, user.id, courses[0].id, [{"question": "q"}], ["A"])
+    crud.submit_test(db, test.id, ["A"])
+    crud.create_study_log(db, user.id, courses[0].id, 3)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM user_course_stats"))
+        conn.execute(text("DELETE FROM schema_migrations WHERE version = 5"))
+
+    assert migrations.run_migrations(engine) == [5]
+
+    db.expire_all()
+    (stats,) = crud.get_user_course_stats(db, user.id)
+    assert (stats.test_count, stats.score_sum, stats.total_hours) == (1, 100, 3)
+
+
+def test_tests_taken_migration_adds_and_backfills_the_column(engine, db, user, courses):
+    crud.create_test(db, user.id, courses[0].id, [{"question": "q"}], ["A"])
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE user_course_stats DROP COLUMN tests_taken"))
+        conn.execute(text("DELETE FROM schema_migrations WHERE version = 7"))
+
+    assert migrations.run_migrations(engine) == [7]
+
+    db.expire_all()
+    (stats,) = crud.get_user_course_stats(db, user.id)
+    assert (stats.tests_taken, stats.test_count) == (1, 0)
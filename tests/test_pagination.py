@@ -0,0 +1,153 @@
+# tests/test_pagination.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+
+from database import crud, models
+from database.db import get_db
+from database.pagination import InvalidCursor, encode_cursor, paginate_sorted
+from tests.conftest import count_queries
+
+
+def add_resources(db, course_id: int, n: int):
+    if not n:
+        return
+    db.execute(insert(models.Resource.__table__), [
+        {"course_id": course_id, "title": f"R{i}", "url": f"/uploads/{i}.pdf", "type": "pdf"} for i in range(n)
+    ])
+    db.commit()
+
+
+def walk(fetch):
+    pages, cursor = [], None
+    while True:
+        page = fetch(cursor)
+        pages.append(page)
+        if page.next_cursor is None:
+            return pages
+        cursor = page.next_cursor
+
+
+@pytest.mark.parametrize("total", [0, 1, 49, 50, 51, 120])
+def test_keyset_walk_returns_every_row_once_in_order(db, courses, total):
+    add_resources(db, courses[0].id, total)
+
+    pages = walk(lambda cursor: crud.list_resources(db, courses[0].id, 50, cursor))
+    ids = [r.id for page in pages for r in page.items]
+
+    assert ids == sorted(ids)
+    assert len(ids) == len(set(ids)) == total
+    assert all(page.next_cursor for page in pages[:-1])
+    assert pages[-1].next_cursor is None
+    assert len(pages) == max(1, -(-total // 50))
+
+
+def test_keyset_page_is_stable_when_rows_change_around_it(db, courses):
+    add_resources(db, courses[0].id, 60)
+    first = crud.list_resources(db, courses[0].id, 50)
+    remaining = [r.id for r in crud.list_resources(db, courses[0].id, 50, first.next_cursor).items]
+
+    # Deleting rows already seen would shift an OFFSET page; new rows land after the cursor
+    for resource in first.items[:5]:
+        crud.delete_resource(db, resource.id)
+    add_resources(db, courses[0].id, 3)
+    second = crud.list_resources(db, courses[0].id, 50, first.next_cursor)
+
+    ids = [r.id for r in second.items]
+    assert ids[:len(remaining)] == remaining
+    assert len(ids) == len(remaining) + 3
+    assert second.next_cursor is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor!",
+    encode_cursor([1, 2]),
+    encode_cursor(["x", "y", "z"]),
+    encode_cursor(["x"]),
+    encode_cursor([[1]]),
+    encode_cursor([True]),
+])
+def test_bad_cursor_raises(db, cursor):
+    with pytest.raises(InvalidCursor):
+        crud.list_resources(db, None, 10, cursor)
+
+
+def test_bad_cursor_is_a_400(db, user):
+    from app import app
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[get_db] = override
+    try:
+        response = TestClient(app).get(f"/tests/user/{user.id}", params={"cursor": "garbage"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 400
+    assert "cursor" in response.json()["detail"].lower()
+
+
+def test_deep_page_costs_the_same_as_the_first(db, engine, courses):
+    add_resources(db, courses[0].id, 5000)
+    second = crud.list_resources(db, courses[0].id, 50, crud.list_resources(db, courses[0].id, 50).next_cursor)
+    deep_cursor = encode_cursor([max(r.id for r in second.items) + 4800])
+
+    plans = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            plans.append(tuple(row[-1] for row in cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)))
+
+    with count_queries(engine) as first_queries:
+        crud.list_resources(db, courses[0].id, 50)
+    event.listen(engine, "before_cursor_execute", explain)
+    try:
+        with count_queries(engine) as near_queries:
+            crud.list_resources(db, courses[0].id, 50, second.next_cursor)
+        with count_queries(engine) as deep_queries:
+            deep = crud.list_resources(db, courses[0].id, 50, deep_cursor)
+    finally:
+        event.remove(engine, "before_cursor_execute", explain)
+
+    assert len(first_queries) == len(near_queries) == len(deep_queries) == 1
+    assert plans[0] == plans[1]
+    assert not any(step.startswith("SCAN") for step in plans[1])
+    assert len(deep.items) == 50
+
+
+def test_paginate_sorted_walks_the_catalog(db):
+    for i in range(7):
+        crud.create_course(db, f"MTH{i}", f"Maths {i}", "100", [])
+    courses = crud.list_courses(db).items
+
+    pages = walk(lambda cursor: paginate_sorted(courses, "id", 3, cursor))
+
+    assert [c.id for page in pages for c in page.items] == [c.id for c in courses]
+    assert [len(page.items) for page in pages] == [3, 3, 1]
+    assert pages[-1].next_cursor is None
+    assert paginate_sorted(courses, "id", 3, encode_cursor([courses[-1].id])).items == []
+
+
+def test_paginate_sorted_rejects_bad_cursor():
+    with pytest.raises(InvalidCursor):
+        paginate_sorted([], "id", 3, "garbage!")
+
+
+@pytest.mark.parametrize("after", ["3", [3], {"id": 3}, True])
+def test_paginate_sorted_rejects_cursor_of_the_wrong_type(db, courses, after):
+    with pytest.raises(InvalidCursor):
+        paginate_sorted(crud.list_courses(db).items, "id", 3, encode_cursor([after]))
+
+
+def test_wrongly_typed_catalog_cursor_is_a_400(db, courses):
+    from app import app
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[get_db] = override
+    try:
+        response = TestClient(app).get("/courses/", params={"cursor": encode_cursor(["3"])})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 400
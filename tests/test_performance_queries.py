@@ -0,0 +1,65 @@
+# tests/test_performance_queries.py
+from database import crud
+from routes.performance import build_report_data, performance_response
+from tests.conftest import count_queries
+
+
+def add_history(db, user, courses, per_course: int):
+    for course in courses:
+        for i in range(per_course):
+            test = crud.create_test(db, user.id, course.id, [{"question": "q"}], ["A"])
+            crud.submit_test(db, test.id, ["A" if i % 2 else "B"])
+            crud.create_study_log(db, user.id, course.id, 1)
+
+
+def summary_queries(db, engine, user_id: int, **kwargs) -> int:
+    db.expire_all()
+    with count_queries(engine) as statements:
+        crud.get_performance_summary(db, user_id, **kwargs)
+    return len(statements)
+
+
+def test_performance_summary_query_count_is_constant(db, engine, user, courses):
+    add_history(db, user, courses, 1)
+    small = summary_queries(db, engine, user.id)
+
+    add_history(db, user, courses, 30)
+    large = summary_queries(db, engine, user.id)
+
+    assert small == large == 4
+
+
+def test_report_summary_skips_trend_queries(db, engine, user, courses):
+    add_history(db, user, courses, 1)
+    small = summary_queries(db, engine, user.id, include_trends=False)
+
+    add_history(db, user, courses, 30)
+    assert summary_queries(db, engine, user.id, include_trends=False) == small == 2
+
+
+def test_performance_summary_matches_history(db, user, courses):
+    add_history(db, user, courses, 4)
+
+    summary = crud.get_performance_summary(db, user.id)
+    response = performance_response(summary)
+
+    assert len(summary["test_trend"]) == 12
+    assert response["average_score"] == 50
+    assert {course for course, _ in response["weekly_study"]} == {c.code for c in courses}
+    assert build_report_data(db, user.id)["overall_avg"] == 50
+
+
+def test_course_with_only_unscored_tests_keeps_its_row(db, user, courses):
+    scored = crud.create_test(db, user.id, courses[0].id, [{"question": "q"}], ["A"])
+    crud.submit_test(db, scored.id, ["A"])
+    crud.create_test(db, user.id, courses[1].id, [{"question": "q"}], ["A"])
+
+    rows = {row.course_id: row for row in crud.get_course_scores(db, user.id)}
+    assert rows.keys() == {courses[0].id, courses[1].id}
+    assert rows[courses[0].id].avg_score == 100
+    assert rows[courses[1].id].avg_score is None
+
+    summary = crud.get_performance_summary(db, user.id)
+    assert summary["overall_avg"] == 100
+    assert f"ℹ️ {courses[1].code} - {courses[1].title}: No average score available yet." in performance_response(summary)["ai_insights"]
+    assert (courses[1].id, None) in crud.get_dashboard_data(db, user.id)["test_data"]
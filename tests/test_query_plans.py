@@ -0,0 +1,108 @@
+# tests/test_query_plans.py
+"""
+The hot per-user reads must be served by the indexes from migration 2.
+
+Statements are captured from the real crud functions, so the check follows the
+SQL production sends. Runs on SQLite always, and on Postgres as well when
+DATABASE_URL points at one: the schema is migrated there and the seeded rows are
+rolled back. Postgres plans are taken after ANALYZE, with seq scans allowed.
+"""
+import pytest
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+
+from database import crud, models
+from tests.conftest import POSTGRES_URL, make_engine
+
+USERS = 200
+COURSES = 10
+
+HOT_READS = [
+    ("test trend", lambda db, u, c: crud.get_test_trend(db, u), "tests", "ix_tests_user_course_created"),
+    ("course tests", lambda db, u, c: crud.get_course_tests(db, u, c), "tests", "ix_tests_user_course_created"),
+    ("weekly study hours", lambda db, u, c: crud.get_weekly_course_hours(db, u), "study_logs", "ix_study_logs_user_date"),
+    ("study trend", lambda db, u, c: crud.get_study_trend(db, u), "study_logs", "ix_study_logs_user_date"),
+    ("user timetable", lambda db, u, c: crud.get_user_timetable(db, u), "study_timetables", "ix_study_timetables_user"),
+    ("course resources", lambda db, u, c: crud.list_resources(db, c, 20), "resources", "ix_resources_course"),
+    ("study habits", lambda db, u, c: crud.get_study_habits(db, u), "study_habits", "ix_study_habits_user"),
+]
+
+
+def seed(conn):
+    """Enough rows per table that a cost-based planner prefers the per-user indexes."""
+    conn.execute(insert(models.User.__table__), [
+        {"matric_no": f"plan-check-{i}", "name": "Plan", "email": f"plan-check-{i}@example.com",
+         "department": "CS", "level": "100"}
+        for i in range(USERS)
+    ])
+    conn.execute(insert(models.Course.__table__), [
+        {"code": f"PLAN{i}", "title": "Plan", "level": "100"} for i in range(COURSES)
+    ])
+    user_ids = list(conn.scalars(select(models.User.id).where(models.User.matric_no.like("plan-check-%"))))
+    course_ids = list(conn.scalars(select(models.Course.id).where(models.Course.code.like("PLAN%"))))
+
+    pairs = [(u, c) for u in user_ids for c in course_ids]
+    conn.execute(insert(models.Test.__table__), [
+        {"user_id": u, "course_id": c, "questions": [], "correct_answers": [], "score": 50} for u, c in pairs
+    ])
+    conn.execute(insert(models.StudyLog.__table__), [
+        {"user_id": u, "course_id": c, "hours_studied": 1} for u, c in pairs
+    ])
+    conn.execute(insert(models.StudyTimetable.__table__), [
+        {"user_id": u, "course_id": c, "day_of_week": "Monday", "start_time": "08:00", "end_time": "10:00"}
+        for u, c in pairs
+    ])
+    conn.execute(insert(models.StudyHabit.__table__), [
+        {"user_id": u, "preferred_time": "morning", "hours_per_day": 2} for u in user_ids
+    ])
+    conn.execute(insert(models.Resource.__table__), [
+        {"course_id": c, "title": "Notes", "url": f"/uploads/{c}-{i}.pdf", "type": "pdf"}
+        for c in course_ids for i in range(USERS)
+    ])
+    conn.exec_driver_sql("ANALYZE")
+    return user_ids[0], course_ids[0]
+
+
+def explain(conn, statement: str, parameters) -> str:
+    if conn.dialect.name == "sqlite":
+        return "\n".join(str(row[-1]) for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+    return "\n".join(row[0] for row in conn.exec_driver_sql(f"EXPLAIN {statement}", parameters))
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def seeded(request):
+    if request.param == "postgresql" and not POSTGRES_URL:
+        pytest.skip("DATABASE_URL does not point at a Postgres database")
+    engine = make_engine("sqlite://" if request.param == "sqlite" else POSTGRES_URL)
+    conn = engine.connect()
+    transaction = conn.begin()
+    user_id, course_id = seed(conn)
+    db = Session(bind=conn, join_transaction_mode="create_savepoint")
+    try:
+        yield engine, conn, db, user_id, course_id
+    finally:
+        db.close()
+        transaction.rollback()
+        conn.close()
+        engine.dispose()
+
+
+@pytest.mark.parametrize("label, read, table, index_name", HOT_READS, ids=[r[0] for r in HOT_READS])
+def test_hot_read_uses_index(seeded, label, read, table, index_name):
+    engine, conn, db, user_id, course_id = seeded
+    captured = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        read(db, user_id, course_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    reads = [(s, p) for s, p in captured if f"FROM {table}" in s]
+    assert reads, f"{label} did not read {table}"
+    for statement, parameters in reads:
+        plan = explain(conn, statement, parameters)
+        assert index_name in plan, f"{label} does not use {index_name}:\n{plan}"
@@ -0,0 +1,69 @@
+# tests/test_retrieval.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from chatbot import retrieval
+from chatbot.retrieval import Chunk, ResourceRetriever
+from database import crud
+
+
+@pytest.fixture
+def slow_extraction(engine, monkeypatch):
+    """load_chunks that blocks until released and counts its calls."""
+    release = threading.Event()
+    calls = []
+
+    def load_chunks(resource_id, title, path):
+        calls.append(resource_id)
+        release.wait(5)
+        return [Chunk(resource_id, title, 1, 1, "photosynthesis turns light into chemical energy")]
+
+    monkeypatch.setattr(retrieval, "load_chunks", load_chunks)
+    monkeypatch.setattr(retrieval, "forget_chunks", lambda resource_id: None)
+    monkeypatch.setattr(retrieval, "SessionLocal", sessionmaker(bind=engine))
+    yield release, calls
+    release.set()
+
+
+def wait_indexed(retriever, course_id, resource_id):
+    for _ in range(500):
+        if resource_id in retriever._index(course_id).resources:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("resource was never indexed")
+
+
+def test_search_does_not_wait_for_extraction(db, courses, slow_extraction):
+    release, calls = slow_extraction
+    resource = crud.create_resource(db, "Biology notes", "/uploads/bio.pdf", "pdf", courses[0].id)
+    retriever = ResourceRetriever()
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: retriever.search(courses[0].id, "photosynthesis"), range(8)))
+
+    assert results == [[]] * 8
+    release.set()
+    wait_indexed(retriever, courses[0].id, resource.id)
+    assert calls == [resource.id]
+    assert [chunk.resource_id for _, chunk in retriever.search(courses[0].id, "photosynthesis")] == [resource.id]
+    retriever.shutdown()
+
+
+def test_resource_deleted_while_indexing_stays_out(db, courses, slow_extraction):
+    release, calls = slow_extraction
+    retriever = ResourceRetriever()
+    retriever.schedule(courses[0].id, 1, "Biology notes", "/uploads/bio.pdf")
+    retriever.schedule(courses[0].id, 1, "Biology notes", "/uploads/bio.pdf")
+    retriever.remove_resource(1)
+    release.set()
+
+    for _ in range(500):
+        if not retriever._in_flight:
+            break
+        threading.Event().wait(0.01)
+    assert calls == [1]
+    assert 1 not in retriever._index(courses[0].id).resources
+    retriever.shutdown()
@@ -0,0 +1,54 @@
+# tests/test_user_course_stats.py
+from datetime import datetime
+
+from database import crud
+
+
+def stats_for(db, user_id, course_id):
+    db.expire_all()
+    return next(s for s in crud.get_user_course_stats(db, user_id) if s.course_id == course_id)
+
+
+def take_test(db, user, course, answer):
+    test = crud.create_test(db, user.id, course.id, [{"question": "q"}], ["A"])
+    return crud.submit_test(db, test.id, [answer])
+
+
+def test_deleting_the_latest_test_restores_the_previous_score(db, user, courses):
+    first = take_test(db, user, courses[0], "A")
+    latest = take_test(db, user, courses[0], "B")
+    assert stats_for(db, user.id, courses[0].id).last_score == 0
+
+    crud.delete_test(db, latest.id)
+    stats = stats_for(db, user.id, courses[0].id)
+    assert (stats.tests_taken, stats.test_count, stats.score_sum, stats.last_score) == (1, 1, 100, 100)
+
+    crud.delete_test(db, first.id)
+    stats = stats_for(db, user.id, courses[0].id)
+    assert (stats.tests_taken, stats.test_count, stats.score_sum, stats.last_score) == (0, 0, 0, None)
+
+
+def test_deleting_all_tests_clears_every_course(db, user, courses):
+    for course in courses[:2]:
+        take_test(db, user, course, "A")
+    crud.create_test(db, user.id, courses[1].id, [{"question": "q"}], ["A"])
+
+    assert crud.delete_all_tests_for_user(db, user.id) == 3
+    for course in courses[:2]:
+        stats = stats_for(db, user.id, course.id)
+        assert (stats.tests_taken, stats.test_count, stats.last_score) == (0, 0, None)
+
+
+def test_deleting_the_latest_study_log_restores_the_previous_date(db, user, courses):
+    earlier = crud.create_study_log(db, user.id, courses[0].id, 2)
+    latest = crud.create_study_log(db, user.id, courses[0].id, 3)
+    earlier.date, latest.date = datetime(2026, 1, 5, 9), datetime(2026, 2, 5, 9)
+    db.commit()
+
+    crud.delete_study_log(db, latest.id)
+    stats = stats_for(db, user.id, courses[0].id)
+    assert (stats.total_hours, stats.last_studied_at) == (2, datetime(2026, 1, 5, 9))
+
+    crud.delete_study_log(db, earlier.id)
+    stats = stats_for(db, user.id, courses[0].id)
+    assert (stats.total_hours, stats.last_studied_at) == (0, None)
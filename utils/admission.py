@@ -0,0 +1,255 @@
+# utils/admission.py
+"""
+Admission control for the expensive (AI and report) endpoints.
+
+Two checks, both answering with an immediate 429 + Retry-After instead of
+letting a request queue behind model calls:
+
+1. A token bucket per caller and endpoint class. Requests spend tokens in
+   proportion to their cost (e.g. num_questions / 10 for a test), and the
+   bucket refills at a steady rate. A request costing more than a full
+   bucket can never be admitted and gets a 413.
+2. A global cap on admitted requests in flight (ADMISSION_MAX_CONCURRENT)
+   with a bounded wait queue (ADMISSION_MAX_QUEUE). When the queue is full,
+   or a queued request waits longer than ADMISSION_QUEUE_TIMEOUT, it is
+   turned away.
+
+Callers are identified by their access token's subject, or by client IP for
+anonymous endpoints. Attach to a route with
+`dependencies=[Depends(admission("tests", cost=...))]`, where the cost is
+itself a dependency, so its parameters are validated (422) before anything
+is charged.
+
+FastAPI tears dependencies down before a streamed body is sent, so
+streaming routes take the slot as a parameter
+(`slot: AdmissionSlot = Depends(admission(...))`) and return a
+HeldStreamingResponse, which keeps it until the stream has finished.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+
+from cachetools import LRUCache
+from dotenv import load_dotenv
+from fastapi import Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.requests import HTTPConnection
+from fastapi.responses import StreamingResponse
+
+from utils import metrics
+from utils.question_bank import MAX_TEST_QUESTIONS
+from utils.uploads import MAX_UPLOAD_BYTES, _too_large
+
+load_dotenv()
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", 32))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 64))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 10))
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", 50000))
+
+# Per endpoint class: (bucket capacity, tokens refilled per minute).
+# Override with ADMISSION_<CLASS>_CAPACITY / ADMISSION_<CLASS>_PER_MINUTE.
+# A capacity must cover the endpoint's largest valid request (50 questions, a 25 MB PDF).
+BUCKETS = {
+    "tests": (10, 5),
+    "pdf": (5, 2),
+    "chatbot": (20, 10),
+    "report": (10, 10),
+}
+
+admission_rejections = metrics.registry.counter(
+    "admission_rejections_total", "Requests turned away with 429 by admission control.", ("endpoint", "reason"),
+)
+
+
+def _too_many(endpoint: str, reason: str, retry_after: float, detail: str) -> HTTPException:
+    admission_rejections.inc(endpoint, reason)
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+def _too_costly(endpoint: str, cost: float, capacity: float) -> HTTPException:
+    admission_rejections.inc(endpoint, "too_large")
+    return HTTPException(
+        status_code=413,
+        detail=f"This request costs {cost:g} rate-limit tokens; at most {capacity:g} are allowed per request.",
+    )
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, per_second: float):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, cost: float) -> float:
+        """Spend `cost` (at most `capacity`) tokens; returns 0 if allowed, else seconds until it would be."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.per_second
+
+    def refund(self, cost: float):
+        self.tokens = min(self.capacity, self.tokens + cost)
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int = ADMISSION_MAX_CONCURRENT, max_queue: int = ADMISSION_MAX_QUEUE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._buckets = LRUCache(maxsize=ADMISSION_MAX_CLIENTS)
+        self._lock = threading.Lock()
+        self._semaphore = None
+        self.active = 0
+        self.waiting = 0
+
+    def _limits(self, endpoint: str) -> tuple[float, float]:
+        capacity, per_minute = BUCKETS.get(endpoint, (10, 10))
+        capacity = float(os.getenv(f"ADMISSION_{endpoint.upper()}_CAPACITY", capacity))
+        per_minute = float(os.getenv(f"ADMISSION_{endpoint.upper()}_PER_MINUTE", per_minute))
+        return capacity, per_minute / 60
+
+    def charge(self, endpoint: str, client: str, cost: float):
+        """Take `cost` tokens from the client's bucket or raise 429 (413 if it exceeds the bucket)."""
+        with self._lock:
+            bucket = self._buckets.get((endpoint, client))
+            if bucket is None:
+                bucket = self._buckets[(endpoint, client)] = TokenBucket(*self._limits(endpoint))
+            if cost > bucket.capacity:
+                raise _too_costly(endpoint, cost, bucket.capacity)
+            wait = bucket.take(cost)
+        if wait:
+            raise _too_many(endpoint, "rate", wait, "Rate limit exceeded for this endpoint. Try again later.")
+
+    def refund(self, endpoint: str, client: str, cost: float):
+        with self._lock:
+            bucket = self._buckets.get((endpoint, client))
+            if bucket is not None:
+                bucket.refund(cost)
+
+    async def acquire(self, endpoint: str):
+        """Take a concurrency slot, queueing briefly if the queue has room; raise 429 otherwise."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                raise _too_many(endpoint, "queue_full", 1, "Server is busy. Try again shortly.")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise _too_many(endpoint, "queue_timeout", 1, "Server is busy. Try again shortly.")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "tracked_clients": len(self._buckets),
+        }
+
+
+admission_controller = AdmissionController()
+
+
+def client_key(request: HTTPConnection) -> str:
+    """The caller's token subject if they sent a valid one, else their IP."""
+    from auth.utils import decode_access_token
+
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            return "user:" + decode_access_token(authorization[7:])
+        except HTTPException:
+            pass
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+class AdmissionSlot:
+    """A concurrency slot taken by admit(); release() is safe to call more than once."""
+
+    def __init__(self, held: bool):
+        self.held = held
+        self.handed_off = False
+
+    def release(self):
+        if self.held:
+            self.held = False
+            admission_controller.release()
+
+
+async def admit(endpoint: str, client: str, cost: float = 1) -> AdmissionSlot:
+    """Charge the client's bucket and take a concurrency slot (by hand, e.g. per WebSocket message)."""
+    if not ADMISSION_ENABLED:
+        return AdmissionSlot(held=False)
+    admission_controller.charge(endpoint, client, cost)
+    try:
+        await admission_controller.acquire(endpoint)
+    except HTTPException:
+        admission_controller.refund(endpoint, client, cost)
+        raise
+    return AdmissionSlot(held=True)
+
+
+def unit_cost() -> float:
+    return 1
+
+
+def admission(endpoint: str, cost=unit_cost):
+    """Dependency factory; `cost` is a dependency returning how many bucket tokens the request spends."""
+
+    async def dependency(request: Request, spend: float = Depends(cost)):
+        slot = await admit(endpoint, client_key(request), spend)
+        try:
+            yield slot
+        finally:
+            if not slot.handed_off:
+                slot.release()
+
+    return dependency
+
+
+class HeldStreamingResponse(StreamingResponse):
+    """A StreamingResponse that keeps the request's admission slot until the body has been sent or the client has gone."""
+
+    def __init__(self, slot: AdmissionSlot, content, **kwargs):
+        super().__init__(content, **kwargs)
+        slot.handed_off = True
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+
+# === COSTS ===
+def test_cost(num_questions: int = Query(10, ge=1, le=MAX_TEST_QUESTIONS)) -> float:
+    """One token per 10 questions asked for."""
+    return math.ceil(num_questions / 10)
+
+
+def upload_cost(file: UploadFile = File(...)) -> float:
+    """One token per started 5 MB of the file as received, whatever the request declared."""
+    if file.size > MAX_UPLOAD_BYTES:
+        raise _too_large(MAX_UPLOAD_BYTES)
+    return max(1, math.ceil(file.size / (5 * 1024 * 1024)))
@@ -0,0 +1,267 @@
+# utils/jobs.py
+"""
+In-process background jobs for work too slow for one HTTP request.
+
+Routes that offer `?async=true` submit a job (a kind plus JSON params, and
+optionally a spooled upload, which is moved into JOB_DATA_DIR) and answer
+202 with its id straight away; clients then poll GET /jobs/{id}. A job
+submitted by a signed-in user records them as its owner, and only they can
+read it; anonymous jobs are reached by their random id alone. Each kind
+is registered with a handler and a worker pool ("ai" for model calls,
+"documents" for OCR and PDF rendering), and each pool runs
+JOB_<POOL>_WORKERS asyncio workers started with the app.
+
+State lives in the jobs table, not in memory. Workers claim the oldest
+runnable job with a conditional UPDATE, so several app processes can share
+the table. A claimed job holds a lease of JOB_TIMEOUT_SECONDS plus a margin;
+on a clean shutdown running jobs are handed back at once, and if the process
+dies instead the lease lapses and another worker runs the job again, up to
+JOB_MAX_ATTEMPTS times. Finished jobs and their files are pruned after
+JOB_RETENTION_HOURS.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from database import crud
+from database.db import SessionLocal
+from utils import metrics
+from utils.uploads import SpooledUpload
+
+load_dotenv()
+
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "true").lower() in ("1", "true", "yes")  # false: submit only, run nothing here
+JOB_POOLS = {
+    "ai": int(os.getenv("JOB_AI_WORKERS", 4)),
+    "documents": int(os.getenv("JOB_DOCUMENTS_WORKERS", 2)),
+}
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", 600))
+JOB_LEASE_MARGIN_SECONDS = 60
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 5))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", 24))
+JOB_DATA_DIR = os.getenv("JOB_DATA_DIR", os.path.join("cache", "jobs"))
+
+jobs_submitted = metrics.registry.counter("jobs_submitted_total", "Background jobs submitted.", ("kind",))
+job_duration = metrics.registry.histogram(
+    "job_duration_seconds", "Wall time of background jobs by outcome.", ("kind", "status"),
+    buckets=(0.5, 1, 5, 15, 30, 60, 120, 300, 600),
+)
+
+Handler = Callable[[str, dict], Awaitable[dict]]
+
+
+@dataclass
+class JobKind:
+    handler: Handler
+    pool: str
+
+
+_kinds: dict[str, JobKind] = {}
+_spawned: set = set()
+
+
+def register(kind: str, pool: str):
+    """Decorator: run `async def handler(job_id, params) -> dict` for jobs of this kind in the given pool."""
+    if pool not in JOB_POOLS:
+        raise ValueError(f"Unknown job pool: {pool}")
+
+    def decorate(handler: Handler) -> Handler:
+        _kinds[kind] = JobKind(handler, pool)
+        return handler
+
+    return decorate
+
+
+def spawn(coro):
+    """Fire-and-forget follow-up work from a handler (the job finishes without waiting for it)."""
+    task = asyncio.create_task(coro)
+    _spawned.add(task)
+    task.add_done_callback(_spawned.discard)
+    return task
+
+
+def _with_db(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+# === FILES ===
+def input_path(job_id: str) -> str:
+    return os.path.join(JOB_DATA_DIR, f"{job_id}.input")
+
+
+def artifact_path(job_id: str) -> str:
+    return os.path.join(JOB_DATA_DIR, f"{job_id}.out")
+
+
+def job_upload(job_id: str, params: dict) -> SpooledUpload:
+    """The upload a job was submitted with, as it was spooled by the route."""
+    upload = params["upload"]
+    return SpooledUpload(path=input_path(job_id), filename=upload["filename"], size=upload["size"], sha256=upload["sha256"])
+
+
+def save_artifact(job_id: str, data: bytes, filename: str, media_type: str) -> dict:
+    """Store a binary result for GET /jobs/{id}/result; returns the job result describing it."""
+    os.makedirs(JOB_DATA_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=JOB_DATA_DIR, suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, artifact_path(job_id))
+    return {"filename": filename, "media_type": media_type, "size": len(data), "download_url": f"/jobs/{job_id}/result"}
+
+
+def _remove(*paths: str):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def require_owner(current_user, user_id: int) -> int:
+    """Jobs that act on a user's data may only be queued by that user; returns the owner id to record."""
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    if current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="You can only queue jobs for your own account")
+    return current_user.id
+
+
+def accepted(job_id: str) -> JSONResponse:
+    """The 202 answer for an `?async=true` request."""
+    status_url = f"/jobs/{job_id}"
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "status_url": status_url},
+        headers={"Location": status_url},
+    )
+
+
+# === QUEUE ===
+class JobQueue:
+    def __init__(self):
+        self._wake: dict[str, asyncio.Event] = {}
+        self._tasks: list[asyncio.Task] = []
+        self.running = 0
+
+    async def submit(self, kind: str, params: dict, user_id: int | None = None, upload: SpooledUpload | None = None) -> str:
+        """Persist a job and wake a worker; returns the job id. A given upload is moved into the job's storage."""
+        if kind not in _kinds:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid4().hex
+        params = dict(params)
+        if upload is not None:
+            os.makedirs(JOB_DATA_DIR, exist_ok=True)
+            await run_in_threadpool(shutil.move, upload.path, input_path(job_id))
+            params["upload"] = {"filename": upload.filename, "size": upload.size, "sha256": upload.sha256}
+        try:
+            await run_in_threadpool(_with_db, crud.create_job, job_id, kind, params, user_id)
+        except BaseException:
+            _remove(input_path(job_id))
+            raise
+        jobs_submitted.inc(kind)
+        wake = self._wake.get(_kinds[kind].pool)
+        if wake is not None:
+            wake.set()
+        return job_id
+
+    async def start(self):
+        if not JOBS_ENABLED or self._tasks:
+            return
+        os.makedirs(JOB_DATA_DIR, exist_ok=True)
+        for pool, workers in JOB_POOLS.items():
+            kinds = [kind for kind, spec in _kinds.items() if spec.pool == pool]
+            if not kinds:
+                continue
+            self._wake[pool] = asyncio.Event()
+            self._tasks += [asyncio.create_task(self._worker(pool, kinds)) for _ in range(workers)]
+        self._tasks.append(asyncio.create_task(self._janitor()))
+        print(f"✅ Job workers started: {', '.join(f'{p}={n}' for p, n in JOB_POOLS.items())}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wake = {}
+
+    async def _worker(self, pool: str, kinds: list[str]):
+        wake = self._wake[pool]
+        lease = JOB_TIMEOUT_SECONDS + JOB_LEASE_MARGIN_SECONDS
+        while True:
+            wake.clear()
+            try:
+                job = await run_in_threadpool(_with_db, crud.claim_job, kinds, lease)
+            except Exception as e:
+                print(f"❌ Job worker ({pool}) could not claim a job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(wake.wait(), JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job):
+        started = time.perf_counter()
+        result, error = None, None
+        if job.attempts > JOB_MAX_ATTEMPTS:
+            error = "Job was interrupted too many times."
+        else:
+            self.running += 1
+            try:
+                result = await asyncio.wait_for(_kinds[job.kind].handler(job.id, job.params), JOB_TIMEOUT_SECONDS)
+            except asyncio.CancelledError:
+                await run_in_threadpool(_with_db, crud.requeue_job, job.id)
+                raise
+            except asyncio.TimeoutError:
+                error = f"Job timed out after {JOB_TIMEOUT_SECONDS:g}s."
+            except HTTPException as e:
+                error = str(e.detail)
+            except Exception as e:
+                print(f"❌ Job {job.id} ({job.kind}) failed: {e}")
+                error = str(e) or type(e).__name__
+            finally:
+                self.running -= 1
+
+        status = "failed" if error else "succeeded"
+        await run_in_threadpool(_with_db, crud.finish_job, job.id, status, result, error)
+        _remove(input_path(job.id), *([artifact_path(job.id)] if error else []))
+        job_duration.observe(time.perf_counter() - started, job.kind, status)
+
+    async def _janitor(self):
+        while True:
+            try:
+                cutoff = datetime.now(timezone.utc) - timedelta(hours=JOB_RETENTION_HOURS)
+                for job_id in await run_in_threadpool(_with_db, crud.prune_jobs, cutoff):
+                    _remove(input_path(job_id), artifact_path(job_id))
+            except Exception as e:
+                print(f"❌ Job cleanup failed: {e}")
+            await asyncio.sleep(3600)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": JOBS_ENABLED,
+            "pools": {pool: workers for pool, workers in JOB_POOLS.items() if pool in self._wake},
+            "running_here": self.running,
+            "jobs": _with_db(crud.count_jobs_by_status),
+        }
+
+
+job_queue = JobQueue()
@@ -0,0 +1,200 @@
+# utils/llm_gateway.py
+"""
+Single entry point for every Gemini call.
+
+One long-lived `google.genai` client is shared by the whole process and used
+through its async (`client.aio`) surface, so model calls never pin a
+threadpool worker. Each call takes a slot from a global semaphore and from
+its endpoint's semaphore, and is bounded by a timeout.
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from google import genai
+
+from utils import metrics
+
+load_dotenv()
+
+# === CONFIG ===
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
+# "gemini" (google.genai) or "stub" (utils/llm_stub.py, offline, for load tests)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+
+# Per-endpoint caps, overridable with LLM_CONCURRENCY_<ENDPOINT>, e.g. LLM_CONCURRENCY_PDF=2
+ENDPOINT_CONCURRENCY = {
+    "tests": 8,
+    "pdf": 4,
+    "chatbot": 8,
+}
+
+
+class LLMError(Exception):
+    """A model call failed."""
+
+
+class LLMTimeout(LLMError):
+    """A model call did not finish within LLM_TIMEOUT_SECONDS."""
+
+
+_client = None
+_global_limit = None
+_endpoint_limits = {}
+
+
+def get_client() -> genai.Client:
+    global _client
+    if _client is None:
+        if LLM_BACKEND == "stub":
+            from utils.llm_stub import StubClient
+
+            _client = StubClient()
+        else:
+            _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    return _client
+
+
+def _endpoint_limit(endpoint: str) -> asyncio.Semaphore:
+    if endpoint not in _endpoint_limits:
+        default = ENDPOINT_CONCURRENCY.get(endpoint, LLM_MAX_CONCURRENCY)
+        _endpoint_limits[endpoint] = asyncio.Semaphore(int(os.getenv(f"LLM_CONCURRENCY_{endpoint.upper()}", default)))
+    return _endpoint_limits[endpoint]
+
+
+@asynccontextmanager
+async def slot(endpoint: str):
+    """Hold one global and one per-endpoint concurrency slot."""
+    global _global_limit
+    if _global_limit is None:
+        _global_limit = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    queued_at = time.perf_counter()
+    async with _endpoint_limit(endpoint):
+        async with _global_limit:
+            metrics.llm_queue_seconds.observe(time.perf_counter() - queued_at, endpoint)
+            yield
+
+
+def _observe(endpoint: str, model: str, call: str, seconds: float, status: str, error: str = "", usage=None):
+    metrics.llm_request_seconds.observe(seconds, endpoint, model, call, status)
+    metrics.llm_requests.inc(endpoint, model, call, status, error)
+    if usage is not None:
+        if usage.prompt_token_count is not None:
+            metrics.llm_prompt_tokens.observe(usage.prompt_token_count, endpoint, model)
+        if usage.candidates_token_count is not None:
+            metrics.llm_response_tokens.observe(usage.candidates_token_count, endpoint, model)
+
+
+async def _call(endpoint: str, make_call, timeout: float | None, model: str = "", call: str = "generate"):
+    async with slot(endpoint):
+        started = time.perf_counter()
+        status, error, response = "cancelled", "", None
+        try:
+            response = await asyncio.wait_for(make_call(), timeout=timeout or LLM_TIMEOUT_SECONDS)
+            status = "ok"
+            return response
+        except asyncio.TimeoutError:
+            status, error = "error", "LLMTimeout"
+            raise LLMTimeout(f"Model call for '{endpoint}' timed out")
+        except LLMError as e:
+            status, error = "error", type(e).__name__
+            raise
+        except Exception as e:
+            status, error = "error", type(e).__name__
+            raise LLMError(str(e)) from e
+        finally:
+            _observe(endpoint, model, call, time.perf_counter() - started, status, error,
+                     getattr(response, "usage_metadata", None))
+
+
+# === CALLS ===
+async def generate(endpoint: str, contents, model: str, config=None, timeout: float | None = None) -> str:
+    """One-shot generate_content; returns the response text."""
+    client = get_client()
+    response = await _call(
+        endpoint,
+        lambda: client.aio.models.generate_content(model=model, contents=contents, config=config),
+        timeout,
+        model=model,
+    )
+    return response.text or ""
+
+
+async def upload_file(endpoint: str, path: str, mime_type: str, timeout: float | None = None):
+    """Upload a local file to the Gemini Files API by path; pass the result in `contents` and delete it after."""
+    client = get_client()
+    return await _call(
+        endpoint,
+        lambda: client.aio.files.upload(file=path, config={"mime_type": mime_type}),
+        timeout,
+        call="upload",
+    )
+
+
+async def delete_file(name: str):
+    try:
+        await get_client().aio.files.delete(name=name)
+    except Exception:
+        pass  # uploaded files expire on their own after 48 hours
+
+
+async def chat(endpoint: str, model: str, history: list, message: str, timeout: float | None = None):
+    """Send one chat turn on top of `history`; returns (reply text, updated history)."""
+    client = get_client()
+    session = client.aio.chats.create(model=model, history=history)
+    response = await _call(endpoint, lambda: session.send_message(message), timeout, model=model, call="chat")
+    return response.text or "", session.get_history()
+
+
+async def _stream(endpoint: str, make_stream, timeout: float | None, model: str = "", call: str = "stream"):
+    """Hold the slots for the whole stream; `timeout` bounds the wait for each chunk."""
+    timeout = timeout or LLM_TIMEOUT_SECONDS
+    async with slot(endpoint):
+        started = time.perf_counter()
+        status, error, usage = "cancelled", "", None
+        try:
+            stream = await asyncio.wait_for(make_stream(), timeout=timeout)
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    break
+                usage = chunk.usage_metadata or usage  # the final chunk carries the totals
+                if chunk.text:
+                    yield chunk.text
+            status = "ok"
+        except asyncio.TimeoutError:
+            status, error = "error", "LLMTimeout"
+            raise LLMTimeout(f"Model stream for '{endpoint}' timed out")
+        except LLMError as e:
+            status, error = "error", type(e).__name__
+            raise
+        except Exception as e:
+            status, error = "error", type(e).__name__
+            raise LLMError(str(e)) from e
+        finally:
+            _observe(endpoint, model, call, time.perf_counter() - started, status, error, usage)
+
+
+async def generate_stream(endpoint: str, contents, model: str, config=None, timeout: float | None = None):
+    """Streaming generate_content; yields text chunks as they arrive."""
+    client = get_client()
+    async for text in _stream(
+        endpoint,
+        lambda: client.aio.models.generate_content_stream(model=model, contents=contents, config=config),
+        timeout,
+        model=model,
+    ):
+        yield text
+
+
+async def chat_stream(endpoint: str, model: str, history: list, message: str, timeout: float | None = None):
+    """Streaming chat turn on top of `history`; yields reply text chunks as they arrive."""
+    client = get_client()
+    session = client.aio.chats.create(model=model, history=history)
+    async for text in _stream(endpoint, lambda: session.send_message_stream(message), timeout, model=model, call="chat_stream"):
+        yield text
@@ -0,0 +1,224 @@
+# utils/llm_stub.py
+"""
+Offline stand-in for the `google.genai` client, selected with LLM_BACKEND=stub.
+
+It implements the part of the `client.aio` surface that utils/llm_gateway
+uses (models.generate_content[_stream], chats, files), so every AI route
+runs unchanged without network or quota. Replies are shaped like the real
+ones: MCQ JSON lists for test prompts, the 📖/📝/❓ layout for summaries,
+plain text for chat.
+
+Output text depends only on the request, so it is stable across runs.
+Latency and failures come from a RNG seeded with LLM_STUB_SEED, so a load
+test replays the same sequence.
+
+Config:
+    LLM_STUB_LATENCY        fixed | uniform | lognormal (default)
+    LLM_STUB_LATENCY_MS     median (lognormal), mean (uniform) or exact (fixed) latency, default 800
+    LLM_STUB_LATENCY_SIGMA  lognormal shape, default 0.5 (uniform: +/- this fraction of the mean)
+    LLM_STUB_FAILURE_RATE   probability a call raises, default 0
+    LLM_STUB_SEED           default 42
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_STUB_LATENCY = os.getenv("LLM_STUB_LATENCY", "lognormal").lower()
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", 800))
+LLM_STUB_LATENCY_SIGMA = float(os.getenv("LLM_STUB_LATENCY_SIGMA", 0.5))
+LLM_STUB_FAILURE_RATE = float(os.getenv("LLM_STUB_FAILURE_RATE", 0))
+LLM_STUB_SEED = int(os.getenv("LLM_STUB_SEED", 42))
+
+STREAM_CHUNKS = 8
+
+
+class StubError(Exception):
+    """Simulated upstream failure."""
+
+
+class StubBehaviour:
+    """Latency and failure draws, shared by every call on one client."""
+
+    def __init__(self, latency=LLM_STUB_LATENCY, latency_ms=LLM_STUB_LATENCY_MS, sigma=LLM_STUB_LATENCY_SIGMA,
+                 failure_rate=LLM_STUB_FAILURE_RATE, seed=LLM_STUB_SEED):
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+
+    def draw_latency(self) -> float:
+        if self.latency == "fixed":
+            ms = self.latency_ms
+        elif self.latency == "uniform":
+            ms = self.rng.uniform(self.latency_ms * (1 - self.sigma), self.latency_ms * (1 + self.sigma))
+        else:
+            ms = self.rng.lognormvariate(math.log(self.latency_ms), self.sigma)
+        return max(ms, 0) / 1000
+
+    def draw_failure(self) -> bool:
+        return self.rng.random() < self.failure_rate
+
+
+# === CANNED RESPONSES ===
+def _text_of(contents) -> str:
+    """Flatten prompt contents (str, Part-like objects, dicts, lists) to the text we pattern-match on."""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_text_of(c) for c in contents)
+    if isinstance(contents, dict):
+        return _text_of(contents.get("parts") or contents.get("text") or "")
+    return getattr(contents, "text", None) or ""
+
+
+def _rng_for(text: str) -> random.Random:
+    return random.Random(hashlib.sha256(text.encode()).digest())
+
+
+def mcq_response(prompt: str) -> str:
+    match = re.search(r"Generate (\d+) multiple-choice questions for the course (.+?)\.\s", prompt)
+    count = int(match.group(1)) if match else 5
+    course = match.group(2) if match else "the course"
+    rng = _rng_for(prompt)
+    questions = []
+    for i in range(count):
+        topic = rng.randint(1000, 9999)
+        questions.append({
+            "question": f"[stub] {course}: question {i + 1} on topic {topic}?",
+            "options": [f"A. option {topic}-1", f"B. option {topic}-2", f"C. option {topic}-3", f"D. option {topic}-4"],
+            "answer": rng.choice("ABCD"),
+        })
+    return "```json\n" + json.dumps(questions, indent=2) + "\n```"
+
+
+def summary_response(prompt: str) -> str:
+    rng = _rng_for(prompt)
+    points = [f"- Key idea {rng.randint(1, 999)}" for _ in range(4)]
+    return (
+        "📖 Main Points\n" + "\n".join(points[:2]) + "\n\n"
+        "📝 To Remember\n" + "\n".join(points[2:]) + "\n\n"
+        "❓ Possible Exam Questions\n- Explain key idea " + str(rng.randint(1, 999)) + "."
+    )
+
+
+def chat_response(message: str) -> str:
+    rng = _rng_for(message)
+    return f"[stub] Here is a short answer about \"{message[:60]}\" (ref {rng.randint(1000, 9999)})."
+
+
+def respond(contents) -> str:
+    prompt = _text_of(contents)
+    if "multiple-choice questions" in prompt:
+        return mcq_response(prompt)
+    if "Summarize" in prompt or "revision notes" in prompt or "summary" in prompt.lower():
+        return summary_response(prompt)
+    return chat_response(prompt)
+
+
+def _response(text: str, prompt_chars: int, usage: bool = True):
+    usage_metadata = SimpleNamespace(prompt_token_count=prompt_chars // 4, candidates_token_count=len(text) // 4)
+    return SimpleNamespace(text=text, usage_metadata=usage_metadata if usage else None)
+
+
+# === CLIENT SURFACE ===
+class StubModels:
+    def __init__(self, behaviour: StubBehaviour):
+        self.behaviour = behaviour
+
+    async def _wait_or_fail(self, seconds: float):
+        await asyncio.sleep(seconds)
+        if self.behaviour.draw_failure():
+            raise StubError("503 UNAVAILABLE (simulated stub failure)")
+
+    async def generate_content(self, model: str, contents, config=None):
+        await self._wait_or_fail(self.behaviour.draw_latency())
+        return _response(respond(contents), len(_text_of(contents)))
+
+    async def generate_content_stream(self, model: str, contents, config=None):
+        latency = self.behaviour.draw_latency()
+        fails = self.behaviour.draw_failure()
+        text = respond(contents)
+        prompt_chars = len(_text_of(contents))
+
+        async def chunks():
+            # First chunk after a fifth of the latency, the rest spread over the remainder
+            await asyncio.sleep(latency * 0.2)
+            size = max(1, -(-len(text) // STREAM_CHUNKS))
+            pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+            for index, piece in enumerate(pieces):
+                if index:
+                    await asyncio.sleep(latency * 0.8 / max(len(pieces) - 1, 1))
+                if fails and index == len(pieces) // 2:
+                    raise StubError("503 UNAVAILABLE (simulated stub failure mid-stream)")
+                yield _response(piece, prompt_chars, usage=index == len(pieces) - 1)
+
+        return chunks()
+
+
+class StubChat:
+    def __init__(self, models: StubModels, model: str, history: list):
+        self.models = models
+        self.model = model
+        self.history = list(history or [])
+
+    def _record(self, message: str, reply: str):
+        self.history.append({"role": "user", "parts": [{"text": message}]})
+        self.history.append({"role": "model", "parts": [{"text": reply}]})
+
+    async def send_message(self, message: str):
+        response = await self.models.generate_content(self.model, message)
+        self._record(message, response.text)
+        return response
+
+    async def send_message_stream(self, message: str):
+        stream = await self.models.generate_content_stream(self.model, message)
+
+        async def chunks():
+            parts = []
+            async for chunk in stream:
+                parts.append(chunk.text)
+                yield chunk
+            self._record(message, "".join(parts))
+
+        return chunks()
+
+    def get_history(self) -> list:
+        return list(self.history)
+
+
+class StubChats:
+    def __init__(self, models: StubModels):
+        self.models = models
+
+    def create(self, model: str, history: list | None = None):
+        return StubChat(self.models, model, history)
+
+
+class StubFiles:
+    def __init__(self):
+        self._count = 0
+
+    async def upload(self, file, config=None):
+        self._count += 1
+        # The stub cannot read the PDF, so the file stands in as a text part naming it
+        return SimpleNamespace(name=f"files/stub-{self._count}", text=f"[uploaded file {os.path.basename(str(file))}]")
+
+    async def delete(self, name: str):
+        return None
+
+
+class StubClient:
+    def __init__(self, behaviour: StubBehaviour | None = None):
+        behaviour = behaviour or StubBehaviour()
+        models = StubModels(behaviour)
+        self.aio = SimpleNamespace(models=models, chats=StubChats(models), files=StubFiles())
@@ -0,0 +1,158 @@
+# utils/metrics.py
+"""
+Process-local metrics rendered in the Prometheus text exposition format.
+
+Just enough of a client for our needs (labelled counters and histograms) so
+no extra dependency is required. Each worker keeps its own numbers; scrape
+every worker, or run a single worker per container.
+"""
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, values)} {_number(total)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = _labels(self.label_names, values, [("le", _number(bound))])
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                le = _labels(self.label_names, values, [("le", "+Inf")])
+                lines.append(f"{self.name}_bucket{le} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, values)} {_number(series[-2])}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, values)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() returns extra exposition lines, computed at scrape time."""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            lines.extend(collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# === LLM ===
+llm_request_seconds = registry.histogram(
+    "llm_request_duration_seconds", "Model call latency, excluding time queued for a concurrency slot.",
+    ("endpoint", "model", "call", "status"),
+)
+llm_queue_seconds = registry.histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for a global/per-endpoint concurrency slot.", ("endpoint",),
+)
+llm_requests = registry.counter(
+    "llm_requests_total", "Model calls by outcome; error is the exception class ('' on success).",
+    ("endpoint", "model", "call", "status", "error"),
+)
+llm_prompt_tokens = registry.histogram(
+    "llm_prompt_tokens", "Prompt tokens per model call.", ("endpoint", "model"), TOKEN_BUCKETS,
+)
+llm_response_tokens = registry.histogram(
+    "llm_response_tokens", "Response tokens per model call.", ("endpoint", "model"), TOKEN_BUCKETS,
+)
+llm_cache_lookups = registry.counter(
+    "llm_cache_lookups_total", "Lookups in front of model calls (summary cache, question bank, single-flight).",
+    ("endpoint", "cache", "result"),
+)
+
+
+def record_cache(endpoint: str, cache: str, hit: bool):
+    llm_cache_lookups.inc(endpoint, cache, "hit" if hit else "miss")
+
+
+# === DB POOL ===
+def _db_pool_lines() -> list[str]:
+    from database.db import get_pool_stats
+
+    stats = get_pool_stats()
+    lines = []
+    for key, kind, help in (
+        ("checkouts", "counter", "Connections checked out of the pool."),
+        ("timeouts", "counter", "Checkouts that timed out waiting for a connection."),
+        ("wait_seconds_total", "counter", "Total time spent waiting for a pooled connection."),
+        ("usage_seconds_total", "counter", "Total time connections were held."),
+        ("checked_out", "gauge", "Connections currently checked out."),
+    ):
+        name = f"db_pool_{key}"
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {_number(stats[key])}"]
+    return lines
+
+
+registry.add_collector(_db_pool_lines)
@@ -1,49 +1,49 @@
 import pdfplumber
 import pytesseract
 from PIL import Image
-import io
 import csv
 import json
 
-def parse_timetable(file: bytes, filename: str):
+def parse_timetable(path: str, filename: str):
     if filename.endswith(".csv"):
-        return parse_csv(file)
+        return parse_csv(path)
 
     elif filename.endswith(".json"):
-        return parse_json(file)
+        return parse_json(path)
 
     elif filename.endswith(".pdf"):
-        return parse_pdf(file)
+        return parse_pdf(path)
 
     elif filename.endswith((".png", ".jpg", ".jpeg")):
-        return parse_image(file)
+        return parse_image(path)
 
     else:
         raise ValueError("Unsupported file format")
 
 
-def parse_csv(file: bytes):
-    text = file.decode("utf-8").splitlines()
-    reader = csv.DictReader(text)
+def parse_csv(path: str):
     timetable = {}
-    for row in reader:
-        day = row["day"]
-        timetable.setdefault(day, []).append({
-            "start": row["start_time"],
-            "end": row["end_time"],
-            "course": row["course"]
-        })
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            day = row["day"]
+            timetable.setdefault(day, []).append({
+                "start": row["start_time"],
+                "end": row["end_time"],
+                "course": row["course"]
+            })
     return timetable
 
 
-def parse_json(file: bytes):
-    data = json.loads(file.decode("utf-8"))
+def parse_json(path: str):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
     return data  # Already structured
 
 
-def parse_pdf(file: bytes):
+def parse_pdf(path: str):
     text = ""
-    with pdfplumber.open(io.BytesIO(file)) as pdf:
+    with pdfplumber.open(path) as pdf:
         for page in pdf.pages:
             page_text = page.extract_text()
             if page_text:
@@ -51,9 +51,9 @@ def parse_pdf(file: bytes):
     return extract_slots_from_text(text)
 
 
-def parse_image(file: bytes):
-    image = Image.open(io.BytesIO(file))
-    text = pytesseract.image_to_string(image)
+def parse_image(path: str):
+    with Image.open(path) as image:
+        text = pytesseract.image_to_string(image)
     return extract_slots_from_text(text)
 
 
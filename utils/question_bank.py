@@ -0,0 +1,180 @@
+# utils/question_bank.py
+"""
+Per-course question bank in front of Gemini.
+
+/tests/generate samples questions from the bank, so in the common case a test
+is a local DB operation. Gemini is only called when the bank cannot cover the
+request, and a background refill tops a course up whenever its bank drops
+below QUESTION_BANK_MIN_SIZE.
+"""
+import json
+import os
+import re
+
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+
+from database.db import SessionLocal
+from database import crud
+from utils import llm_gateway
+from utils.single_flight import fingerprint, single_flight
+
+load_dotenv()
+
+TEST_MODEL = "gemini-2.0-flash"
+QUESTION_BANK_MIN_SIZE = int(os.getenv("QUESTION_BANK_MIN_SIZE", 50))
+QUESTION_BANK_REFILL_BATCH = int(os.getenv("QUESTION_BANK_REFILL_BATCH", 25))
+MAX_TEST_QUESTIONS = int(os.getenv("MAX_TEST_QUESTIONS", 50))
+
+# Courses with a refill already running in this process
+_refilling = set()
+
+
+class QuestionParseError(ValueError):
+    pass
+
+
+def build_prompt(course, num_questions: int) -> str:
+    return f"""
+    Generate {num_questions} multiple-choice questions for the course {course.code} - {course.title}.
+    Provide each question with 4 options (A, B, C, D) and the correct answer.
+    Format as JSON list: 
+    [{{"question": "...", "options": ["A", "B", "C", "D"], "answer": "A"}}]
+    """
+
+
+def parse_questions(text: str) -> list:
+    cleaned_text = text.strip()
+    cleaned_text = re.sub(r"^```(json)?|```$", "", cleaned_text, flags=re.MULTILINE).strip()
+    try:
+        questions = json.loads(cleaned_text)
+    except Exception:
+        raise QuestionParseError("Failed to parse Gemini output as JSON")
+    if not isinstance(questions, list):
+        raise QuestionParseError("Gemini output is not a JSON list")
+    return questions
+
+
+class QuestionStreamParser:
+    """Incrementally pull complete objects out of a streamed JSON list.
+
+    feed() takes the next text chunk and returns the questions completed by
+    it. Anything before the opening '[' (e.g. a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.obj_start = None
+
+    def feed(self, chunk: str) -> list:
+        self.buffer += chunk
+        found = []
+        while self.pos < len(self.buffer) and not self.finished:
+            ch = self.buffer[self.pos]
+            if not self.started:
+                if ch == "[":
+                    self.started = True
+            elif self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                if self.depth == 0:
+                    self.obj_start = self.pos
+                self.depth += 1
+            elif ch in "}]":
+                if self.depth == 0:
+                    self.finished = True  # closing bracket of the list
+                else:
+                    self.depth -= 1
+                    if self.depth == 0:
+                        try:
+                            found.append(json.loads(self.buffer[self.obj_start:self.pos + 1]))
+                        except ValueError:
+                            raise QuestionParseError("Failed to parse Gemini output as JSON")
+                        self.obj_start = None
+            self.pos += 1
+
+        # Drop text that has been consumed so the buffer stays at most one question long
+        keep = self.obj_start if self.obj_start is not None else self.pos
+        self.buffer = self.buffer[keep:]
+        self.pos -= keep
+        if self.obj_start is not None:
+            self.obj_start = 0
+        return found
+
+    def close(self):
+        if not self.finished:
+            raise QuestionParseError("Gemini output ended before the JSON list was complete")
+
+
+async def stream_questions(course, num_questions: int):
+    """Yield questions one by one as Gemini streams them (raises llm_gateway.LLMError / QuestionParseError)."""
+    parser = QuestionStreamParser()
+    async for chunk in llm_gateway.generate_stream("tests", build_prompt(course, num_questions), model=TEST_MODEL):
+        for question in parser.feed(chunk):
+            yield question
+    parser.close()
+
+
+async def generate_questions(course, num_questions: int) -> list:
+    """Ask Gemini for fresh questions (raises llm_gateway.LLMError / QuestionParseError).
+
+    Identical concurrent requests (same course and size) share one Gemini call.
+    """
+    async def call():
+        text = await llm_gateway.generate("tests", build_prompt(course, num_questions), model=TEST_MODEL)
+        return parse_questions(text)
+
+    key = fingerprint("tests", TEST_MODEL, course.id, num_questions)
+    return list(await single_flight.do(key, call, endpoint="tests"))
+
+
+def _store(course_id: int, questions: list) -> int:
+    db = SessionLocal()
+    try:
+        return crud.add_bank_questions(db, course_id, questions)
+    finally:
+        db.close()
+
+
+def _needs_refill(course_id: int) -> tuple:
+    db = SessionLocal()
+    try:
+        return crud.get_course(db, course_id), crud.count_bank_questions(db, course_id)
+    finally:
+        db.close()
+
+
+async def store_questions(course_id: int, questions: list) -> int:
+    return await run_in_threadpool(_store, course_id, questions)
+
+
+async def refill(course_id: int):
+    """Top a course's bank up to QUESTION_BANK_MIN_SIZE. Meant to run as a background task."""
+    if course_id in _refilling:
+        return
+    _refilling.add(course_id)
+    try:
+        course, size = await run_in_threadpool(_needs_refill, course_id)
+        if course is None or size >= QUESTION_BANK_MIN_SIZE:
+            return
+        try:
+            questions = await generate_questions(course, QUESTION_BANK_REFILL_BATCH)
+        except (llm_gateway.LLMError, QuestionParseError) as e:
+            print(f"❌ Question bank refill for course {course_id} failed: {e}")
+            return
+        await store_questions(course_id, questions)
+    finally:
+        _refilling.discard(course_id)
@@ -0,0 +1,139 @@
+# utils/report_renderer.py
+"""
+Performance report PDFs, rendered off the request path.
+
+The route gathers the report data (plain, picklable values) and hands it to
+`get_report`, which returns cached bytes when the same data was rendered
+before, or renders it in a process pool and stores the result under the
+SHA-256 of the data. Nothing is written to the process CWD, and a user's
+report is only rebuilt when their numbers actually change.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+
+load_dotenv()
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", 2))
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join("cache", "reports"))
+REPORT_CACHE_MAX_FILES = int(os.getenv("REPORT_CACHE_MAX_FILES", 1000))
+REPORT_VERSION = "1"  # bump when the layout changes so cached PDFs are not reused
+
+_pool = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# === RENDERING ===
+def render_performance_report(report: dict) -> bytes:
+    """Build the PDF into memory. Runs in a worker process, so it only takes plain data."""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer)
+    styles = getSampleStyleSheet()
+    elements = []
+
+    elements.append(Paragraph(f"Performance Report for {report['name']}", styles['Title']))
+    elements.append(Spacer(1, 20))
+
+    # Overall Average
+    elements.append(Paragraph(f"Overall Average Score: {report['overall_avg']}", styles['Heading2']))
+    elements.append(Spacer(1, 10))
+
+    # Avg scores per course
+    elements.append(Paragraph("Average Scores Per Course:", styles['Heading2']))
+    elements.append(Table([["Course", "Average Score"]] + [list(row) for row in report["scores"]]))
+    elements.append(Spacer(1, 20))
+
+    # Weekly study hours
+    elements.append(Paragraph("Weekly Study Hours:", styles['Heading2']))
+    elements.append(Table([["Course", "Total Hours"]] + [list(row) for row in report["weekly_study"]]))
+    elements.append(Spacer(1, 20))
+
+    # Weak courses with scores
+    elements.append(Paragraph("Weak Courses (Lowest Scores):", styles['Heading2']))
+    for cname, score in report["weak_courses"]:
+        elements.append(Paragraph(f"{cname} - Avg Score: {score}", styles['Normal']))
+    elements.append(Spacer(1, 20))
+
+    # AI Insights
+    elements.append(Paragraph("AI Insights:", styles['Heading2']))
+    for insight in report["insights"]:
+        elements.append(Paragraph(insight, styles['Normal']))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+# === CACHE ===
+def report_key(report: dict) -> str:
+    """Content address of a report: same data + same layout version -> same PDF."""
+    payload = json.dumps({"v": REPORT_VERSION, "report": report}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(REPORT_CACHE_DIR, f"{key}.pdf")
+
+
+def read_cached(key: str) -> bytes | None:
+    try:
+        with open(_cache_path(key), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_cached(key: str, pdf: bytes):
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    # Write to a unique temp file then rename, so readers never see a partial PDF
+    fd, tmp_path = tempfile.mkstemp(dir=REPORT_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(pdf)
+    os.replace(tmp_path, _cache_path(key))
+    _prune_cache()
+
+
+def _prune_cache():
+    entries = [e for e in os.scandir(REPORT_CACHE_DIR) if e.name.endswith(".pdf")]
+    if len(entries) <= REPORT_CACHE_MAX_FILES:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[: len(entries) - REPORT_CACHE_MAX_FILES]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+async def get_report(report: dict) -> tuple[str, bytes, bool]:
+    """Return (key, pdf bytes, cache hit) for the report data, rendering in the pool on a miss."""
+    key = report_key(report)
+    loop = asyncio.get_running_loop()
+
+    pdf = await loop.run_in_executor(None, read_cached, key)
+    if pdf is not None:
+        return key, pdf, True
+
+    pdf = await loop.run_in_executor(get_pool(), render_performance_report, report)
+    await loop.run_in_executor(None, write_cached, key, pdf)
+    return key, pdf, False
@@ -0,0 +1,61 @@
+# utils/single_flight.py
+"""
+In-process single-flight for LLM calls.
+
+Concurrent callers asking for the same thing (same key) share one upstream
+call: the first caller starts it, later callers await the same task and get
+the same result or exception. Once it finishes the key is released, so this
+coalesces in-flight work only - it is not a cache.
+"""
+import asyncio
+import hashlib
+
+from utils import metrics
+
+
+def fingerprint(*parts) -> str:
+    """Stable key from the parts that decide a request's result (bytes are hashed, not kept)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._in_flight = {}
+        self.calls = 0      # upstream calls started
+        self.coalesced = 0  # callers that joined a call already in flight
+
+    async def do(self, key: str, make_call, endpoint: str = "", on_done=None):
+        """Await make_call() once per key at a time and return its result to every concurrent caller.
+
+        make_call() runs synchronously in the caller that starts the call, so it can take
+        ownership of its inputs there; on_done() runs when that call finishes, however it ends.
+        """
+        task = self._in_flight.get(key)
+        metrics.record_cache(endpoint, "single_flight", task is not None)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(make_call())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            if on_done is not None:
+                task.add_done_callback(lambda _: on_done())
+        else:
+            self.coalesced += 1
+        # Shield so one caller disconnecting does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        total = self.calls + self.coalesced
+        return {
+            "in_flight": len(self._in_flight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+        }
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,7 @@
+# utils/sse.py
+import json
+
+
+def sse_event(event: str, data) -> str:
+    """One Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,84 @@
+# utils/summary_cache.py
+"""
+Disk-backed LRU cache for PDF summaries.
+
+Entries live under SUMMARY_CACHE_DIR, one JSON file per (file SHA-256,
+prompt version). A read refreshes the file's mtime, so eviction by oldest
+mtime is least-recently-used; the directory is trimmed to
+SUMMARY_CACHE_MAX_BYTES after each write. Entries older than
+SUMMARY_CACHE_TTL_SECONDS (counted from when they were written, not last
+read) are treated as misses and removed.
+"""
+import json
+import os
+import tempfile
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SUMMARY_CACHE_DIR = os.getenv("SUMMARY_CACHE_DIR", os.path.join("cache", "summaries"))
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+
+
+def summary_key(digest: str, prompt_version: str) -> str:
+    return f"{digest}-{prompt_version}"
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(SUMMARY_CACHE_DIR, f"{key}.json")
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def read_cached(key: str) -> str | None:
+    path = _cache_path(key)
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if time.time() - entry.get("created_at", 0) > SUMMARY_CACHE_TTL_SECONDS:
+        _remove(path)
+        return None
+    try:
+        os.utime(path)  # mark as recently used
+    except FileNotFoundError:
+        pass
+    return entry["summary"]
+
+
+def write_cached(key: str, summary: str):
+    os.makedirs(SUMMARY_CACHE_DIR, exist_ok=True)
+    # Write to a unique temp file then rename, so readers never see a partial entry
+    fd, tmp_path = tempfile.mkstemp(dir=SUMMARY_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"created_at": time.time(), "summary": summary}, f)
+    os.replace(tmp_path, _cache_path(key))
+    _prune_cache()
+
+
+def _prune_cache():
+    entries = [e for e in os.scandir(SUMMARY_CACHE_DIR) if e.name.endswith(".json")]
+    stats = {}
+    for entry in entries:
+        try:
+            stats[entry.path] = entry.stat()
+        except FileNotFoundError:
+            pass
+    total = sum(s.st_size for s in stats.values())
+    if total <= SUMMARY_CACHE_MAX_BYTES:
+        return
+    for path, stat in sorted(stats.items(), key=lambda item: item[1].st_mtime):
+        _remove(path)
+        total -= stat.st_size
+        if total <= SUMMARY_CACHE_MAX_BYTES:
+            break
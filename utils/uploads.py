@@ -0,0 +1,134 @@
+# utils/uploads.py
+"""
+Size-bounded, streamed file uploads.
+
+Starlette already spools multipart files to a temporary file, but with no
+size limit, and handlers then `read()` the whole thing into memory. Here the
+upload is copied in fixed-size chunks to a file on disk, hashing and
+counting bytes as it goes, and rejected with 413 once it passes
+MAX_UPLOAD_BYTES. Consumers open the result by path (PyMuPDF, pdfplumber,
+PIL, the Gemini Files API), so memory per request does not grow with the
+file size.
+
+UploadSizeLimitMiddleware rejects requests whose Content-Length is already
+over the limit before their body is read at all.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+load_dotenv()
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or tempfile.gettempdir()
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+FORM_OVERHEAD_BYTES = 1024 * 1024  # multipart boundaries and the other form fields
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File too large (max {max_bytes / (1024 * 1024):g} MB)")
+
+
+@dataclass
+class SpooledUpload:
+    path: str
+    filename: str
+    size: int
+    sha256: str
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def close(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def link_upload(upload: SpooledUpload, name: str) -> SpooledUpload:
+    """A second, separately owned path to the same spooled bytes: a hard link, or a copy across filesystems."""
+    path = os.path.join(UPLOAD_TMP_DIR, f"inflight-{name}{os.path.splitext(upload.path)[1]}")
+    try:
+        os.remove(path)  # left behind by a crashed process
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(upload.path, path)
+    except OSError:
+        shutil.copyfile(upload.path, path)
+    return SpooledUpload(path=path, filename=upload.filename, size=upload.size, sha256=upload.sha256)
+
+
+def copy_limited(src, dest_path: str, max_bytes: int = MAX_UPLOAD_BYTES) -> tuple[int, str]:
+    """Copy a file object to dest_path in chunks; returns (size, sha256). Removes dest_path and raises 413 past max_bytes."""
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest_path, "wb") as dest:
+            while chunk := src.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large(max_bytes)
+                digest.update(chunk)
+                dest.write(chunk)
+    except BaseException:
+        try:
+            os.remove(dest_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return size, digest.hexdigest()
+
+
+def save_upload(file: UploadFile, dest_path: str, max_bytes: int = MAX_UPLOAD_BYTES) -> tuple[int, str]:
+    """Stream an upload to its final location (via a temp file in the same directory, then rename)."""
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path) or ".", suffix=".part")
+    os.close(fd)
+    size, sha256 = copy_limited(file.file, tmp_path, max_bytes)
+    os.replace(tmp_path, dest_path)
+    return size, sha256
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> SpooledUpload:
+    """Stream an upload to a temp file and return it; use as a context manager so the file is removed."""
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+    suffix = os.path.splitext(file.filename or "")[1].lower()
+    fd, path = tempfile.mkstemp(dir=UPLOAD_TMP_DIR, prefix="upload-", suffix=suffix)
+    os.close(fd)
+    size, sha256 = await run_in_threadpool(copy_limited, file.file, path, max_bytes)
+    return SpooledUpload(path=path, filename=file.filename or "", size=size, sha256=sha256)
+
+
+class UploadSizeLimitMiddleware:
+    """Answer 413 up front for requests that declare a body larger than any allowed upload."""
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            length = dict(scope["headers"]).get(b"content-length")
+            if length is not None and length.isdigit() and int(length) > self.max_bytes:
+                response = JSONResponse(status_code=413, content={"detail": _too_large(MAX_UPLOAD_BYTES).detail})
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)